@@ -0,0 +1,17 @@
+import os
+import pytest
+from utilities import BuilderFactory, ConstraintChecker
+from utilities.decomposition_solver import DecompositionSolver
+
+DATASET_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "utilities", "dataset")
+
+
+@pytest.mark.parametrize("cluster_size", [3, 10])
+def test_small_clusters_are_solved(cluster_size):
+    # clusters of a few depots (or a single vehicle) used to hang generating the initial population
+    factory = BuilderFactory(os.path.join(DATASET_DIR, "65_22cars"))
+    solver = DecompositionSolver(factory, cluster_size=cluster_size, workers=1, maximum_iteration=5, boundary_time_limit=0, seed=1)
+    result = solver.solve()
+
+    assert ConstraintChecker(factory).check_solution(result.solution)["is_valid"]
+    assert sorted(depot_idx for depots_of_cluster in solver.clusters.values() for depot_idx in depots_of_cluster) == sorted(solver.all_depot_names)
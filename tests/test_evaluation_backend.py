@@ -0,0 +1,53 @@
+import os
+import pytest
+from utilities import BuilderFactory, ConstraintChecker, ConstructiveHeuristic, RouteResourceCalculator
+from utilities.evaluation_backend import check_backend_conformance
+from utilities.optimizer import Optimizer
+
+DATASET_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "utilities", "dataset")
+DATASETS = sorted(os.listdir(DATASET_DIR))
+
+
+def _generate_solutions(factory):
+    '''
+    valid solutions, and invalid ones: all depots on one vehicle (replenishing on the way), reversed routes, routes moved to other vehicles
+    '''
+    warehouse_depot = 0
+    valid_solutions = ConstructiveHeuristic(factory, seed=1).generate_solutions(5)
+    vehicle_names = factory.vehicles.all_vehicle_names
+    depot_names = [depot_idx for depot_idx in factory.depots.all_depot_names if depot_idx != warehouse_depot]
+    optimizer = Optimizer(factory)
+
+    solutions = list(valid_solutions)
+    for vehicle_idx in vehicle_names[:2]:
+        solution = {other_vehicle_idx: [] for other_vehicle_idx in vehicle_names}
+        solution[vehicle_idx] = optimizer.insert_warehouse_depots_and_relenishment_points(vehicle_idx, depot_names)
+        solutions.append(solution)
+    for solution in valid_solutions:
+        solutions.append({vehicle_idx: route[::-1] for vehicle_idx, route in solution.items()})
+        routes = list(solution.values())
+        solutions.append({vehicle_idx: routes[(position + 1) % len(routes)] for position, vehicle_idx in enumerate(solution)})
+    return solutions
+
+
+@pytest.fixture(scope="module", params=DATASETS)
+def dataset(request):
+    factory = BuilderFactory(os.path.join(DATASET_DIR, request.param))
+    return factory, _generate_solutions(factory)
+
+
+def test_solutions_cover_invalid_and_replenishing_routes(dataset):
+    factory, solutions = dataset
+    checker = ConstraintChecker(factory)
+    resource_calc = RouteResourceCalculator(factory)
+    assert not all(checker.check_solution(solution)["is_valid"] for solution in solutions)
+    assert any(resource_calc.calculate_solution_resources(solution)["number_of_replenishment"] > 0 for solution in solutions)
+
+
+@pytest.mark.parametrize("backend_name", ["numpy", "numba"])
+def test_backend_conforms_to_reference(dataset, backend_name):
+    if backend_name == "numba":
+        pytest.importorskip("numba")
+    factory, solutions = dataset
+    mismatches = check_backend_conformance(factory, solutions, [backend_name])
+    assert mismatches[backend_name] == []
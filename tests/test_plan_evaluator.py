@@ -0,0 +1,23 @@
+import os
+import pytest
+from utilities import BuilderFactory, ConstraintChecker, ConstructiveHeuristic
+from utilities.plan_evaluator import PlanEvaluator
+
+DATASET_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "utilities", "dataset")
+
+
+@pytest.mark.parametrize("unknown_depot", [-1, 10 ** 6])
+def test_unknown_depots_are_invalid(unknown_depot):
+    # -1 is the padding of route arrays, a plan made elsewhere may still have it as a depot
+    factory = BuilderFactory(os.path.join(DATASET_DIR, "9_5cars"))
+    solution = ConstructiveHeuristic(factory, seed=1).regret_insertion_solution()
+    vehicle_idx = next(vehicle_idx for vehicle_idx, route in solution.items() if len(route) != 0)
+    plan = {vehicle_idx: list(route) for vehicle_idx, route in solution.items()}
+    plan[vehicle_idx].insert(2, unknown_depot)
+
+    valid_record, invalid_record = PlanEvaluator(factory).evaluate_batch([("valid", solution), ("invalid", plan)])
+    assert valid_record["is_valid"]
+    assert not invalid_record["is_valid"]
+    assert invalid_record["violations"]["number_of_incompatible_assignments"] == 1
+    assert invalid_record["total_cost"] is None
+    assert not ConstraintChecker(factory).check_solution(plan)["is_valid"]
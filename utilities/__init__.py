@@ -1,15 +1,68 @@
-from .base_class import BuilderFactory
-from .depot import Depot
-from .depot_builder import DepotBuilder
-from .vehicle import Vehicle
-from .vehicle_builder import VehicleBuilder
-from .solution_generator import SolutionGenerator
-from .constraint_checker import ConstraintChecker
-from .route_resource_calculator import RouteResourceCalculator
-from .optimizer import Optimizer
-from .solution_chromosome import SolutionChromosome
-from .mutation_strategy import MutationStrategy
-from .crossover_strategy import CrossoverStrategy
-
-
-from .genetic_algorithm import GeneticAlgorithm
+'''
+Every public name below is imported lazily on first access (e.g., utilities.GeneticAlgorithm),
+so that "import utilities" neither imports pandas / numpy nor reads any dataset.
+Datasets are only read when a BuilderFactory (or anything built on it) is created.
+'''
+from importlib import import_module
+
+_LAZY_ATTRIBUTES = {
+    "BuilderFactory": ".base_class",
+    "InstanceArrays": ".instance_arrays",
+    "Depot": ".depot",
+    "DepotMatrix": ".depot_matrix",
+    "NearestDepotMatrix": ".depot_matrix",
+    "DepotBuilder": ".depot_builder",
+    "Vehicle": ".vehicle",
+    "VehicleBuilder": ".vehicle_builder",
+    "SolutionGenerator": ".solution_generator",
+    "ConstructiveHeuristic": ".constructive_heuristic",
+    "LargeNeighborhoodSearch": ".large_neighborhood_search",
+    "DecompositionSolver": ".decomposition_solver",
+    "ConstraintChecker": ".constraint_checker",
+    "BatchConstraintChecker": ".batch_constraint_checker",
+    "PlanEvaluator": ".plan_evaluator",
+    "RouteResourceCalculator": ".route_resource_calculator",
+    "Optimizer": ".optimizer",
+    "EvaluationBackend": ".evaluation_backend",
+    "PythonEvaluationBackend": ".evaluation_backend",
+    "NumpyEvaluationBackend": ".evaluation_backend",
+    "NumbaEvaluationBackend": ".evaluation_backend",
+    "get_evaluation_backend": ".evaluation_backend",
+    "check_backend_conformance": ".evaluation_backend",
+    "SolutionChromosome": ".solution_chromosome",
+    "MutationStrategy": ".mutation_strategy",
+    "BatchMutationStrategy": ".batch_mutation_strategy",
+    "CrossoverStrategy": ".crossover_strategy",
+    "GiantTour": ".giant_tour",
+    "SplitDecoder": ".split_decoder",
+    "OperatorPortfolio": ".operator_portfolio",
+    "RandomStream": ".random_stream",
+    "Population": ".population",
+    "MemoryProfiler": ".memory_profiler",
+    "SharedInstance": ".shared_instance",
+    "HyperparameterSweep": ".hyperparameter_sweep",
+    "get_dataset_hash": ".hyperparameter_sweep",
+    "DatasetGenerator": ".dataset_generator",
+    "GeneticAlgorithm": ".genetic_algorithm",
+    "SolveResult": ".solve_result",
+    "Scenario": ".scenario",
+    "solve_many": ".batch_solver",
+    "SolverDaemon": ".solver_daemon",
+    "SolverClient": ".solver_daemon",
+    "Reoptimizer": ".reoptimizer",
+}
+
+__all__ = list(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    value = getattr(import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+    globals()[name] = value  # next access doesn't go through __getattr__
+    return value
+
+
+def __dir__():
+    return sorted([*globals(), *__all__])
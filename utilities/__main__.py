@@ -0,0 +1,175 @@
+'''
+Command-line entry point, e.g.,
+    python -m utilities solve --dataset utilities/dataset/30_15cars --time-limit 60 --seed 0 --output plan.json
+    python -m utilities solve --dataset DIR --solver decomposition --workers 8 --time-limit 30
+    python -m utilities evaluate --dataset utilities/dataset/30_15cars --solution plan.json
+    python -m utilities evaluate-many --dataset utilities/dataset/30_15cars --plans plans.jsonl --workers 4 --output results.jsonl
+
+Results are written as json (SolveResult.to_dict, plus the constraints checked), to --output or stdout.
+Progress and messages go to stderr, so stdout can be piped.
+'''
+import argparse
+import json
+import os
+import sys
+from typing import Dict, List
+from .base_class import DEFAULT_BASE_DIR, BuilderFactory
+from .constraint_checker import ConstraintChecker
+from .plan_evaluator import PlanEvaluator, to_solution
+from .scenario import Scenario
+from .solve_result import SolveResult
+
+SOLVERS = ["ga", "lns", "decomposition"]
+
+
+def _load_factory(arguments: argparse.Namespace) -> BuilderFactory:
+    if not os.path.isdir(arguments.dataset):
+        raise ValueError(f"'--dataset' must be a directory of a dataset (c_ij.csv, d_i.csv, ...), given {arguments.dataset}")
+    factory = BuilderFactory(arguments.dataset, matrix_storage=arguments.matrix_storage)
+    if arguments.scenario is None:
+        return factory
+    with open(arguments.scenario) as file:
+        overrides = json.load(file)
+    return Scenario.from_dict(os.path.basename(arguments.scenario), overrides).apply(factory)
+
+
+def _load_solution(file_name: str) -> Dict[int, List[int]]:
+    '''
+    either a SolveResult dumped by 'solve' (i.e., with a "solution" key), or the solution itself, e.g., {"0": [0, 1, 0], "1": []}
+    '''
+    with open(file_name) as file:
+        return to_solution(json.load(file))
+
+
+def _write_output(content: dict, file_name: str = None) -> None:
+    if file_name is None:
+        json.dump(content, sys.stdout, indent=2)
+        sys.stdout.write("\n")
+        return
+    # written to a temporary file first, so that a scheduler never reads a half-written plan
+    temp_file_name = f"{file_name}.tmp"
+    with open(temp_file_name, "w") as file:
+        json.dump(content, file, indent=2)
+    os.replace(temp_file_name, file_name)
+
+
+def _solve(arguments: argparse.Namespace, factory: BuilderFactory) -> SolveResult:
+    # messages of solvers are printed to stderr, stdout is kept for the result
+    stdout = sys.stdout
+    sys.stdout = sys.stderr
+    try:
+        if arguments.solver == "ga":
+            from .genetic_algorithm import GeneticAlgorithm
+            solver = GeneticAlgorithm(arguments.population_size, arguments.mutation_rate, arguments.crossover_rate,
+                                      arguments.maximum_iteration, factory=factory, verbose=arguments.verbose,
+                                      time_limit=arguments.time_limit, seed=arguments.seed)
+            return solver.solve()
+        if arguments.solver == "lns":
+            from .large_neighborhood_search import LargeNeighborhoodSearch
+            # iterations of LNS are much cheaper than generations, so the time limit is what usually stops it
+            solver = LargeNeighborhoodSearch(factory, maximum_iteration=arguments.maximum_iteration * 100, time_limit=arguments.time_limit,
+                                             seed=arguments.seed, verbose=arguments.verbose)
+            return solver.solve()
+        from .decomposition_solver import DecompositionSolver
+        solver = DecompositionSolver(factory, cluster_size=arguments.cluster_size, workers=arguments.workers,
+                                     population_size=arguments.population_size, mutation_rate=arguments.mutation_rate,
+                                     crossover_rate=arguments.crossover_rate, maximum_iteration=arguments.maximum_iteration,
+                                     time_limit=arguments.time_limit, seed=arguments.seed, verbose=arguments.verbose)
+        return solver.solve()
+    finally:
+        sys.stdout = stdout
+
+
+def solve_command(arguments: argparse.Namespace) -> int:
+    factory = _load_factory(arguments)
+    result = _solve(arguments, factory)
+    result.name = arguments.name
+    constraints = ConstraintChecker(factory).check_solution(result.solution)
+    _write_output({**result.to_dict(), "solver": arguments.solver, "dataset": os.path.abspath(arguments.dataset),
+                   "seed": arguments.seed, "constraints": constraints}, arguments.output)
+    return 0 if constraints["is_valid"] else 1
+
+
+def evaluate_command(arguments: argparse.Namespace) -> int:
+    factory = _load_factory(arguments)
+    solution = _load_solution(arguments.solution)
+    constraints = ConstraintChecker(factory).check_solution(solution)
+    # costs of a solution using unknown depots / vehicles can't be calculated
+    if not constraints["is_vehicle_compatible"]:
+        _write_output({"name": arguments.name, "solution": {str(vehicle_idx): route for vehicle_idx, route in solution.items()},
+                       "constraints": constraints}, arguments.output)
+        return 1
+    result = SolveResult.from_solution(solution, factory, arguments.name)
+    _write_output({**result.to_dict(), "dataset": os.path.abspath(arguments.dataset), "constraints": constraints}, arguments.output)
+    return 0 if constraints["is_valid"] else 1
+
+
+def evaluate_many_command(arguments: argparse.Namespace) -> int:
+    factory = _load_factory(arguments)
+    evaluator = PlanEvaluator(factory, arguments.batch_size, arguments.workers)
+    input_file = sys.stdin if arguments.plans == "-" else open(arguments.plans)
+    # records are streamed as they are evaluated, so (unlike the other commands) --output is written in place
+    output_file = sys.stdout if arguments.output is None else open(arguments.output, "w")
+    try:
+        counts = evaluator.evaluate_jsonl(input_file, output_file)
+    finally:
+        if input_file is not sys.stdin:
+            input_file.close()
+        if output_file is not sys.stdout:
+            output_file.close()
+    print(json.dumps(counts), file=sys.stderr)
+    return 0 if counts["number_of_valid_plans"] == counts["number_of_plans"] and counts["number_of_errors"] == 0 else 1
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m utilities",
+                                     description="Solve / evaluate vehicle routing plans. Exit status is 0 for a valid plan, "
+                                                 "1 for an invalid one and 2 for bad arguments or data.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    common_parser = argparse.ArgumentParser(add_help=False)
+    common_parser.add_argument("--dataset", default=DEFAULT_BASE_DIR, help="dataset directory (default: the bundled 9_5cars)")
+    common_parser.add_argument("--scenario", default=None, help="json file of Scenario overrides, see Scenario.from_dict")
+    common_parser.add_argument("--matrix-storage", default="memory", choices=["memory", "memmap", "sparse"])
+    common_parser.add_argument("--output", default=None, help="json file to write the result to (default: stdout)")
+    common_parser.add_argument("--name", default=None, help="name of the result")
+
+    solve_parser = subparsers.add_parser("solve", parents=[common_parser], help="solve a dataset")
+    solve_parser.add_argument("--solver", default="ga", choices=SOLVERS)
+    solve_parser.add_argument("--time-limit", type=float, default=None, help="seconds")
+    solve_parser.add_argument("--seed", type=int, default=None,
+                              help="the same seed gives the same plan, unless the run is stopped by --time-limit")
+    solve_parser.add_argument("--workers", type=int, default=None, help="worker processes of the decomposition solver (default: cpus)")
+    solve_parser.add_argument("--population-size", type=int, default=30)
+    solve_parser.add_argument("--mutation-rate", type=float, default=0.3)
+    solve_parser.add_argument("--crossover-rate", type=float, default=0.7)
+    solve_parser.add_argument("--maximum-iteration", type=int, default=20)
+    solve_parser.add_argument("--cluster-size", type=int, default=30, help="depots per cluster of the decomposition solver")
+    solve_parser.add_argument("--verbose", action="store_true", help="print progress to stderr")
+    solve_parser.set_defaults(handler=solve_command)
+
+    evaluate_parser = subparsers.add_parser("evaluate", parents=[common_parser], help="evaluate a plan")
+    evaluate_parser.add_argument("--solution", required=True, help="json file of a plan, e.g., the output of 'solve'")
+    evaluate_parser.set_defaults(handler=evaluate_command)
+
+    evaluate_many_parser = subparsers.add_parser("evaluate-many", parents=[common_parser],
+                                                 help="evaluate plans streamed as json lines, writing a json line of each")
+    evaluate_many_parser.add_argument("--plans", required=True, help="file of one plan per line, '-' for stdin")
+    evaluate_many_parser.add_argument("--batch-size", type=int, default=1000, help="plans evaluated at once")
+    evaluate_many_parser.add_argument("--workers", type=int, default=1, help="worker processes evaluating batches")
+    evaluate_many_parser.set_defaults(handler=evaluate_many_command)
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    parser = build_parser()
+    arguments = parser.parse_args(argv)
+    try:
+        return arguments.handler(arguments)
+    except (ValueError, KeyError, OSError, json.JSONDecodeError) as error:
+        print(f"error: {error}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,24 +1,83 @@
+import os
 from typing import List
 from .depot_file import DepotFile
 from .vehicle_file import VehicleFile
 from .depot_builder import DepotBuilder
 from .vehicle_builder import VehicleBuilder
 
+# resolved from this file rather than the current working directory
+DEFAULT_BASE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "dataset", "9_5cars")
+# matrix_options of a BuilderFactory loaded without any (see BuilderFactory.__init__)
+DEFAULT_MATRIX_OPTIONS = {"matrix_storage": "memory", "matrix_dtype": None, "cache_dir": None}
+
 
 class BuilderFactory:
-    def __init__(self, BASE_DIR: str = "./utilities/dataset/9_5cars/") -> None:
+    def __init__(self,
+                 BASE_DIR: str = DEFAULT_BASE_DIR,
+                 matrix_storage: str = "memory",
+                 matrix_dtype: type = None,
+                 cache_dir: str = None,
+                 factory: 'BuilderFactory' = None) -> None:
+        '''
+        matrix_storage, matrix_dtype and cache_dir are passed to DepotBuilder,
+        deciding how c_ij.csv and t_ij.csv are stored ("memory", "memmap" or "sparse").
+
+        factory: an already loaded BuilderFactory, whose builders are shared instead of reading csv files again.
+        '''
+        if factory is not None:
+            self.depot_files = factory.depot_files
+            self.vehicle_files = factory.vehicle_files
+            self.matrix_options = factory.matrix_options
+            self.depot_builder = factory.depot_builder
+            self.vehicle_builder = factory.vehicle_builder
+            self.evaluation_backend = factory.evaluation_backend
+            return
+
         self.depot_files = DepotFile(BASE_DIR)
         self.vehicle_files = VehicleFile(BASE_DIR)
-        self.depot_builder = DepotBuilder(self.depot_files)
+        self.matrix_options = {"matrix_storage": matrix_storage,
+                               "matrix_dtype": matrix_dtype,
+                               "cache_dir": cache_dir}
+        self.depot_builder = DepotBuilder(self.depot_files, **self.matrix_options)
         self.vehicle_builder = VehicleBuilder(self.vehicle_files)
+        # see .use_evaluation_backend(), None means the reference (pure python) implementation
+        self.evaluation_backend = None
+
+    @classmethod
+    def from_builders(cls,
+                      depot_builder: DepotBuilder,
+                      vehicle_builder: VehicleBuilder,
+                      BASE_DIR: str = DEFAULT_BASE_DIR) -> 'BuilderFactory':
+        '''
+        A BuilderFactory of already built builders (e.g., see SharedInstance.to_factory), no csv file is read.
+        BASE_DIR: where the instance was originally read from, only kept as .depot_files / .vehicle_files
+        '''
+        factory = cls.__new__(cls)
+        factory.depot_files = DepotFile(BASE_DIR)
+        factory.vehicle_files = VehicleFile(BASE_DIR)
+        factory.matrix_options = {"matrix_storage": depot_builder.matrix_storage,
+                                  "matrix_dtype": depot_builder.matrix_dtype,
+                                  "cache_dir": depot_builder.cache_dir}
+        factory.depot_builder = depot_builder
+        factory.vehicle_builder = vehicle_builder
+        factory.evaluation_backend = None
+        return factory
+
+    def use_evaluation_backend(self, name: str = "auto") -> None:
+        '''
+        name: "python", "numpy", "numba" or "auto", see get_evaluation_backend in evaluation_backend.py
+        Only components created (or sharing this factory) afterwards use the backend.
+        '''
+        from .evaluation_backend import get_evaluation_backend
+        self.evaluation_backend = None if name == "python" else get_evaluation_backend(name, self)
 
     @property
     def depots(self) -> DepotBuilder:
-        return DepotBuilder(self.depot_files)
+        return self.depot_builder
 
     @property
     def vehicles(self) -> VehicleBuilder:
-        return VehicleBuilder(self.vehicle_files)
+        return self.vehicle_builder
 
     
 
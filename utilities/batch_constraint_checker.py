@@ -0,0 +1,209 @@
+from typing import Dict, List, Tuple
+import numpy as np
+from .base_class import BuilderFactory
+from .instance_arrays import InstanceArrays
+# e.g.,  {0: [], 1: [0, 8, 6, 0], 2: [0, 7, 5, 0], 3: [0, 3, 0], 4: []}
+Solution = Dict[int, List[int]]
+
+
+class BatchConstraintChecker:
+    VIOLATION_NAMES = ["number_of_unserved_depots", "number_of_incompatible_assignments", "overload", "lateness", "earliness", "overtime"]
+    DEFAULT_PENALTY_WEIGHTS = {"number_of_unserved_depots": 10000,
+                               "number_of_incompatible_assignments": 10000,
+                               "overload": 100,
+                               "lateness": 100,
+                               "earliness": 100,
+                               "overtime": 100}
+
+    def __init__(self, factory: BuilderFactory = None, instance_arrays: InstanceArrays = None) -> None:
+        '''
+        BatchConstraintChecker is the array version of ConstraintChecker.check_solution,
+        checking many solutions (e.g., a whole population) at once and returning how much each of them violates every constraint,
+        rather than only whether it does.
+        -------------------------------------------------------------------------------------------
+        All routes of all solutions are stacked into one 2-D array (one route per row, padded with PADDING, see .to_route_array()),
+        and walked position by position, i.e., one numpy call per step for all routes, O(longest route) steps.
+        The checks (and so 'is_valid') are the same as ConstraintChecker:
+            - capacity: along the route as it is (replenished at warehouse depots), a product running out (<= 0) is a violation,
+            - time windows: along the route with replenishments inserted by Optimizer's rule, only depots with time window constraints
+              from the 3rd depot of a route on are checked, and the route up to such a depot must fit the vehicle's available time,
+            - routes of vehicles which can't deliver some of their depots are only counted as incompatible, nothing else is checked.
+        '''
+        if factory is None:
+            factory = BuilderFactory()
+        self.instance = instance_arrays if instance_arrays is not None else InstanceArrays.from_factory(factory)
+        self.all_depot_names = np.asarray(factory.depots.all_depot_names, dtype=np.int64)
+        self.is_time_window_depot = np.zeros(self.instance.number_of_depots, dtype=bool)
+        self.is_time_window_depot[factory.depot_builder.all_depot_names_with_time_window_constraint] = True
+        self.PADDING = -1
+        # depots outside [0, number_of_depots) (e.g., -1 in a plan made elsewhere) are stacked as this one, so they are never read as padding
+        self.UNKNOWN_DEPOT = self.instance.number_of_depots
+
+    def to_route_array(self, solutions: List[Solution]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        '''
+        returns (route array, solution of each row, vehicle of each row), only non-empty routes are stacked,
+        unknown depots are replaced by UNKNOWN_DEPOT (always incompatible, see ._count_incompatible_assignments)
+        '''
+        routes = [(solution_idx, vehicle_idx, route)
+                  for solution_idx, solution in enumerate(solutions)
+                  for vehicle_idx, route in solution.items() if len(route) != 0]
+        maximum_route_length = max([len(route) for _, _, route in routes], default=0)
+        route_array = np.full((len(routes), maximum_route_length), self.PADDING, dtype=np.int64)
+        for row, (_, _, route) in enumerate(routes):
+            route_array[row, :len(route)] = route
+        is_in_route = np.arange(maximum_route_length)[None, :] < np.array([len(route) for _, _, route in routes], dtype=np.int64)[:, None]
+        route_array[is_in_route & ((route_array < 0) | (route_array >= self.instance.number_of_depots))] = self.UNKNOWN_DEPOT
+        solutions_of_rows = np.array([solution_idx for solution_idx, _, _ in routes], dtype=np.int64)
+        vehicles_of_rows = np.array([vehicle_idx for _, vehicle_idx, _ in routes], dtype=np.int64)
+        return route_array, solutions_of_rows, vehicles_of_rows
+
+    def _count_unserved_depots(self, route_array: np.ndarray, solutions_of_rows: np.ndarray, number_of_solutions: int) -> np.ndarray:
+        is_served = np.zeros((number_of_solutions, self.instance.number_of_depots + 1), dtype=bool)
+        # unknown depots (and padding) are served into the extra last column, which is never counted
+        depots = np.where((route_array >= 0) & (route_array < self.instance.number_of_depots), route_array, self.instance.number_of_depots)
+        is_served[np.repeat(solutions_of_rows, route_array.shape[1]), depots.ravel()] = True
+        return (~is_served[:, self.all_depot_names]).sum(axis=1)
+
+    def _count_incompatible_assignments(self, route_array: np.ndarray, vehicles_of_rows: np.ndarray) -> np.ndarray:
+        '''
+        per row, depots the vehicle can't deliver, where unknown vehicles / depots can't deliver / be delivered at all
+        '''
+        is_depot = route_array != self.PADDING
+        is_known_depot = is_depot & (route_array >= 0) & (route_array < self.instance.number_of_depots)
+        is_known_depot[is_known_depot] = self.instance.depot_mask[route_array[is_known_depot]]
+        is_known_vehicle = ((vehicles_of_rows >= 0) & (vehicles_of_rows < self.instance.number_of_vehicles))
+        is_known_vehicle[is_known_vehicle] = self.instance.vehicle_mask[vehicles_of_rows[is_known_vehicle]]
+
+        can_be_delivered = is_known_depot & is_known_vehicle[:, None]
+        rows, positions = np.nonzero(can_be_delivered)
+        can_be_delivered[rows, positions] = self.instance.delivery_status[vehicles_of_rows[rows], route_array[rows, positions]] == 1
+        return (is_depot & ~can_be_delivered).sum(axis=1)
+
+    def _check_capacity(self, route_array: np.ndarray, vehicles_of_rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        '''
+        returns (overload, is_out_of_stock) of each row, overload is the demand beyond capacity summed over products
+        and over the trips between replenishments (a product running out exactly, i.e., 0 left, is out of stock without overload)
+        '''
+        warehouse_depot = 0
+        capacity = self.instance.capacity[vehicles_of_rows]
+        remaining = capacity.copy()
+        overload = np.zeros(len(route_array))
+        is_out_of_stock = np.zeros(len(route_array), dtype=bool)
+        route_lengths = (route_array != self.PADDING).sum(axis=1)
+        # same as ConstraintChecker._is_need_to_replenish_during_delivery, only route[1:-1] is discharged
+        for position in range(1, route_array.shape[1] - 1):
+            depots = route_array[:, position]
+            is_discharged = position < route_lengths - 1
+            is_replenished = is_discharged & (depots == warehouse_depot)
+            remaining[is_replenished] = capacity[is_replenished]
+
+            shortage_before = np.maximum(-remaining, 0).sum(axis=1)
+            remaining[is_discharged] -= self.instance.demand[depots[is_discharged]]
+            overload += np.maximum(-remaining, 0).sum(axis=1) - shortage_before
+            is_out_of_stock |= is_discharged & (remaining <= 0).any(axis=1)
+        return overload, is_out_of_stock
+
+    def _check_time_windows(self, route_array: np.ndarray, vehicles_of_rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        '''
+        returns (lateness, earliness, overtime) of each row, in minutes,
+        lateness / earliness are summed over the checked depots, overtime is the largest one of them
+        '''
+        warehouse_depot = 0
+        number_of_rows = len(route_array)
+        # [0, 1, 2, 0, 3, 0] -> [1, 2, 3], replenishments are inserted again below, by Optimizer's rule
+        is_depot = (route_array != self.PADDING) & (route_array != warehouse_depot)
+        positions = np.argsort(~is_depot, axis=1, kind="stable")
+        depot_array = np.where(np.take_along_axis(is_depot, positions, axis=1), np.take_along_axis(route_array, positions, axis=1), 0)
+        route_lengths = is_depot.sum(axis=1)
+
+        delivery_time = self.instance.delivery_time
+        capacity = self.instance.capacity[vehicles_of_rows]
+        shipement_discharging_time = self.instance.shipement_discharging_time[vehicles_of_rows]
+        maximum_available_time = self.instance.maximum_available_time[vehicles_of_rows]
+        remaining = capacity.copy()
+        previous_depots = np.full(number_of_rows, warehouse_depot, dtype=np.int64)
+        elapsed_time = np.zeros(number_of_rows)  # arriving at the current depot
+        lateness = np.zeros(number_of_rows)
+        earliness = np.zeros(number_of_rows)
+        overtime = np.zeros(number_of_rows)
+        for position in range(depot_array.shape[1]):
+            depots = depot_array[:, position]
+            is_active = position < route_lengths
+            remaining_after_discharging = remaining - self.instance.demand[depots]
+            # a shortage point (see Optimizer) is delivered after going back to warehouse depot for replenishing
+            is_shortage_point = is_active & (remaining_after_discharging <= 0).any(axis=1)
+            travel_time = np.where(is_shortage_point,
+                                   delivery_time[previous_depots, warehouse_depot] + delivery_time[warehouse_depot, depots] +
+                                   2 * shipement_discharging_time,
+                                   delivery_time[previous_depots, depots] + shipement_discharging_time)
+            elapsed_time = np.where(is_active, elapsed_time + travel_time, elapsed_time)
+            remaining = np.where(is_shortage_point[:, None], capacity - self.instance.demand[depots],
+                                 np.where(is_active[:, None], remaining_after_discharging, remaining))
+            previous_depots = np.where(is_active, depots, previous_depots)
+
+            # same as ConstraintChecker.is_passing_time_window_constraints, where the route is closed by going back to warehouse depot,
+            # which is preceded by another replenishment if nothing is left
+            is_checked = is_active & (position >= 2) & self.is_time_window_depot[depots]
+            is_closed_with_replenishment = (remaining <= 0).any(axis=1)
+            arrival_time = elapsed_time + np.where(is_closed_with_replenishment,
+                                                   delivery_time[warehouse_depot, warehouse_depot] + shipement_discharging_time, 0)
+            total_time = arrival_time + delivery_time[depots, warehouse_depot] + shipement_discharging_time
+            overtime = np.where(is_checked, np.maximum(overtime, total_time - maximum_available_time), overtime)
+            lateness += np.where(is_checked, np.maximum(arrival_time - self.instance.latest_time_must_be_delivered[depots], 0), 0)
+            earliness += np.where(is_checked, np.maximum(self.instance.earilest_time_can_be_delivered[depots] - arrival_time, 0), 0)
+        return lateness, earliness, overtime
+
+    def check_solutions(self, solutions: List[Solution]) -> Dict[str, np.ndarray]:
+        '''
+        This method is a public API expected to expose to users.
+        Functionality:
+            Checks all 'solutions' at once, returns arrays (one value per solution) of
+                number_of_unserved_depots, number_of_incompatible_assignments,
+                overload (demand beyond capacity), lateness, earliness, overtime (minutes),
+                is_passing_capacity_constraints, is_passing_time_window_constraints and is_valid (same as ConstraintChecker.check_solution)
+        '''
+        return self.check_route_array(*self.to_route_array(solutions), len(solutions))
+
+    def check_route_array(self, route_array: np.ndarray, solutions_of_rows: np.ndarray, vehicles_of_rows: np.ndarray,
+                          number_of_solutions: int) -> Dict[str, np.ndarray]:
+        '''
+        same as .check_solutions, for solutions already stacked by .to_route_array (e.g., shared with other array-based evaluations)
+        '''
+        number_of_incompatible_assignments = self._count_incompatible_assignments(route_array, vehicles_of_rows)
+        # only compatible routes can be measured (their depots and vehicles are known)
+        is_compatible = number_of_incompatible_assignments == 0
+        overload, is_out_of_stock = self._check_capacity(route_array[is_compatible], vehicles_of_rows[is_compatible])
+        lateness, earliness, overtime = self._check_time_windows(route_array[is_compatible], vehicles_of_rows[is_compatible])
+        is_breaking_time_windows = (lateness > 0) | (earliness > 0) | (overtime > 0)
+
+        def sum_by_solution(values: np.ndarray, rows: np.ndarray) -> np.ndarray:
+            return np.bincount(rows, weights=values, minlength=number_of_solutions)
+
+        compatible_solutions_of_rows = solutions_of_rows[is_compatible]
+        violations = {"number_of_unserved_depots": self._count_unserved_depots(route_array, solutions_of_rows, number_of_solutions),
+                      "number_of_incompatible_assignments": sum_by_solution(number_of_incompatible_assignments, solutions_of_rows).astype(np.int64),
+                      "overload": sum_by_solution(overload, compatible_solutions_of_rows),
+                      "lateness": sum_by_solution(lateness, compatible_solutions_of_rows),
+                      "earliness": sum_by_solution(earliness, compatible_solutions_of_rows),
+                      "overtime": sum_by_solution(overtime, compatible_solutions_of_rows)}
+        violations["is_passing_capacity_constraints"] = sum_by_solution(is_out_of_stock, compatible_solutions_of_rows) == 0
+        violations["is_passing_time_window_constraints"] = sum_by_solution(is_breaking_time_windows, compatible_solutions_of_rows) == 0
+        violations["is_valid"] = ((violations["number_of_unserved_depots"] == 0) &
+                                  (violations["number_of_incompatible_assignments"] == 0) &
+                                  violations["is_passing_capacity_constraints"] &
+                                  violations["is_passing_time_window_constraints"])
+        return violations
+
+    def get_penalties(self, violations: Dict[str, np.ndarray], penalty_weights: Dict[str, float] = None) -> np.ndarray:
+        '''
+        This method is a public API expected to expose to users.
+        Functionality:
+            Weighted sum of the violations (see .check_solutions) of each solution, e.g., added to total costs for a penalty-based fitness
+        penalty_weights: cost per unit of each violation, defaults to DEFAULT_PENALTY_WEIGHTS
+        '''
+        if penalty_weights is None:
+            penalty_weights = self.DEFAULT_PENALTY_WEIGHTS
+        for violation_name in penalty_weights:
+            if violation_name not in self.VIOLATION_NAMES:
+                raise ValueError(f"'penalty_weights' must only have the following keys: {self.VIOLATION_NAMES}, given {violation_name}")
+        return sum(weight * violations[violation_name] for violation_name, weight in penalty_weights.items())
@@ -0,0 +1,121 @@
+from typing import List, Tuple
+import numpy as np
+
+
+class BatchMutationStrategy:
+    def __init__(self, immutable_depot_names: List[int], rng: np.random.Generator = None) -> None:
+        '''
+        BatchMutationStrategy is the array version of MutationStrategy,
+        mutating many routes (e.g., the routes of a whole population) with one numpy call per step.
+        -------------------------------------------------------------------------------------------
+        Routes are stored as a 2-D array (one route per row), padded with PADDING, see .to_route_array().
+        Same as MutationStrategy:
+            - only positions of depots not in 'immutable_depot_names' can be chosen,
+            - a mutation affecting (i.e., covering) an immutable depot is rejected, and retried up to MAXIMUM_ATTEMPT times.
+        '''
+        self.immutable_depot_names = np.asarray(sorted(immutable_depot_names), dtype=np.int64)
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.MAXIMUM_ATTEMPT = 10
+        self.PADDING = -1
+
+    def to_route_array(self, routes: List[List[int]]) -> np.ndarray:
+        maximum_route_length = max([len(route) for route in routes], default=0)
+        route_array = np.full((len(routes), maximum_route_length), self.PADDING, dtype=np.int64)
+        for route_idx, route in enumerate(routes):
+            route_array[route_idx, :len(route)] = route
+        return route_array
+
+    def to_routes(self, route_array: np.ndarray) -> List[List[int]]:
+        return [[int(depot_idx) for depot_idx in row if depot_idx != self.PADDING]
+                for row in route_array]
+
+    def mutable_position_mask(self, route_array: np.ndarray) -> np.ndarray:
+        '''
+        True for the positions can be chosen for mutation, precompute it once for a population,
+        it stays valid after mutation, since depots are only moved between mutable positions.
+        '''
+        return (route_array != self.PADDING) & ~np.isin(route_array, self.immutable_depot_names)
+
+    def _choose_two_points(self, route_array: np.ndarray, mutable_mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        '''
+        For every row: draws MAXIMUM_ATTEMPT pairs of mutable positions at once, and picks the first one not affecting immutable depots.
+        returns left and right positions, and whether a valid pair is found.
+        '''
+        number_of_routes, route_length = route_array.shape
+        number_of_mutable_positions = mutable_mask.sum(axis=1)
+        # mutable positions (in order) come first in each row
+        mutable_positions = np.argsort(~mutable_mask, axis=1, kind="stable")
+
+        random_values = self.rng.random((number_of_routes, self.MAXIMUM_ATTEMPT, 2))
+        chosen = np.floor(random_values * number_of_mutable_positions[:, None, None]).astype(np.int64)
+        chosen = np.minimum(chosen, np.maximum(route_length - 1, 0))
+        points = np.take_along_axis(mutable_positions[:, None, :], chosen, axis=2) if route_length else chosen
+        left_positions = points.min(axis=2)
+        right_positions = points.max(axis=2)
+
+        # number of immutable depots in route[left: right + 1], with a prefix sum
+        immutable_mask = (route_array != self.PADDING) & ~mutable_mask
+        immutable_prefix_sum = np.concatenate([np.zeros((number_of_routes, 1), dtype=np.int64),
+                                               np.cumsum(immutable_mask, axis=1)], axis=1)
+        number_of_affected_immutable_depots = (np.take_along_axis(immutable_prefix_sum, right_positions + 1, axis=1) -
+                                               np.take_along_axis(immutable_prefix_sum, left_positions, axis=1))
+        is_valid_attempt = number_of_affected_immutable_depots == 0
+
+        first_valid_attempt = is_valid_attempt.argmax(axis=1)
+        is_found = is_valid_attempt.any(axis=1) & (number_of_mutable_positions >= 2)
+        left_positions = np.take_along_axis(left_positions, first_valid_attempt[:, None], axis=1)[:, 0]
+        right_positions = np.take_along_axis(right_positions, first_valid_attempt[:, None], axis=1)[:, 0]
+        return left_positions, right_positions, is_found
+
+    def two_points_mutate(self, route_array: np.ndarray, mutable_mask: np.ndarray, rows: np.ndarray = None) -> np.ndarray:
+        '''
+        Swaps two depots of each row (in place), returns the rows being changed.
+        rows: only mutate these rows, defaults to all rows
+        '''
+        rows = np.arange(len(route_array)) if rows is None else np.asarray(rows, dtype=np.int64)
+        if len(rows) == 0 or route_array.shape[1] == 0:
+            return np.empty(0, dtype=np.int64)
+        left_positions, right_positions, is_found = self._choose_two_points(route_array[rows], mutable_mask[rows])
+        is_changed = is_found & (left_positions < right_positions)
+        changed_rows = rows[is_changed]
+        left_positions = left_positions[is_changed]
+        right_positions = right_positions[is_changed]
+
+        left_depots = route_array[changed_rows, left_positions]
+        route_array[changed_rows, left_positions] = route_array[changed_rows, right_positions]
+        route_array[changed_rows, right_positions] = left_depots
+        return changed_rows
+
+    def reverse_mutate(self, route_array: np.ndarray, mutable_mask: np.ndarray, rows: np.ndarray = None) -> np.ndarray:
+        '''
+        Reverses route[left: right + 1] of each row (in place), returns the rows being changed.
+        rows: only mutate these rows, defaults to all rows
+        '''
+        rows = np.arange(len(route_array)) if rows is None else np.asarray(rows, dtype=np.int64)
+        if len(rows) == 0 or route_array.shape[1] == 0:
+            return np.empty(0, dtype=np.int64)
+        left_positions, right_positions, is_found = self._choose_two_points(route_array[rows], mutable_mask[rows])
+        is_changed = is_found & (left_positions < right_positions)
+        changed_rows = rows[is_changed]
+        left_positions = left_positions[is_changed, None]
+        right_positions = right_positions[is_changed, None]
+
+        # position j in [left, right] takes the depot at (left + right - j), the rest stay
+        positions = np.arange(route_array.shape[1])[None, :]
+        is_in_segment = (positions >= left_positions) & (positions <= right_positions)
+        source_positions = np.where(is_in_segment, left_positions + right_positions - positions, positions)
+        route_array[changed_rows] = np.take_along_axis(route_array[changed_rows], source_positions, axis=1)
+        return changed_rows
+
+    def mutate(self, route_array: np.ndarray, mutable_mask: np.ndarray, mutation_rate: float) -> np.ndarray:
+        '''
+        Each row is mutated with probability 'mutation_rate', by reverse_mutate or two_points_mutate (uniformly chosen),
+        returns the rows being changed (to be re-evaluated).
+        '''
+        random_values = self.rng.random((len(route_array), 2))
+        rows_to_mutate = np.flatnonzero(random_values[:, 0] < mutation_rate)
+        is_reverse = random_values[rows_to_mutate, 1] < 0.5
+
+        reversed_rows = self.reverse_mutate(route_array, mutable_mask, rows_to_mutate[is_reverse])
+        swapped_rows = self.two_points_mutate(route_array, mutable_mask, rows_to_mutate[~is_reverse])
+        return np.sort(np.concatenate([reversed_rows, swapped_rows]))
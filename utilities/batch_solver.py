@@ -0,0 +1,148 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from time import time
+from typing import Dict, Iterator, List
+import numpy as np
+from .base_class import DEFAULT_BASE_DIR, DEFAULT_MATRIX_OPTIONS, BuilderFactory
+from .depot_file import DepotFile
+from .genetic_algorithm import GeneticAlgorithm
+from .scenario import Scenario
+from .shared_instance import SharedInstance
+from .solve_result import SolveResult
+
+
+# static data (i.e., the BuilderFactory) of each worker process, loaded once per worker.
+_worker_factory = None
+
+
+def _initialize_worker(BASE_DIR: str, matrix_options: Dict[str, object], shared_instance_descriptor: Dict[str, object] = None) -> None:
+    global _worker_factory
+    # with 'fork', the factory loaded by the parent process is inherited (copy-on-write), so nothing is loaded again,
+    # options not given are the defaults, so e.g., a "sparse" factory loaded earlier isn't reused for a call asking for none
+    if (_worker_factory is not None and _worker_factory.depot_files.demand == DepotFile(BASE_DIR).demand
+            and _worker_factory.matrix_options == {**DEFAULT_MATRIX_OPTIONS, **matrix_options}):
+        return
+    if shared_instance_descriptor is not None:
+        # c_ij / t_ij are attached from shared memory rather than read from csv files
+        _worker_factory = SharedInstance.attach(shared_instance_descriptor).to_factory()
+        return
+    _worker_factory = BuilderFactory(BASE_DIR, **matrix_options)
+
+
+def _solve_scenario(scenario: Scenario, genetic_algorithm_params: Dict[str, float], verbose: bool,
+                    seed: np.random.SeedSequence = None) -> SolveResult:
+    start_time = time()
+    scenario_factory = scenario.apply(_worker_factory)
+    # progress printing of many solvers running at the same time is not readable, so it is off by default
+    genetic_algorithm = GeneticAlgorithm(**genetic_algorithm_params, factory=scenario_factory, verbose=verbose, seed=seed)
+    genetic_algorithm.solve()
+
+    result = genetic_algorithm.result
+    result.name = scenario.name
+    result.elapsed_time = time() - start_time
+    return result
+
+
+def solve_many(scenarios: List[Scenario],
+               workers: int = None,
+               BASE_DIR: str = DEFAULT_BASE_DIR,
+               population_size: int = 30,
+               mutation_rate: float = 0.3,
+               crossover_rate: float = 0.7,
+               maximum_iteration: int = 20,
+               matrix_options: Dict[str, object] = None,
+               verbose: bool = False,
+               use_shared_memory: bool = False,
+               factory: BuilderFactory = None,
+               time_limit: float = None,
+               seed: int = None) -> Iterator[SolveResult]:
+    '''
+    This function is a public API expected to expose to users.
+    Functionality:
+        Solve many variants (Scenario) of the same instance (BASE_DIR) with GeneticAlgorithm,
+        yielding a SolveResult (named after its scenario) as soon as each scenario is solved.
+
+    The instance is loaded once per worker, and only the scenario overrides are sent to the workers.
+    Scenarios are scheduled longest-first (by Scenario.estimated_workload) to keep all workers busy.
+    Stopping early (e.g., break) cancels the scenarios not started yet, only the ones being solved are waited for.
+    workers: number of worker processes, defaults to the number of cpus, 1 means solving in the current process.
+    use_shared_memory: publish the instance once into shared memory (see SharedInstance), which workers attach instead of
+                       reading csv files, ignored where workers are forked (they inherit the instance), i.e., only used where 'fork' is not available
+    factory: an already loaded instance to solve instead of BASE_DIR (e.g., with Scenario overrides applied),
+             spawned workers always attach it from shared memory
+    time_limit: seconds each scenario may run, see GeneticAlgorithm
+    seed: each scenario is solved with its own seed spawned from it (by the order of 'scenarios'),
+          so results don't depend on the number of workers or the order scenarios finish in
+    '''
+    if matrix_options is None:
+        matrix_options = {}
+    genetic_algorithm_params = {"population_size": population_size,
+                                "mutation_rate": mutation_rate,
+                                "crossover_rate": crossover_rate,
+                                "maximum_iteration": maximum_iteration,
+                                "time_limit": time_limit}
+    # spawned from the order given, as scheduling sorts scenarios by workload
+    scenario_seeds = np.random.SeedSequence(seed).spawn(len(scenarios)) if seed is not None else [None] * len(scenarios)
+    scenarios = list(zip(scenarios, scenario_seeds))
+
+    global _worker_factory
+    if factory is None:
+        yield from _solve_many(scenarios, workers, BASE_DIR, matrix_options, genetic_algorithm_params, verbose, use_shared_memory)
+        return
+    # inherited by forked workers as it is, spawned ones can only get it (with its overrides) from shared memory
+    previous_worker_factory = _worker_factory
+    _worker_factory = factory
+    try:
+        # 'matrix_options' doesn't apply to an already loaded factory, its own are what the workers must match
+        yield from _solve_many(scenarios, workers, os.path.dirname(factory.depot_files.demand), factory.matrix_options, genetic_algorithm_params,
+                               verbose, use_shared_memory or "fork" not in multiprocessing.get_all_start_methods())
+    finally:
+        # later calls loading the same BASE_DIR must not get this factory
+        _worker_factory = previous_worker_factory
+
+
+def _solve_many(scenarios: List['tuple[Scenario, np.random.SeedSequence]'],
+                workers: int,
+                BASE_DIR: str,
+                matrix_options: Dict[str, object],
+                genetic_algorithm_params: Dict[str, float],
+                verbose: bool,
+                use_shared_memory: bool) -> Iterator[SolveResult]:
+    _initialize_worker(BASE_DIR, matrix_options)
+    scheduled_scenarios = sorted(scenarios,
+                                 key=lambda scenario_and_seed: scenario_and_seed[0].estimated_workload(_worker_factory),
+                                 reverse=True)
+    # fail fast in the parent process, rather than in a worker
+    for scenario, _ in scheduled_scenarios:
+        scenario.apply(_worker_factory)
+
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if workers <= 1:
+        for scenario, seed in scheduled_scenarios:
+            yield _solve_scenario(scenario, genetic_algorithm_params, verbose, seed)
+        return
+
+    context = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn")
+    # forked workers inherit the factory, so the instance is only published for spawned ones
+    shared_instance = SharedInstance.publish(_worker_factory) if use_shared_memory and context.get_start_method() != "fork" else None
+    try:
+        with ProcessPoolExecutor(max_workers=min(workers, len(scheduled_scenarios) or 1),
+                                 mp_context=context,
+                                 initializer=_initialize_worker,
+                                 initargs=(BASE_DIR, matrix_options, None if shared_instance is None else shared_instance.descriptor)) as executor:
+            # submitted in order, so the longest scenarios start first
+            futures = [executor.submit(_solve_scenario, scenario, genetic_algorithm_params, verbose, seed)
+                       for scenario, seed in scheduled_scenarios]
+            try:
+                for future in as_completed(futures):
+                    yield future.result()
+            finally:
+                # e.g., the caller stopped early, scenarios not started yet are dropped rather than solved before shutting down
+                for future in futures:
+                    future.cancel()
+    finally:
+        if shared_instance is not None:
+            shared_instance.close()
+            shared_instance.unlink()
@@ -10,10 +10,10 @@ Solution = Dict[int, List[int]]
 
 
 class ConstraintChecker(BuilderFactory):
-    def __init__(self) -> None:
-        super().__init__()
-        self.resource_calc = RouteResourceCalculator()
-        self.optimizer = Optimizer()
+    def __init__(self, factory: BuilderFactory = None) -> None:
+        super().__init__(factory=factory)
+        self.resource_calc = RouteResourceCalculator(self)
+        self.optimizer = Optimizer(self)
 
     def _is_need_to_replenish_during_delivery(self, vehicle_idx: int, route: List[int]) -> bool:
         '''
@@ -34,16 +34,14 @@ class ConstraintChecker(BuilderFactory):
         return False
 
     def _is_all_depots_servered(self, solution: Solution) -> bool:
-        all_depots = deepcopy(self.depots.all_depot_names)
-
+        servered_depots = set()
         for route in solution.values():
-            for depot_idx in route:
-                if depot_idx in all_depots:
-                    all_depots.remove(depot_idx)
-        return len(all_depots) == 0
+            servered_depots.update(route)
+        return servered_depots.issuperset(self.depots.all_depot_names)
 
     def is_passing_time_window_constraints(self, vehicle_idx: int, temp_assinged_route: List[int], checking_depot_idx: int) -> bool:
-
+        if self.evaluation_backend is not None:
+            return self.evaluation_backend.is_passing_time_window_constraints(vehicle_idx, temp_assinged_route, checking_depot_idx)
         checking_depot = self.depots[checking_depot_idx]  # Depot class
         current_vehicle = self.vehicles[vehicle_idx]  # Vehicle class
         warehose_depot = 0
@@ -98,3 +96,37 @@ class ConstraintChecker(BuilderFactory):
                 return False
 
         return True
+
+    def check_solution(self, solution: Solution) -> Dict[str, bool]:
+        '''
+        This method is a public API expected to expose to users.
+        Functionality:
+            Check a given (complete) solution against all constraints
+        '''
+        all_depot_names = set(self.depots.all_depot_names)
+        all_vehicle_names = set(self.vehicles.all_vehicle_names)
+
+        is_vehicle_compatible = True
+        is_passing_capacity_constraints = True
+        is_passing_time_window_constraints = True
+        for vehicle_idx, route in solution.items():
+            if len(route) == 0:
+                continue
+            if (vehicle_idx not in all_vehicle_names) or any(depot_idx not in all_depot_names for depot_idx in route):
+                is_vehicle_compatible = False
+                continue
+            if not all(self.vehicles[vehicle_idx].is_depot_can_be_delivered(depot_idx) for depot_idx in route):
+                is_vehicle_compatible = False
+                continue
+            if self._is_need_to_replenish_during_delivery(vehicle_idx, route):
+                is_passing_capacity_constraints = False
+            if not self.is_all_depots_passing_time_window_constraints(vehicle_idx, route):
+                is_passing_time_window_constraints = False
+
+        is_all_depots_servered = self._is_all_depots_servered(solution)
+        return {"is_all_depots_servered": is_all_depots_servered,
+                "is_vehicle_compatible": is_vehicle_compatible,
+                "is_passing_capacity_constraints": is_passing_capacity_constraints,
+                "is_passing_time_window_constraints": is_passing_time_window_constraints,
+                "is_valid": (is_all_depots_servered and is_vehicle_compatible and
+                             is_passing_capacity_constraints and is_passing_time_window_constraints)}
@@ -0,0 +1,282 @@
+from typing import Dict, List, Tuple
+import numpy as np
+from .base_class import BuilderFactory
+from .constraint_checker import ConstraintChecker
+# e.g.,  {0: [], 1: [0, 8, 6, 0], 2: [0, 7, 5, 0], 3: [0, 3, 0], 4: []}
+Solution = Dict[int, List[int]]
+
+
+class ConstructiveHeuristic:
+    def __init__(self,
+                 factory: BuilderFactory = None,
+                 seed: int = None,
+                 noise: float = 0.1,
+                 regret_level: int = 2) -> None:
+        '''
+        ConstructiveHeuristic builds feasible solutions directly from the cost matrices, delivery status (a_ik) and time windows,
+        instead of randomly assigning depots and retrying (see SolutionGenerator).
+        -------------------------------------------------------------------------------------------
+        Params:
+        seed: seed of the random tie-breaking, the same seed always gives the same solutions
+        noise: savings and insertion costs are multiplied by a random factor in [1 - noise, 1 + noise] (except the first solution of each method),
+               which diversifies the seed population
+        regret_level: k of the regret-k insertion, i.e., how many of the best routes of a depot are compared
+
+        P.S. capacity is respected the same way as the rest of the package,
+        i.e., replenishment points are inserted by Optimizer, and the route (with its replenishments) must fit the vehicle's available time.
+        '''
+        if regret_level < 2:
+            raise ValueError(f"'regret_level' must be at least 2, given {regret_level}")
+        self.factory = factory if factory is not None else BuilderFactory()
+        # thousands of candidate routes are checked, so the array evaluation backend is used (same results as the reference)
+        checking_factory = BuilderFactory(factory=self.factory)
+        if checking_factory.evaluation_backend is None:
+            checking_factory.use_evaluation_backend("auto")
+        self.checker = ConstraintChecker(checking_factory)
+        self.rng = np.random.default_rng(seed)
+        self.noise = noise
+        self.regret_level = regret_level
+
+        warehouse_depot = 0
+        self.all_depot_names = [depot_idx for depot_idx in self.checker.depots.all_depot_names if depot_idx != warehouse_depot]
+        self.all_vehicle_names = sorted(self.checker.vehicles.all_vehicle_names)
+        # vehicles of the same type have the same feasible routes, so feasibility is only checked once per type
+        self.vehicle_types = {vehicle_idx: self._get_vehicle_type(vehicle_idx) for vehicle_idx in self.all_vehicle_names}
+        self._feasibility_cache: Dict[Tuple[tuple, Tuple[int, ...]], bool] = {}
+        self._route_cost_cache: Dict[Tuple[int, Tuple[int, ...]], float] = {}
+
+    def _get_vehicle_type(self, vehicle_idx: int) -> tuple:
+        vehicle = self.checker.vehicles[vehicle_idx]
+        return (tuple(sorted(vehicle.capacity.items())),
+                vehicle.maximum_available_time,
+                vehicle.shipement_discharging_time,
+                tuple(vehicle.available_depots))
+
+    def _randomize(self, value: float, is_randomized: bool) -> float:
+        if not is_randomized or self.noise == 0:
+            return value
+        return value * (1 + self.noise * self.rng.uniform(-1, 1))
+
+    def _is_feasible_route(self, vehicle_idx: int, route: List[int]) -> bool:
+        '''
+        route: without warehouse depot, e.g., [1,2,3]
+        '''
+        key = (self.vehicle_types[vehicle_idx], tuple(route))
+        if key not in self._feasibility_cache:
+            vehicle = self.checker.vehicles[vehicle_idx]
+            is_feasible = all(vehicle.is_depot_can_be_delivered(depot_idx) for depot_idx in route)
+            if is_feasible:
+                is_feasible = self.checker.is_all_depots_passing_time_window_constraints(vehicle_idx, route)
+            if is_feasible:
+                non_shortage_route = self.checker.optimizer.insert_warehouse_depots_and_relenishment_points(vehicle_idx, route)
+                total_time = self.checker.resource_calc._calculate_time_for_current_route(vehicle_idx, non_shortage_route)
+                is_feasible = total_time <= vehicle.maximum_available_time
+            self._feasibility_cache[key] = is_feasible
+        return self._feasibility_cache[key]
+
+    def _calculate_route_cost(self, vehicle_idx: int, route: List[int]) -> float:
+        if len(route) == 0:
+            return 0
+        # identical vehicles (see VehicleBuilder.vehicle_types) cost the same, so costs are cached once per vehicle type
+        key = (self.checker.vehicles.vehicle_types[vehicle_idx], tuple(route))
+        if key not in self._route_cost_cache:
+            non_shortage_route = self.checker.optimizer.insert_warehouse_depots_and_relenishment_points(vehicle_idx, route)
+            resources = self.checker.resource_calc.calculate_route_resources(vehicle_idx, non_shortage_route)
+            self._route_cost_cache[key] = resources["fuel_fee"] + resources["vehicle_total_fixed_cost"] + resources["driver_cost"]
+        return self._route_cost_cache[key]
+
+    def _find_feasible_vehicles(self, route: List[int]) -> List[int]:
+        '''
+        One vehicle per vehicle type which can complete 'route'
+        '''
+        feasible_vehicles = []
+        checked_vehicle_types = set()
+        for vehicle_idx in self.all_vehicle_names:
+            vehicle_type = self.vehicle_types[vehicle_idx]
+            if vehicle_type in checked_vehicle_types:
+                continue
+            checked_vehicle_types.add(vehicle_type)
+            if self._is_feasible_route(vehicle_idx, route):
+                feasible_vehicles.append(vehicle_idx)
+        return feasible_vehicles
+
+    def _find_cheapest_insertion(self, vehicle_idx: int, route: List[int], route_cost: float,
+                                 depot_idx: int, is_randomized: bool) -> 'Tuple[float, int] | None':
+        '''
+        returns (cost increase, position) of inserting 'depot_idx' into 'route', or None if it can't be inserted anywhere
+        '''
+        if not self.checker.vehicles[vehicle_idx].is_depot_can_be_delivered(depot_idx):
+            return None
+        cheapest_insertion = None
+        for position in range(len(route) + 1):
+            inserted_route = [*route[:position], depot_idx, *route[position:]]
+            if not self._is_feasible_route(vehicle_idx, inserted_route):
+                continue
+            cost_increase = self._randomize(self._calculate_route_cost(vehicle_idx, inserted_route) - route_cost, is_randomized)
+            if cheapest_insertion is None or cost_increase < cheapest_insertion[0]:
+                cheapest_insertion = (cost_increase, position)
+        return cheapest_insertion
+
+    def _insert_by_regret(self, routes: Dict[int, List[int]], unassigned_depots: List[int], is_randomized: bool) -> List[int]:
+        '''
+        Regret-k insertion: repeatedly inserts the depot which would lose the most if it is not inserted now
+        (i.e., the difference between its best and k-th best route), at its cheapest position.
+        'routes' (without warehouse depot) is modified in place, returns the depots can't be inserted anywhere.
+        '''
+        unassigned_depots = list(unassigned_depots)
+        route_costs = {vehicle_idx: self._calculate_route_cost(vehicle_idx, route) for vehicle_idx, route in routes.items()}
+        cheapest_insertions = {depot_idx: {vehicle_idx: self._find_cheapest_insertion(vehicle_idx, route, route_costs[vehicle_idx],
+                                                                                      depot_idx, is_randomized)
+                                           for vehicle_idx, route in routes.items()}
+                               for depot_idx in unassigned_depots}
+
+        while len(unassigned_depots) != 0:
+            chosen_depot_idx = None
+            chosen_priority = None
+            for depot_idx in unassigned_depots:
+                cost_increases = sorted(insertion[0] for insertion in cheapest_insertions[depot_idx].values() if insertion is not None)
+                if len(cost_increases) == 0:
+                    continue
+                # depots with fewer than k feasible routes go first, then the largest regret
+                number_of_missing_routes = self.regret_level - min(len(cost_increases), self.regret_level)
+                regret = sum(cost_increases[min(level, len(cost_increases) - 1)] - cost_increases[0]
+                             for level in range(1, self.regret_level))
+                priority = (number_of_missing_routes, regret)
+                if chosen_priority is None or priority > chosen_priority:
+                    chosen_depot_idx = depot_idx
+                    chosen_priority = priority
+            if chosen_depot_idx is None:
+                break
+
+            insertions = cheapest_insertions.pop(chosen_depot_idx)
+            vehicle_idx = min((vehicle_idx for vehicle_idx, insertion in insertions.items() if insertion is not None),
+                              key=lambda vehicle_idx: insertions[vehicle_idx][0])
+            position = insertions[vehicle_idx][1]
+            routes[vehicle_idx].insert(position, chosen_depot_idx)
+            route_costs[vehicle_idx] = self._calculate_route_cost(vehicle_idx, routes[vehicle_idx])
+            unassigned_depots.remove(chosen_depot_idx)
+            # only the insertions into the changed route need to be updated
+            for depot_idx in unassigned_depots:
+                cheapest_insertions[depot_idx][vehicle_idx] = self._find_cheapest_insertion(
+                    vehicle_idx, routes[vehicle_idx], route_costs[vehicle_idx], depot_idx, is_randomized)
+        return unassigned_depots
+
+    def _merge_routes_by_savings(self, is_randomized: bool) -> List[List[int]]:
+        '''
+        Clarke-Wright savings: starting from one route per depot, merges route ending at i with route starting at j,
+        in descending order of saving(i, j) = distance(i, 0) + distance(0, j) - distance(i, j),
+        as long as some vehicle can complete the merged route.
+        '''
+        warehouse_depot = 0
+        depots = self.checker.depots
+        savings = []
+        for start_depot_idx in self.all_depot_names:
+            for end_depot_idx in self.all_depot_names:
+                if start_depot_idx == end_depot_idx:
+                    continue
+                saving = (depots[start_depot_idx].get_distance_to_depot(warehouse_depot)
+                          + depots[warehouse_depot].get_distance_to_depot(end_depot_idx)
+                          - depots[start_depot_idx].get_distance_to_depot(end_depot_idx))
+                if saving > 0:
+                    savings.append((self._randomize(saving, is_randomized), start_depot_idx, end_depot_idx))
+        savings.sort(reverse=True)
+
+        routes = {depot_idx: [depot_idx] for depot_idx in self.all_depot_names}  # keyed by an id (first depot of the initial route)
+        route_ids = {depot_idx: depot_idx for depot_idx in self.all_depot_names}
+        for _, start_depot_idx, end_depot_idx in savings:
+            start_route_id = route_ids[start_depot_idx]
+            end_route_id = route_ids[end_depot_idx]
+            if start_route_id == end_route_id:
+                continue
+            if routes[start_route_id][-1] != start_depot_idx or routes[end_route_id][0] != end_depot_idx:
+                continue
+            merged_route = [*routes[start_route_id], *routes[end_route_id]]
+            if len(self._find_feasible_vehicles(merged_route)) == 0:
+                continue
+            routes[start_route_id] = merged_route
+            for depot_idx in routes.pop(end_route_id):
+                route_ids[depot_idx] = start_route_id
+        return list(routes.values())
+
+    def _assign_vehicles_to_routes(self, merged_routes: List[List[int]], is_randomized: bool) -> Tuple[Dict[int, List[int]], List[int]]:
+        '''
+        Routes with the fewest feasible vehicle types are assigned first, each to its cheapest free feasible vehicle,
+        returns routes of all vehicles (without warehouse depot) and the depots of routes no free vehicle can complete.
+        '''
+        routes = {vehicle_idx: [] for vehicle_idx in self.all_vehicle_names}
+        unassigned_depots = []
+        feasible_vehicle_types = {tuple(route): set(self.vehicle_types[vehicle_idx] for vehicle_idx in self._find_feasible_vehicles(route))
+                                  for route in merged_routes}
+        merged_routes = sorted(merged_routes, key=lambda route: (len(feasible_vehicle_types[tuple(route)]), -len(route)))
+        for route in merged_routes:
+            free_vehicles = [vehicle_idx for vehicle_idx in self.all_vehicle_names
+                             if len(routes[vehicle_idx]) == 0 and self.vehicle_types[vehicle_idx] in feasible_vehicle_types[tuple(route)]]
+            if len(free_vehicles) == 0:
+                unassigned_depots.extend(route)
+                continue
+            vehicle_idx = min(free_vehicles, key=lambda vehicle_idx: self._randomize(self._calculate_route_cost(vehicle_idx, route), is_randomized))
+            routes[vehicle_idx] = list(route)
+        return routes, unassigned_depots
+
+    def _to_solution(self, routes: Dict[int, List[int]]) -> Solution:
+        return {vehicle_idx: (self.checker.optimizer.insert_warehouse_depots_and_relenishment_points(vehicle_idx, route)
+                              if len(route) != 0 else [])
+                for vehicle_idx, route in sorted(routes.items())}
+
+    def savings_solution(self, is_randomized: bool = False) -> Solution:
+        '''
+        This method is a public API expected to expose to users.
+        Functionality:
+            Builds a solution with Clarke-Wright savings, then assigns the merged routes to vehicles.
+            Depots of the routes left without a vehicle are inserted by regret insertion.
+            Raises ValueError if some depots can't be inserted into any route.
+        '''
+        merged_routes = self._merge_routes_by_savings(is_randomized)
+        routes, unassigned_depots = self._assign_vehicles_to_routes(merged_routes, is_randomized)
+        depots_cannot_be_inserted = self._insert_by_regret(routes, unassigned_depots, is_randomized)
+        if len(depots_cannot_be_inserted) != 0:
+            raise ValueError(f"Depots {depots_cannot_be_inserted} can't be inserted into any route")
+        return self._to_solution(routes)
+
+    def regret_insertion_solution(self, is_randomized: bool = False) -> Solution:
+        '''
+        This method is a public API expected to expose to users.
+        Functionality:
+            Builds a solution by regret-k insertion of all depots, starting from empty routes.
+            Raises ValueError if some depots can't be inserted into any route.
+        '''
+        routes = {vehicle_idx: [] for vehicle_idx in self.all_vehicle_names}
+        # the tightest depots first, they have the fewest feasible positions
+        unassigned_depots = sorted(self.all_depot_names, key=lambda depot_idx: self.checker.depots[depot_idx].latest_time_must_be_delivered)
+        depots_cannot_be_inserted = self._insert_by_regret(routes, unassigned_depots, is_randomized)
+        if len(depots_cannot_be_inserted) != 0:
+            raise ValueError(f"Depots {depots_cannot_be_inserted} can't be inserted into any route")
+        return self._to_solution(routes)
+
+    def generate_solutions(self, number_of_solutions: int, methods: List[str] = None) -> List[Solution]:
+        '''
+        This method is a public API expected to expose to users.
+        Functionality:
+            Generates up to 'number_of_solutions' distinct solutions, alternating 'methods' ("savings", "regret").
+            The first solution of each method is not randomized, the others are.
+            Fewer solutions are returned if the methods fail or keep producing duplicates (at most 'number_of_solutions' * 5 attempts).
+        '''
+        methods = methods if methods is not None else ["savings", "regret"]
+        constructors = {"savings": self.savings_solution, "regret": self.regret_insertion_solution}
+        for method in methods:
+            if method not in constructors:
+                raise ValueError(f"'methods' must be some of the following: {list(constructors.keys())}, given {method}")
+
+        solutions = []
+        maximum_attempt = number_of_solutions * 5
+        for attempt in range(maximum_attempt):
+            if len(solutions) >= number_of_solutions:
+                break
+            is_randomized = attempt >= len(methods)
+            try:
+                solution = constructors[methods[attempt % len(methods)]](is_randomized)
+            except ValueError:
+                continue
+            if solution not in solutions:
+                solutions.append(solution)
+        return solutions
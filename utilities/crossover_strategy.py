@@ -1,24 +1,47 @@
-from typing import List, Dict
+from typing import Callable, List, Dict
 from copy import deepcopy
-from random import choice
+from .base_class import BuilderFactory
+from .giant_tour import GiantTour
 from .optimizer import Optimizer
+from .random_stream import RandomStream, get_default_random_stream
+from .split_decoder import SplitDecoder
 Solution = Dict[int, List[int]]
 
 
 class CrossoverStrategy:
-    def __init__(self, solution: Solution, immutable_depot_names: List[int], vehicles_can_be_chosen_for_crossover: List[int]) -> None:
-        self.optimizer = Optimizer()
+    OPERATOR_NAMES = ["single_point_crossover", "order_crossover", "partially_mapped_crossover", "route_based_crossover",
+                      "split_order_crossover"]
+
+    def __init__(self, solution: Solution, immutable_depot_names: List[int], vehicles_can_be_chosen_for_crossover: List[int],
+                 factory: BuilderFactory = None, random_stream: RandomStream = None) -> None:
+        '''
+        All crossovers return two children solutions, which are repaired by GiantTour (i.e., every depot delivered once,
+        by a vehicle can deliver it, within time windows, with replenishment points),
+        a child that can't be repaired is replaced by its parent.
+        '''
+        if factory is None:
+            factory = BuilderFactory()
+        self.optimizer = Optimizer(factory)
+        self.giant_tour = GiantTour(factory)
+        self.factory = factory
+        self._split_decoder = None
 
         self.solution = deepcopy(solution)
         self.immutable_depot_names = immutable_depot_names
         self.vehicles_can_be_chosen_for_crossover = vehicles_can_be_chosen_for_crossover
         self.MAXIMUM_ATTEMPT = 10
+        self.random_stream = random_stream if random_stream is not None else get_default_random_stream()
+
+    @property
+    def crossover_operators(self) -> Dict[str, Callable]:
+        return {operator_name: getattr(self, operator_name) for operator_name in self.OPERATOR_NAMES}
 
     def single_point_crossover(self, _other_solution: Solution, other_solution_chromosome_vehicles_can_be_chosen_for_crossover: List[int]) -> List[Solution]:
         if (len(other_solution_chromosome_vehicles_can_be_chosen_for_crossover) == 0 or len(self.vehicles_can_be_chosen_for_crossover) == 0):
             return [self.solution, _other_solution]
 
-        _other_solution = deepcopy(_other_solution)
+        child_x_solution = deepcopy(self.solution)
+        child_y_solution = deepcopy(_other_solution)
         self_vehicle_idx = self._randomly_choose_a_vehicle()
         other_vehicle_idx = self._randomly_choose_a_vehicle_for_other_solution(
             other_solution_chromosome_vehicles_can_be_chosen_for_crossover)
@@ -26,46 +49,154 @@ class CrossoverStrategy:
         number_of_attempts_to_find_index = 0
         while number_of_attempts_to_find_index < self.MAXIMUM_ATTEMPT:
             self_depot = self._randomly_choose_a_depot_in_a_route(
-                self.solution[self_vehicle_idx])
+                child_x_solution[self_vehicle_idx])
             other_depot = self._randomly_choose_a_depot_in_a_route(
-                _other_solution[other_vehicle_idx])
+                child_y_solution[other_vehicle_idx])
             number_of_attempts_to_find_index += 1
             if self_depot != other_depot:
                 break
             
-        self_depot_idx = self.solution[self_vehicle_idx].index(self_depot)
-        other_depot_idx = _other_solution[other_vehicle_idx].index(other_depot)
-
-        self.solution[self_vehicle_idx].remove(self_depot)
-        self.solution[self_vehicle_idx].insert(self_depot_idx, other_depot)
-
-        _other_solution[other_vehicle_idx].remove(other_depot)
-        _other_solution[other_vehicle_idx].insert(other_depot_idx, self_depot_idx)
-
-        self._insert_replenish_points_for_current_vehicle(self_vehicle_idx, self.solution)
-        self._insert_replenish_points_for_current_vehicle(other_vehicle_idx, _other_solution)
-
+        self_depot_idx = child_x_solution[self_vehicle_idx].index(self_depot)
+        other_depot_idx = child_y_solution[other_vehicle_idx].index(other_depot)
+
+        child_x_solution[self_vehicle_idx].remove(self_depot)
+        child_x_solution[self_vehicle_idx].insert(self_depot_idx, other_depot)
+
+        child_y_solution[other_vehicle_idx].remove(other_depot)
+        child_y_solution[other_vehicle_idx].insert(other_depot_idx, self_depot)
+
+        # the swapped depots may now be duplicated / missing, repairing also re-plans replenishment points
+        return self._repair_children(child_x_solution, child_y_solution, _other_solution)  # as child_x and child_y
+
+    def order_crossover(self, _other_solution: Solution, other_solution_chromosome_vehicles_can_be_chosen_for_crossover: List[int]) -> List[Solution]:
+        '''
+        OX on giant tours: a child keeps a segment of its parent, and the other depots follow the order in the other parent.
+        '''
+        return self._crossover_giant_tours(_other_solution, self._order_crossover_permutations)
+
+    def partially_mapped_crossover(self, _other_solution: Solution, other_solution_chromosome_vehicles_can_be_chosen_for_crossover: List[int]) -> List[Solution]:
+        '''
+        PMX on giant tours: a child keeps a segment of its parent, and the other depots stay at the positions of the other parent,
+        mapped through the segment if they are already in it.
+        '''
+        return self._crossover_giant_tours(_other_solution, self._partially_mapped_crossover_permutations)
+
+    @property
+    def split_decoder(self) -> SplitDecoder:
+        # only built when needed, a CrossoverStrategy is created for every chromosome
+        if self._split_decoder is None:
+            self._split_decoder = SplitDecoder(self.factory)
+        return self._split_decoder
+
+    def split_order_crossover(self, _other_solution: Solution, other_solution_chromosome_vehicles_can_be_chosen_for_crossover: List[int]) -> List[Solution]:
+        '''
+        OX on whole giant tours (vehicle assignment is not inherited), children are decoded by the optimal split (see SplitDecoder).
+        '''
+        self_giant_tour = self.split_decoder.encode(self.solution)
+        other_giant_tour = self.split_decoder.encode(_other_solution)
+        if len(self_giant_tour) < 2 or sorted(self_giant_tour) != sorted(other_giant_tour):
+            return [self.solution, _other_solution]
+        child_x_solution = self.split_decoder.decode(self._order_crossover_permutations(self_giant_tour, other_giant_tour))
+        child_y_solution = self.split_decoder.decode(self._order_crossover_permutations(other_giant_tour, self_giant_tour))
+        return [child_x_solution if child_x_solution is not None else self.solution,
+                child_y_solution if child_y_solution is not None else _other_solution]
+
+    def route_based_crossover(self, _other_solution: Solution, other_solution_chromosome_vehicles_can_be_chosen_for_crossover: List[int]) -> List[Solution]:
+        '''
+        A child takes the whole route of a vehicle from the other parent, the depots displaced are re-inserted by repairing.
+        Routes are exchanged between vehicles of the same type (see VehicleBuilder.vehicle_types) rather than the same vehicle,
+        as parents may use different ones of identical vehicles for the same route.
+        '''
+        vehicle_types = self.factory.vehicles.vehicle_types
+        other_vehicles_of_types = {}
+        for other_vehicle_idx in other_solution_chromosome_vehicles_can_be_chosen_for_crossover:
+            other_vehicles_of_types.setdefault(vehicle_types[other_vehicle_idx], []).append(other_vehicle_idx)
+        vehicles_can_be_chosen = [vehicle_idx for vehicle_idx in self.vehicles_can_be_chosen_for_crossover
+                                  if vehicle_types[vehicle_idx] in other_vehicles_of_types]
+        if len(vehicles_can_be_chosen) == 0:
+            return [self.solution, _other_solution]
+        vehicle_idx = self.random_stream.choice(vehicles_can_be_chosen)
+        other_vehicle_idx = self.random_stream.choice(other_vehicles_of_types[vehicle_types[vehicle_idx]])
+        child_x_solution = self._replace_route(self.solution, vehicle_idx, _other_solution[other_vehicle_idx])
+        child_y_solution = self._replace_route(_other_solution, other_vehicle_idx, self.solution[vehicle_idx])
+        return self._repair_children(child_x_solution, child_y_solution, _other_solution)
+
+    def _replace_route(self, solution: Solution, vehicle_idx: int, route: List[int]) -> Solution:
+        '''
+        depots of 'route' are removed from other routes, depots of the replaced route are left to repairing
+        '''
+        warehouse_depot = 0
+        depots_of_route = set(route) - {warehouse_depot}
+        new_solution = {idx: [depot_idx for depot_idx in current_route if depot_idx not in depots_of_route]
+                        for idx, current_route in solution.items()}
+        new_solution[vehicle_idx] = list(route)
+        return new_solution
+
+    def _crossover_giant_tours(self, _other_solution: Solution,
+                               permutation_crossover: Callable[[List[int], List[int]], List[int]]) -> List[Solution]:
+        '''
+        Only depots can be chosen for crossover (i.e., not immutable depots) are exchanged, immutable depots stay at their positions.
+        '''
+        self_giant_tour, self_vehicle_order, self_route_lengths = self.giant_tour.encode(self.solution)
+        other_giant_tour, other_vehicle_order, other_route_lengths = self.giant_tour.encode(_other_solution)
+        self_mutable_depots = [depot_idx for depot_idx in self_giant_tour if depot_idx not in self.immutable_depot_names]
+        other_mutable_depots = [depot_idx for depot_idx in other_giant_tour if depot_idx not in self.immutable_depot_names]
+        if len(self_mutable_depots) < 2 or sorted(self_mutable_depots) != sorted(other_mutable_depots):
+            return [self.solution, _other_solution]
 
-        return [self.solution, _other_solution]  # as child_x and child_y
+        child_x_giant_tour = self._replace_mutable_depots(self_giant_tour, permutation_crossover(self_mutable_depots, other_mutable_depots))
+        child_y_giant_tour = self._replace_mutable_depots(other_giant_tour, permutation_crossover(other_mutable_depots, self_mutable_depots))
+        child_x_solution = self.giant_tour.decode(child_x_giant_tour, self_vehicle_order, self_route_lengths)
+        child_y_solution = self.giant_tour.decode(child_y_giant_tour, other_vehicle_order, other_route_lengths)
+        return [child_x_solution if child_x_solution is not None else self.solution,
+                child_y_solution if child_y_solution is not None else _other_solution]
+
+    def _replace_mutable_depots(self, giant_tour: List[int], mutable_depots: List[int]) -> List[int]:
+        mutable_depots = iter(mutable_depots)
+        return [depot_idx if depot_idx in self.immutable_depot_names else next(mutable_depots)
+                for depot_idx in giant_tour]
+
+    def _choose_segment(self, length: int) -> List[int]:
+        # [left, right), at least one depot
+        left, right = sorted(self.random_stream.sample(range(length + 1), 2))
+        return [left, right]
+
+    def _order_crossover_permutations(self, parent_x: List[int], parent_y: List[int]) -> List[int]:
+        left, right = self._choose_segment(len(parent_x))
+        segment = parent_x[left: right]
+        segment_depots = set(segment)
+        # starting after the segment, wrapping around
+        rest_depots = [depot_idx for depot_idx in [*parent_y[right:], *parent_y[:right]] if depot_idx not in segment_depots]
+        number_of_depots_after_segment = len(parent_x) - right
+        return [*rest_depots[number_of_depots_after_segment:], *segment, *rest_depots[:number_of_depots_after_segment]]
+
+    def _partially_mapped_crossover_permutations(self, parent_x: List[int], parent_y: List[int]) -> List[int]:
+        left, right = self._choose_segment(len(parent_x))
+        child = list(parent_y)
+        child[left: right] = parent_x[left: right]
+        mapping = {parent_x[idx]: parent_y[idx] for idx in range(left, right)}
+        for idx in [*range(left), *range(right, len(parent_y))]:
+            depot_idx = parent_y[idx]
+            while depot_idx in mapping:
+                depot_idx = mapping[depot_idx]
+            child[idx] = depot_idx
+        return child
+
+    def _repair_children(self, child_x_solution: Solution, child_y_solution: Solution, _other_solution: Solution) -> List[Solution]:
+        repaired_child_x_solution = self.giant_tour.repair(child_x_solution)
+        repaired_child_y_solution = self.giant_tour.repair(child_y_solution)
+        return [repaired_child_x_solution if repaired_child_x_solution is not None else self.solution,
+                repaired_child_y_solution if repaired_child_y_solution is not None else _other_solution]
 
     def _randomly_choose_a_vehicle(self) -> int:
-        return choice(self.vehicles_can_be_chosen_for_crossover)
+        return self.random_stream.choice(self.vehicles_can_be_chosen_for_crossover)
 
     def _randomly_choose_a_vehicle_for_other_solution(self, other_solution_chromosome_vehicles_can_be_chosen_for_crossover: List[int]) -> int:
-        return choice(other_solution_chromosome_vehicles_can_be_chosen_for_crossover)
+        return self.random_stream.choice(other_solution_chromosome_vehicles_can_be_chosen_for_crossover)
 
     def _randomly_choose_a_depot_in_a_route(self, route: List[int]) -> int:
         route_without_time_window_constraints = [depot_idx 
                                         for depot_idx in route 
                                         if not depot_idx in self.immutable_depot_names]
 
-        return choice(route_without_time_window_constraints)
-
-    def _insert_replenish_points_for_current_vehicle(self, vehicle_idx:int, crossovered_soluton:Solution) -> None:
-
-        warehouse_depot = 0
-        current_route = crossovered_soluton[vehicle_idx]
-        route_without_warehouse_depot = [depot_idx for depot_idx in current_route if depot_idx != warehouse_depot]
-        non_shortage_route = self.optimizer.insert_warehouse_depots_and_relenishment_points(vehicle_idx,route_without_warehouse_depot)
-        crossovered_soluton[vehicle_idx] = non_shortage_route
-
+        return self.random_stream.choice(route_without_time_window_constraints)
@@ -0,0 +1,167 @@
+import os
+from typing import List
+import numpy as np
+import pandas as pd
+
+
+class DatasetGenerator:
+    def __init__(self,
+                 number_of_depots: int,
+                 number_of_vehicles: int,
+                 number_of_products: int = 2,
+                 time_window_tightness: float = 0.1,
+                 compatibility_density: float = 0.9,
+                 seed: int = 0,
+                 area_size_in_km: float = 40,
+                 average_speed_in_km_per_hour: float = 40,
+                 shipement_discharging_time: int = 20) -> None:
+        '''
+        DatasetGenerator writes a synthetic dataset in exactly the same layout as the bundled ones
+        (i.e., the files read by DepotFile and VehicleFile), so that it can be loaded with BuilderFactory(BASE_DIR).
+        -------------------------------------------------------------------------------------------
+        Params:
+        number_of_depots: including the warehouse (depot 1 in csv, depot 0 in code)
+        number_of_vehicles: fleet size
+        number_of_products: number of product columns in d_i.csv and Q_k.csv (a, b, c ...)
+        time_window_tightness: 0 ~ 1, share of depots having a time window, the higher the narrower the windows
+        compatibility_density: 0 ~ 1, probability that a vehicle can deliver a given depot (a_ik.csv)
+        seed: same seed, same dataset
+        '''
+        if number_of_depots < 2:
+            raise ValueError(f"'number_of_depots' must be at least 2 (warehouse included), given {number_of_depots}")
+        if number_of_vehicles < 1:
+            raise ValueError(f"'number_of_vehicles' must be at least 1, given {number_of_vehicles}")
+        if not (0 <= time_window_tightness <= 1):
+            raise ValueError(f"'time_window_tightness' must be between 0 and 1, given {time_window_tightness}")
+        if not (0 < compatibility_density <= 1):
+            raise ValueError(f"'compatibility_density' must be between 0 (exclusive) and 1, given {compatibility_density}")
+
+        self.number_of_depots = number_of_depots
+        self.number_of_vehicles = number_of_vehicles
+        self.number_of_products = number_of_products
+        self.time_window_tightness = time_window_tightness
+        self.compatibility_density = compatibility_density
+        self.seed = seed
+        self.area_size_in_km = area_size_in_km
+        self.average_speed_in_km_per_hour = average_speed_in_km_per_hour
+        self.shipement_discharging_time = shipement_discharging_time
+
+        # same constants as the bundled datasets and Vehicle
+        self.warehouse_closing_time = 480
+        self.regular_latest_time_must_be_delivered = 420
+
+    @property
+    def product_names(self) -> List[str]:
+        # a, b, c ... z, p26, p27 ...
+        return [chr(ord("a") + idx) if idx < 26 else f"p{idx}"
+                for idx in range(self.number_of_products)]
+
+    def _generate_coordinates(self, rng: np.random.Generator) -> np.ndarray:
+        coordinates = rng.uniform(0, self.area_size_in_km, size=(self.number_of_depots, 2))
+        coordinates[0] = self.area_size_in_km / 2  # warehouse sits in the middle of the area
+        return coordinates
+
+    def _generate_distance_and_time(self, coordinates: np.ndarray, rng: np.random.Generator) -> 'tuple[np.ndarray, np.ndarray]':
+        '''
+        Unit (same as csv): distance in meter, time in 1/100 minute
+        '''
+        delta = coordinates[:, None, :] - coordinates[None, :, :]
+        euclidean_distance = np.sqrt((delta ** 2).sum(axis=-1))
+        # road network is never a straight line, and it is not symmetric either
+        detour_factor = rng.uniform(1.2, 1.5, size=euclidean_distance.shape)
+        distance_in_km = euclidean_distance * detour_factor
+        np.fill_diagonal(distance_in_km, 0)
+
+        time_in_minute = distance_in_km / self.average_speed_in_km_per_hour * 60
+        return np.rint(distance_in_km * 1000).astype(np.int64), np.round(time_in_minute * 100, 2)
+
+    def _generate_demand(self, rng: np.random.Generator) -> np.ndarray:
+        demand = rng.integers(5, 40, size=(self.number_of_depots, self.number_of_products))
+        demand[0] = 0  # warehouse has no demand
+        return demand
+
+    def _generate_time_windows(self, time_in_minute: np.ndarray, rng: np.random.Generator) -> 'tuple[np.ndarray, np.ndarray]':
+        earilest_time_can_be_delivered = np.zeros(self.number_of_depots, dtype=np.int64)
+        latest_time_must_be_delivered = np.full(self.number_of_depots, self.regular_latest_time_must_be_delivered, dtype=np.int64)
+        latest_time_must_be_delivered[0] = self.warehouse_closing_time
+
+        is_constrained = rng.random(self.number_of_depots) < self.time_window_tightness
+        is_constrained[0] = False
+        is_early = rng.random(self.number_of_depots) < 0.5
+
+        # the tighter, the earlier the deadline (early depots) and the later the opening time (late depots)
+        earliest_reachable_time = time_in_minute[0] + self.shipement_discharging_time
+        deadline_upper_bound = self.regular_latest_time_must_be_delivered * (1 - 0.6 * self.time_window_tightness)
+        for depot_idx in np.flatnonzero(is_constrained):
+            if is_early[depot_idx]:
+                lower_bound = min(earliest_reachable_time[depot_idx] + 10, deadline_upper_bound)
+                latest_time_must_be_delivered[depot_idx] = int(rng.uniform(lower_bound, deadline_upper_bound))
+                continue
+            opening_upper_bound = 120 + 180 * self.time_window_tightness
+            earilest_time_can_be_delivered[depot_idx] = int(rng.uniform(60, opening_upper_bound))
+
+        return earilest_time_can_be_delivered, latest_time_must_be_delivered
+
+    def _generate_fleet(self, demand: np.ndarray, rng: np.random.Generator) -> 'dict[str, np.ndarray]':
+        # a few vehicle types (like the bundled datasets), larger vehicles cost more
+        capacity_tiers = np.array([160, 240, 330, 520, 740])
+        fixed_cost_tiers = np.array([1000, 1000, 1200, 1400, 1500])
+        fuel_efficiency_tiers = np.array([0.2, 0.2, 0.2, 0.22, 0.25])
+        vehicle_tiers = np.sort(rng.integers(0, len(capacity_tiers), size=self.number_of_vehicles))
+
+        largest_demand = int(demand.max()) if len(demand) else 0
+        base_capacity = np.maximum(capacity_tiers[vehicle_tiers], largest_demand + 1)
+        # each product gets slightly less room than the previous one, e.g., (240, 220)
+        capacity = np.stack([base_capacity - 20 * product_idx for product_idx in range(self.number_of_products)], axis=1)
+        capacity = np.maximum(capacity, largest_demand + 1)
+
+        return {"capacity": capacity,
+                "fuel_fee": np.full(self.number_of_vehicles, 28.2),
+                "fuel_efficiency": fuel_efficiency_tiers[vehicle_tiers],
+                "fixed_cost": fixed_cost_tiers[vehicle_tiers]}
+
+    def _generate_delivery_status(self, rng: np.random.Generator) -> np.ndarray:
+        '''
+        Vehicle x Depot matrix (a_ik.csv), 1 means the vehicle can deliver the depot.
+        '''
+        delivery_status = (rng.random((self.number_of_vehicles, self.number_of_depots)) < self.compatibility_density).astype(np.int64)
+        delivery_status[:, 0] = 1  # every vehicle can go back to warehouse
+        # every depot must be deliverable by at least one vehicle
+        for depot_idx in np.flatnonzero(delivery_status.sum(axis=0) == 0):
+            delivery_status[rng.integers(0, self.number_of_vehicles), depot_idx] = 1
+        return delivery_status
+
+    def generate(self, BASE_DIR: str) -> str:
+        '''
+        This method is a public API expected to expose to users.
+        Functionality:
+            Write c_ij, t_ij, d_i, e_i, l_i, a_ik, Q_k, B, a_k and fc_k csv files into BASE_DIR
+        '''
+        rng = np.random.default_rng(self.seed)
+        os.makedirs(BASE_DIR, exist_ok=True)
+
+        # csv files are 1-based
+        depot_ids = range(1, self.number_of_depots + 1)
+        vehicle_ids = range(1, self.number_of_vehicles + 1)
+
+        coordinates = self._generate_coordinates(rng)
+        distance, time = self._generate_distance_and_time(coordinates, rng)
+        demand = self._generate_demand(rng)
+        earilest_time_can_be_delivered, latest_time_must_be_delivered = self._generate_time_windows(time / 100, rng)
+        fleet = self._generate_fleet(demand, rng)
+        delivery_status = self._generate_delivery_status(rng)
+
+        pd.DataFrame(distance, index=depot_ids, columns=depot_ids).to_csv(f"{BASE_DIR}/c_ij.csv")
+        pd.DataFrame(time, index=depot_ids, columns=depot_ids).to_csv(f"{BASE_DIR}/t_ij.csv")
+        pd.DataFrame(demand, index=pd.Index(depot_ids, name="depot"), columns=self.product_names).to_csv(f"{BASE_DIR}/d_i.csv")
+        pd.DataFrame({"earilest_time_can_be_delivered": earilest_time_can_be_delivered},
+                     index=pd.Index(depot_ids, name="depot")).to_csv(f"{BASE_DIR}/e_i.csv")
+        pd.DataFrame({"latest_time_must_be_delivered": latest_time_must_be_delivered},
+                     index=pd.Index(depot_ids, name="depot")).to_csv(f"{BASE_DIR}/l_i.csv")
+        pd.DataFrame(delivery_status, index=vehicle_ids, columns=depot_ids).to_csv(f"{BASE_DIR}/a_ik.csv")
+        pd.DataFrame(fleet["capacity"], index=pd.Index(vehicle_ids, name="id"), columns=self.product_names).to_csv(f"{BASE_DIR}/Q_k.csv")
+        pd.DataFrame({"fuel_fee": fleet["fuel_fee"]}, index=pd.Index(vehicle_ids, name="id")).to_csv(f"{BASE_DIR}/B.csv")
+        pd.DataFrame({"fuel_efficiency": fleet["fuel_efficiency"]}, index=pd.Index(vehicle_ids, name="id")).to_csv(f"{BASE_DIR}/a_k.csv")
+        pd.DataFrame({"fixed_cost": fleet["fixed_cost"]}, index=pd.Index(vehicle_ids, name="id")).to_csv(f"{BASE_DIR}/fc_k.csv")
+
+        return BASE_DIR
@@ -0,0 +1,353 @@
+from itertools import chain
+from math import ceil
+from time import time
+from typing import Dict, List, Set, Tuple
+import numpy as np
+from .base_class import BuilderFactory
+from .batch_solver import solve_many
+from .constructive_heuristic import ConstructiveHeuristic
+from .large_neighborhood_search import LargeNeighborhoodSearch
+from .scenario import Scenario
+from .solution_chromosome import SolutionChromosome
+from .solve_result import SolveResult
+# e.g.,  {0: [], 1: [0, 8, 6, 0], 2: [0, 7, 5, 0], 3: [0, 3, 0], 4: []}
+Solution = Dict[int, List[int]]
+
+
+class DecompositionSolver:
+    def __init__(self,
+                 factory: BuilderFactory = None,
+                 cluster_size: int = 30,
+                 workers: int = None,
+                 population_size: int = 30,
+                 mutation_rate: float = 0.3,
+                 crossover_rate: float = 0.7,
+                 maximum_iteration: int = 20,
+                 time_limit: float = None,
+                 boundary_time_limit: float = 1,
+                 number_of_clustering_iterations: int = 5,
+                 seed: int = None,
+                 verbose: bool = False) -> None:
+        '''
+        DecompositionSolver (cluster first, route second) solves a large instance as many small ones:
+            1. depots are partitioned into clusters of about 'cluster_size' depots, by capacitated k-medoids on c_ij,
+               where depots delivered by different vehicles (a_ik) are treated as farther apart,
+            2. vehicles are assigned to clusters (every depot of a cluster must be deliverable by some of its vehicles,
+               the rest of the fleet is shared in proportion to cluster sizes),
+            3. each cluster (a Scenario of its depots and vehicles) is solved by GeneticAlgorithm in parallel (see solve_many),
+               except tiny or single-vehicle clusters, which have too few distinct solutions for the initial population of GeneticAlgorithm
+               and are solved by LargeNeighborhoodSearch instead,
+            4. the routes of clusters are merged into one Solution (vehicles are never shared, so nothing conflicts),
+            5. boundary improvement: each cluster and its nearest cluster are re-optimized together by LargeNeighborhoodSearch,
+               so depots near the boundary can move to the other cluster's vehicles.
+        -------------------------------------------------------------------------------------------
+        Clustering reads a row of c_ij per medoid in each iteration, i.e., n * k = n ^ 2 / cluster_size for k clusters,
+        the other steps are O(cluster_size) per depot, so solving the clusters grows about linearly with the number of depots
+        for a fixed 'cluster_size', while clustering grows quadratically (but is cheap compared to solving, up to thousands of depots).
+
+        Params:
+        cluster_size: target number of depots per cluster (at most 20% more, unless a tiny cluster is merged into it)
+        workers, population_size, mutation_rate, crossover_rate, maximum_iteration: see solve_many
+        time_limit: seconds each cluster may run (GeneticAlgorithm), None means only 'maximum_iteration' stops it,
+                    clusters solved by LargeNeighborhoodSearch run population_size * maximum_iteration iterations (bounded by 'time_limit' as well)
+        boundary_time_limit: seconds of LargeNeighborhoodSearch for each pair of neighboring clusters, 0 to skip
+        seed: seed of clustering and of every cluster / boundary solver, the same seed gives the same result
+              as long as nothing is stopped by time, i.e., 'time_limit' is None and 'boundary_time_limit' is 0
+        '''
+        if cluster_size < 2:
+            raise ValueError(f"'cluster_size' must be at least 2, given {cluster_size}")
+        self.factory = factory if factory is not None else BuilderFactory()
+        self.cluster_size = cluster_size
+        self.workers = workers
+        self.genetic_algorithm_params = {"population_size": population_size,
+                                         "mutation_rate": mutation_rate,
+                                         "crossover_rate": crossover_rate,
+                                         "maximum_iteration": maximum_iteration,
+                                         "time_limit": time_limit}
+        self.boundary_time_limit = boundary_time_limit
+        self.number_of_clustering_iterations = number_of_clustering_iterations
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.verbose = verbose
+
+        self.depots = self.factory.depots
+        self.vehicles = self.factory.vehicles
+        warehouse_depot = 0
+        self.all_depot_names = [depot_idx for depot_idx in self.depots.all_depot_names if depot_idx != warehouse_depot]
+        self.all_vehicle_names = self.vehicles.all_vehicle_names
+        self.available_vehicles_of_depots = {depot_idx: set(self.depots[depot_idx].available_vehicles) & set(self.all_vehicle_names)
+                                             for depot_idx in self.all_depot_names}
+
+        self.clusters = None  # medoid -> depots of the cluster
+        self.vehicles_of_clusters = None  # medoid -> vehicles of the cluster
+        self.start_time = None
+        self.solution = None
+
+    def _print(self, message: str) -> None:
+        if self.verbose:
+            print(message)
+
+    def _get_distances_to_medoid(self, medoid: int, depot_names: np.ndarray) -> np.ndarray:
+        '''
+        c_ij from the medoid, plus a penalty (the mean distance) scaled by how different their available vehicles are (Jaccard distance)
+        '''
+        distances = self.factory.depot_builder.depot_distance.row(medoid)[depot_names]
+        medoid_vehicles = self.available_vehicles_of_depots[medoid]
+        dissimilarities = np.array([1 - len(medoid_vehicles & self.available_vehicles_of_depots[depot_idx])
+                                    / max(len(medoid_vehicles | self.available_vehicles_of_depots[depot_idx]), 1)
+                                    for depot_idx in depot_names])
+        return distances + dissimilarities * self._compatibility_penalty
+
+    def _choose_initial_medoids(self, number_of_clusters: int, depot_names: np.ndarray) -> List[int]:
+        # farthest first: each medoid is the depot farthest from the medoids chosen so far
+        medoids = [int(depot_names[self.rng.integers(len(depot_names))])]
+        distances_to_medoids = self._get_distances_to_medoid(medoids[0], depot_names)
+        while len(medoids) < number_of_clusters:
+            medoid = int(depot_names[np.argmax(distances_to_medoids)])
+            medoids.append(medoid)
+            distances_to_medoids = np.minimum(distances_to_medoids, self._get_distances_to_medoid(medoid, depot_names))
+        return medoids
+
+    def _assign_depots_to_medoids(self, medoids: List[int], depot_names: np.ndarray) -> Dict[int, List[int]]:
+        '''
+        Each depot goes to its nearest medoid whose cluster is not full,
+        depots losing the most by not getting their nearest medoid (regret) are assigned first.
+        '''
+        maximum_cluster_size = ceil(self.cluster_size * 1.2)
+        distances = np.stack([self._get_distances_to_medoid(medoid, depot_names) for medoid in medoids])  # medoid x depot
+        preferences = np.argsort(distances, axis=0)
+        if len(medoids) > 1:
+            sorted_distances = np.take_along_axis(distances, preferences[:2], axis=0)
+            regrets = sorted_distances[1] - sorted_distances[0]
+        else:
+            regrets = np.zeros(len(depot_names))
+
+        clusters = {medoid: [] for medoid in medoids}
+        for depot_position in np.argsort(-regrets, kind="stable"):
+            for medoid_position in preferences[:, depot_position]:
+                medoid = medoids[medoid_position]
+                if len(clusters[medoid]) < maximum_cluster_size:
+                    clusters[medoid].append(int(depot_names[depot_position]))
+                    break
+        return clusters
+
+    def _update_medoid(self, depots_of_cluster: List[int]) -> int:
+        # the depot of the smallest total distance to the others of the cluster, O(cluster_size ^ 2)
+        total_distances = [sum(self.depots[depot_idx].get_distance_to_depot(other_depot_idx) for other_depot_idx in depots_of_cluster)
+                           for depot_idx in depots_of_cluster]
+        return depots_of_cluster[int(np.argmin(total_distances))]
+
+    @property
+    def _minimum_cluster_size(self) -> int:
+        return ceil(self.cluster_size / 4)
+
+    def _merge_small_clusters(self, clusters: Dict[int, List[int]],
+                              vehicles_of_clusters: Dict[int, List[int]] = None) -> Dict[int, List[int]]:
+        '''
+        Clusters of fewer than a quarter of 'cluster_size' depots (e.g., an outlier picked as a medoid) are merged into the nearest cluster,
+        as a tiny instance has too few distinct solutions for the initial population of GeneticAlgorithm.
+        vehicles_of_clusters: if given (i.e., vehicles are assigned already), vehicles of a merged cluster are moved along (in place),
+                              so every depot can still be delivered by a vehicle of its cluster
+        '''
+        clusters = {medoid: depots_of_cluster for medoid, depots_of_cluster in clusters.items() if len(depots_of_cluster) != 0}
+        while len(clusters) > 1:
+            medoid = min(clusters, key=lambda medoid: len(clusters[medoid]))
+            if len(clusters[medoid]) >= self._minimum_cluster_size:
+                break
+            nearest_medoid = min((other_medoid for other_medoid in clusters if other_medoid != medoid),
+                                 key=lambda other_medoid: self.depots[medoid].get_distance_to_depot(other_medoid))
+            clusters[nearest_medoid].extend(clusters.pop(medoid))
+            if vehicles_of_clusters is not None:
+                vehicles_of_clusters[nearest_medoid].extend(vehicles_of_clusters.pop(medoid))
+        return clusters
+
+    def cluster_depots(self) -> Dict[int, List[int]]:
+        '''
+        This method is a public API expected to expose to users.
+        Functionality:
+            Partitions all depots (except warehouse depot) into clusters, returns {medoid: depots of the cluster}
+        '''
+        depot_names = np.array(self.all_depot_names)
+        number_of_clusters = min(max(ceil(len(depot_names) / self.cluster_size), 1), len(self.all_vehicle_names), len(depot_names))
+        warehouse_depot = 0
+        self._compatibility_penalty = float(np.mean(self.factory.depot_builder.depot_distance.row(warehouse_depot)[depot_names]))
+
+        medoids = self._choose_initial_medoids(number_of_clusters, depot_names)
+        clusters = self._assign_depots_to_medoids(medoids, depot_names)
+        for _ in range(self.number_of_clustering_iterations):
+            new_medoids = [self._update_medoid(depots_of_cluster) for depots_of_cluster in clusters.values() if len(depots_of_cluster) != 0]
+            if sorted(new_medoids) == sorted(clusters.keys()):
+                break
+            clusters = self._assign_depots_to_medoids(new_medoids, depot_names)
+        return self._merge_small_clusters(clusters)
+
+    def assign_vehicles_to_clusters(self, clusters: Dict[int, List[int]]) -> Tuple[Dict[int, List[int]], Dict[int, List[int]]]:
+        '''
+        This method is a public API expected to expose to users.
+        Functionality:
+            Returns vehicles of each cluster, and the clusters (depots no vehicle of their cluster can deliver
+            are moved to the nearest cluster having a vehicle that can, tiny clusters and clusters their vehicles can't serve
+            within time windows are merged into the nearest cluster along with their vehicles).
+            Raises ValueError if some depots can't be delivered by any vehicle.
+        '''
+        vehicles_of_clusters = {medoid: [] for medoid in clusters}
+        free_vehicles = set(self.all_vehicle_names)
+
+        def get_uncovered_depots(medoid: int) -> Set[int]:
+            vehicles_of_cluster = set(vehicles_of_clusters[medoid])
+            return {depot_idx for depot_idx in clusters[medoid] if len(self.available_vehicles_of_depots[depot_idx] & vehicles_of_cluster) == 0}
+
+        # 1. coverage: clusters of the fewest candidate vehicles first, each takes the vehicles delivering most of its uncovered depots
+        def count_candidate_vehicles(medoid: int) -> int:
+            return len(set().union(*[self.available_vehicles_of_depots[depot_idx] for depot_idx in clusters[medoid]]))
+        for medoid in sorted(clusters, key=count_candidate_vehicles):
+            uncovered_depots = get_uncovered_depots(medoid)
+            while len(uncovered_depots) != 0 and len(free_vehicles) != 0:
+                vehicle_idx = max(sorted(free_vehicles), key=lambda vehicle_idx: sum(
+                    vehicle_idx in self.available_vehicles_of_depots[depot_idx] for depot_idx in uncovered_depots))
+                if all(vehicle_idx not in self.available_vehicles_of_depots[depot_idx] for depot_idx in uncovered_depots):
+                    break
+                vehicles_of_clusters[medoid].append(vehicle_idx)
+                free_vehicles.remove(vehicle_idx)
+                uncovered_depots = get_uncovered_depots(medoid)
+
+        # 2. the rest of the fleet, in proportion to the number of depots
+        number_of_depots = sum(len(depots_of_cluster) for depots_of_cluster in clusters.values())
+        for vehicle_idx in sorted(free_vehicles):
+            medoid = max(clusters, key=lambda medoid: (len(clusters[medoid]) / number_of_depots
+                                                      - len(vehicles_of_clusters[medoid]) / len(self.all_vehicle_names),
+                                                      sum(vehicle_idx in self.available_vehicles_of_depots[depot_idx] for depot_idx in clusters[medoid])))
+            vehicles_of_clusters[medoid].append(vehicle_idx)
+
+        # 3. depots still uncovered move to the nearest cluster which can deliver them
+        for medoid in list(clusters):
+            for depot_idx in get_uncovered_depots(medoid):
+                candidate_medoids = [other_medoid for other_medoid in clusters
+                                     if len(self.available_vehicles_of_depots[depot_idx] & set(vehicles_of_clusters[other_medoid])) != 0]
+                if len(candidate_medoids) == 0:
+                    raise ValueError(f"depot {depot_idx} can't be delivered by any available vehicle")
+                nearest_medoid = min(candidate_medoids, key=lambda other_medoid: self.depots[depot_idx].get_distance_to_depot(other_medoid))
+                clusters[medoid].remove(depot_idx)
+                clusters[nearest_medoid].append(depot_idx)
+        # moving depots may leave tiny clusters again
+        clusters = self._merge_small_clusters(clusters, vehicles_of_clusters)
+        clusters = self._merge_infeasible_clusters(clusters, vehicles_of_clusters)
+        return {medoid: sorted(vehicles_of_clusters[medoid]) for medoid in clusters}, clusters
+
+    def _is_feasible_cluster(self, depots_of_cluster: List[int], vehicles_of_cluster: List[int]) -> bool:
+        # a_ik alone doesn't tell, e.g., depots of tight time windows may need more vehicles than the cluster has
+        cluster_factory = self._get_scenario("cluster", depots_of_cluster, vehicles_of_cluster).apply(self.factory)
+        try:
+            ConstructiveHeuristic(cluster_factory).regret_insertion_solution()
+        except ValueError:
+            return False
+        return True
+
+    def _merge_infeasible_clusters(self, clusters: Dict[int, List[int]], vehicles_of_clusters: Dict[int, List[int]]) -> Dict[int, List[int]]:
+        '''
+        Clusters ConstructiveHeuristic can't build a solution for with their own vehicles are merged into the nearest cluster
+        (vehicles moved along, in place) until it can, so that every cluster solver starts from at least one valid solution.
+        '''
+        infeasible_medoids = [medoid for medoid in clusters if not self._is_feasible_cluster(clusters[medoid], vehicles_of_clusters[medoid])]
+        while len(infeasible_medoids) != 0 and len(clusters) > 1:
+            medoid = infeasible_medoids.pop()
+            nearest_medoid = min((other_medoid for other_medoid in clusters if other_medoid != medoid),
+                                 key=lambda other_medoid: self.depots[medoid].get_distance_to_depot(other_medoid))
+            clusters[nearest_medoid].extend(clusters.pop(medoid))
+            vehicles_of_clusters[nearest_medoid].extend(vehicles_of_clusters.pop(medoid))
+            if nearest_medoid in infeasible_medoids:
+                infeasible_medoids.remove(nearest_medoid)
+            if not self._is_feasible_cluster(clusters[nearest_medoid], vehicles_of_clusters[nearest_medoid]):
+                infeasible_medoids.append(nearest_medoid)
+        return clusters
+
+    def _get_scenario(self, name: str, depots_of_cluster: List[int], vehicles_of_cluster: List[int]) -> Scenario:
+        depots_of_cluster = set(depots_of_cluster)
+        return Scenario(name,
+                        available_vehicles=list(vehicles_of_cluster),
+                        excluded_depots=[depot_idx for depot_idx in self.all_depot_names if depot_idx not in depots_of_cluster])
+
+    def _is_small_cluster(self, medoid: int) -> bool:
+        # e.g., 3 depots delivered by one vehicle have 6 distinct solutions, fewer than the initial population of GeneticAlgorithm
+        return len(self.clusters[medoid]) < self._minimum_cluster_size or len(self.vehicles_of_clusters[medoid]) == 1
+
+    def _solve_small_cluster(self, scenario: Scenario, seed: int) -> SolveResult:
+        maximum_iteration = self.genetic_algorithm_params["maximum_iteration"]
+        large_neighborhood_search = LargeNeighborhoodSearch(
+            scenario.apply(self.factory),
+            maximum_iteration=self.genetic_algorithm_params["population_size"] * (maximum_iteration if maximum_iteration is not None else 1000),
+            time_limit=self.genetic_algorithm_params["time_limit"], seed=seed, verbose=False)
+        result = large_neighborhood_search.solve()
+        result.name = scenario.name
+        return result
+
+    def _solve_clusters(self) -> Solution:
+        scenarios = [self._get_scenario(f"cluster_{medoid}", depots_of_cluster, self.vehicles_of_clusters[medoid])
+                     for medoid, depots_of_cluster in self.clusters.items()]
+        is_small = [self._is_small_cluster(medoid) for medoid in self.clusters]
+        solution = {vehicle_idx: [] for vehicle_idx in self.all_vehicle_names}
+        results = solve_many([scenario for scenario, is_small_cluster in zip(scenarios, is_small) if not is_small_cluster],
+                             self.workers, factory=self.factory, verbose=False,
+                             seed=int(self.rng.integers(2 ** 31)), **self.genetic_algorithm_params)
+        small_cluster_results = (self._solve_small_cluster(scenario, int(self.rng.integers(2 ** 31)))
+                                 for scenario, is_small_cluster in zip(scenarios, is_small) if is_small_cluster)
+        for result in chain(results, small_cluster_results):
+            self._print(f"{result.name}: Total Cost: {round(result.total_cost, 2)}")
+            for vehicle_idx, route in result.solution.items():
+                if len(route) != 0:
+                    solution[vehicle_idx] = list(route)
+        return solution
+
+    def _find_neighboring_clusters(self) -> List[Tuple[int, int]]:
+        # each cluster with its nearest cluster (by medoids), i.e., at most one pair per cluster
+        medoids = list(self.clusters)
+        pairs = set()
+        for medoid in medoids:
+            other_medoids = [other_medoid for other_medoid in medoids if other_medoid != medoid]
+            if len(other_medoids) == 0:
+                continue
+            nearest_medoid = min(other_medoids, key=lambda other_medoid: self.depots[medoid].get_distance_to_depot(other_medoid))
+            pairs.add(tuple(sorted((medoid, nearest_medoid))))
+        return sorted(pairs)
+
+    def _improve_boundaries(self, solution: Solution) -> Solution:
+        for medoid, other_medoid in self._find_neighboring_clusters():
+            vehicles_of_pair = [*self.vehicles_of_clusters[medoid], *self.vehicles_of_clusters[other_medoid]]
+            depots_of_pair = [*self.clusters[medoid], *self.clusters[other_medoid]]
+            pair_factory = self._get_scenario(f"boundary_{medoid}_{other_medoid}", depots_of_pair, vehicles_of_pair).apply(self.factory)
+            large_neighborhood_search = LargeNeighborhoodSearch(pair_factory, maximum_iteration=1000000, time_limit=self.boundary_time_limit,
+                                                                seed=int(self.rng.integers(2 ** 31)), verbose=False)
+            pair_solution = {vehicle_idx: solution[vehicle_idx] for vehicle_idx in vehicles_of_pair}
+            large_neighborhood_search.solve(pair_solution)
+            for vehicle_idx, route in large_neighborhood_search.best_solution.items():
+                solution[vehicle_idx] = route
+            # depots may have moved between the two clusters, keep clusters consistent with routes for later pairs
+            warehouse_depot = 0
+            for cluster_medoid in (medoid, other_medoid):
+                self.clusters[cluster_medoid] = [depot_idx for vehicle_idx in self.vehicles_of_clusters[cluster_medoid]
+                                                 for depot_idx in solution[vehicle_idx] if depot_idx != warehouse_depot]
+        return solution
+
+    def solve(self) -> SolveResult:
+        '''
+        This method is a public API expected to expose to users.
+        Functionality:
+            Clusters depots, solves clusters in parallel, merges them and improves boundaries, returns the merged solution.
+        '''
+        self.start_time = time()
+        self.clusters = self.cluster_depots()
+        self.vehicles_of_clusters, self.clusters = self.assign_vehicles_to_clusters(self.clusters)
+        self._print(f"Clusters: {[len(depots_of_cluster) for depots_of_cluster in self.clusters.values()]} depots, "
+                    f"{[len(vehicles) for vehicles in self.vehicles_of_clusters.values()]} vehicles")
+        solution = self._solve_clusters()
+        if self.boundary_time_limit > 0:
+            solution = self._improve_boundaries(solution)
+        self.solution = dict(sorted(solution.items()))
+        return self.result
+
+    @property
+    def result(self) -> SolveResult:
+        elapsed_time = 0 if self.start_time is None else time() - self.start_time
+        immutable_depot_names = self.factory.depot_builder.all_depot_names_with_time_window_constraint
+        chromosome = SolutionChromosome(self.solution, immutable_depot_names, factory=self.factory)
+        return SolveResult.from_chromosome(chromosome, elapsed_time)
@@ -1,5 +1,7 @@
 from typing import List
-from random import choice
+import numpy as np
+from .depot_matrix import DepotMatrix
+from .random_stream import RandomStream, get_default_random_stream
 
 
 class Depot:
@@ -11,8 +13,8 @@ class Depot:
                  demand: int,
                  earilest_time_can_be_delivered: int,
                  latest_time_must_be_delivered: int,
-                 distance_to_other_depots: List[int],
-                 delivery_time_to_other_depots: List[int],
+                 distance_to_other_depots: 'List[int] | DepotMatrix',
+                 delivery_time_to_other_depots: 'List[int] | DepotMatrix',
                  vehicle_depots_delivery_status: List[int],
                  depot_name: str = None) -> None:
         '''
@@ -22,24 +24,43 @@ class Depot:
         latest_time_must_be_delivered: l_i.csv
         distance_to_other_depot: c_ij.csv
         time_to_other_depot: t_ij.csv
+
+        P.S. distance_to_other_depots and delivery_time_to_other_depots can be the whole DepotMatrix (shared by all depots),
+        in which case this depot reads its own row (i.e., row 'depot_name') through it.
         '''
         self.depot_name = depot_name
         self.demand = demand
         self.earilest_time_can_be_delivered = earilest_time_can_be_delivered
         self.latest_time_must_be_delivered = latest_time_must_be_delivered
-        self._distance_to_other_depots = {depot_name: distance
-                                          for depot_name, distance in enumerate(distance_to_other_depots)}
-        self._delivery_time_to_other_depots = {depot_name: time
-                                               for depot_name, time in enumerate(delivery_time_to_other_depots)}
+        self._distance_matrix, self._matrix_row = self._as_depot_matrix(distance_to_other_depots, depot_name)
+        self._delivery_time_matrix, _ = self._as_depot_matrix(delivery_time_to_other_depots, depot_name)
+        self._number_of_depots = self._distance_matrix.number_of_depots
         self._vehicle_depots_delivery_status = {
             depot_name: delivery_status 
             for depot_name, delivery_status in enumerate(vehicle_depots_delivery_status)
         }
-        self._all_depot_names = [name for name in self._distance_to_other_depots]
         self._available_vehicles = [vehicle_idx 
                                     for vehicle_idx, status in self._vehicle_depots_delivery_status.items()
                                     if status == 1]
 
+    @staticmethod
+    def _as_depot_matrix(matrix_or_row: 'List[int] | DepotMatrix', depot_name: int) -> 'tuple[DepotMatrix, int]':
+        if isinstance(matrix_or_row, DepotMatrix):
+            return matrix_or_row, depot_name
+        return DepotMatrix.from_rows([list(matrix_or_row)]), 0
+
+    @property
+    def _all_depot_names(self) -> List[int]:
+        return list(range(self._number_of_depots))
+
+    @property
+    def _distance_to_other_depots(self) -> dict:
+        return dict(enumerate(self._distance_matrix.row(self._matrix_row).tolist()))
+
+    @property
+    def _delivery_time_to_other_depots(self) -> dict:
+        return dict(enumerate(self._delivery_time_matrix.row(self._matrix_row).tolist()))
+
     @property
     def available_vehicles(self) -> List[int]:
         return self._available_vehicles
@@ -77,14 +98,14 @@ class Depot:
         )
 
     def _is_valid_depot(self, depot_id: int) -> bool:
-        return depot_id in self._all_depot_names
+        return isinstance(depot_id, (int, np.integer)) and 0 <= depot_id < self._number_of_depots
 
     def get_distance_to_depot(self, depot_id: str) -> int:
 
         if not self._is_valid_depot(depot_id):
             raise ValueError(f"'depot_id' must be one of the following: {self._all_depot_names}")
 
-        distance = self._distance_to_other_depots[depot_id]
+        distance = self._distance_matrix[self._matrix_row, depot_id]
 
         return distance
 
@@ -93,9 +114,11 @@ class Depot:
         if not self._is_valid_depot(depot_id):
             raise ValueError(f"'depot_id' must be one of the following: {self._all_depot_names}")
 
-        delivery_time = self._delivery_time_to_other_depots[depot_id]
+        delivery_time = self._delivery_time_matrix[self._matrix_row, depot_id]
 
         return delivery_time
 
-    def assign_vehicle(self) -> int:
-        return choice(self._available_vehicles)
+    def assign_vehicle(self, random_stream: RandomStream = None) -> int:
+        if random_stream is None:
+            random_stream = get_default_random_stream()
+        return random_stream.choice(self._available_vehicles)
@@ -1,15 +1,36 @@
+import os
+from copy import copy
 from typing import Dict, List
+import numpy as np
 import pandas as pd
 from .depot_file import DepotFile
 from .depot import Depot
+from .depot_matrix import DepotMatrix, NearestDepotMatrix
 
 
 class DepotBuilder:
-    def __init__(self, file_name: DepotFile) -> None:
-        self.depot_distance = pd.read_csv(
-            file_name.distance_to_other_depots, index_col=0).applymap(lambda distance: distance / 1000)
-        self.depot_time = pd.read_csv(
-            file_name.time_to_other_depots, index_col=0).applymap(lambda time: time / 100)
+    def __init__(self,
+                 file_name: DepotFile,
+                 matrix_storage: str = "memory",
+                 matrix_dtype: type = None,
+                 cache_dir: str = None,
+                 number_of_neighbors: int = 50) -> None:
+        '''
+        matrix_storage decides how c_ij.csv and t_ij.csv are stored (both are shared by all depots):
+            "memory": loaded into memory (float64 by default)
+            "memmap": converted once into .npy files in cache_dir (float32 by default), which are memory-mapped afterwards
+            "sparse": like "memmap", but only 'number_of_neighbors' nearest depots of each depot are kept in memory,
+                      far pairs are read on demand from the memory-mapped file
+        '''
+        if matrix_storage not in ("memory", "memmap", "sparse"):
+            raise ValueError(f"'matrix_storage' must be one of the following: ['memory', 'memmap', 'sparse'], given {matrix_storage}")
+        self.matrix_storage = matrix_storage
+        self.matrix_dtype = matrix_dtype
+        self.cache_dir = cache_dir
+        self.number_of_neighbors = number_of_neighbors
+
+        self.depot_distance = self._load_depot_matrix(file_name.distance_to_other_depots, 1000)  # meter -> km
+        self.depot_time = self._load_depot_matrix(file_name.time_to_other_depots, 100)
         self.depot_demand = pd.read_csv(
             file_name.demand, index_col=0).applymap(lambda demand: int(demand))
         self.depot_earilest_time_can_be_delivered = pd.read_csv(
@@ -22,6 +43,99 @@ class DepotBuilder:
         self._number_of_depots = len(self.depot_demand)
         self._depots = self.build_depots()
 
+    @classmethod
+    def from_arrays(cls,
+                    depot_distance: DepotMatrix,
+                    depot_time: DepotMatrix,
+                    demand: np.ndarray,
+                    product_names: List[str],
+                    earilest_time_can_be_delivered: np.ndarray,
+                    latest_time_must_be_delivered: np.ndarray,
+                    vehicle_depots_delivery_status: np.ndarray,
+                    depot_names: List[int] = None) -> 'DepotBuilder':
+        '''
+        Builds a DepotBuilder from arrays already in memory (e.g., attached from shared memory, see SharedInstance) instead of csv files.
+        demand: depot x product, vehicle_depots_delivery_status: depot x vehicle (a_ik.csv transposed)
+        depot_names: depots to be delivered (e.g., without excluded depots), defaults to all depots
+        '''
+        depot_builder = cls.__new__(cls)
+        depot_builder.matrix_storage = "memory"
+        depot_builder.matrix_dtype = depot_distance.values.dtype.type
+        depot_builder.cache_dir = None
+        depot_builder.number_of_neighbors = None
+        depot_builder.depot_distance = depot_distance
+        depot_builder.depot_time = depot_time
+        depot_builder.depot_demand = pd.DataFrame(np.array(demand), columns=product_names)
+        depot_builder.depot_earilest_time_can_be_delivered = pd.DataFrame(
+            {"earilest_time_can_be_delivered": np.array(earilest_time_can_be_delivered)})
+        depot_builder.depot_latest_time_must_be_delivered = pd.DataFrame(
+            {"latest_time_must_be_delivered": np.array(latest_time_must_be_delivered)})
+        depot_builder.vehicle_depots_delivery_status = pd.DataFrame(np.array(vehicle_depots_delivery_status))
+        depot_builder._number_of_depots = len(depot_builder.depot_demand)
+        depot_builder._depots = depot_builder.build_depots()
+        if depot_names is not None:
+            depot_builder._depots = {depot_idx: depot for depot_idx, depot in depot_builder._depots.items() if depot_idx in depot_names}
+        return depot_builder
+
+    def _load_depot_matrix(self, matrix_file_name: str, unit_divisor: float) -> DepotMatrix:
+        if self.matrix_storage == "memory":
+            return DepotMatrix.from_csv(matrix_file_name, unit_divisor, self.matrix_dtype or np.float64)
+
+        cache_dir = self.cache_dir
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(matrix_file_name), ".matrix_cache")
+        memory_mapped_matrix = DepotMatrix.from_csv(matrix_file_name, unit_divisor, self.matrix_dtype or np.float32, cache_dir)
+        if self.matrix_storage == "memmap":
+            return memory_mapped_matrix
+
+        return NearestDepotMatrix(memory_mapped_matrix, self.number_of_neighbors)
+
+    def with_overrides(self,
+                       demand: Dict[int, Dict[str, int]] = None,
+                       earilest_time_can_be_delivered: Dict[int, int] = None,
+                       latest_time_must_be_delivered: Dict[int, int] = None,
+                       available_vehicles: List[int] = None,
+                       excluded_depots: List[int] = None) -> 'DepotBuilder':
+        '''
+        Returns a new DepotBuilder sharing c_ij and t_ij with this one, but with some depots' data replaced,
+        e.g., another day's demand. All keys are 0-based depot (vehicle) names.
+        available_vehicles: vehicles not listed are marked as unable to deliver any depot.
+        excluded_depots: depots not to be delivered at all (e.g., cancelled orders), the rest keep their names.
+        '''
+        warehouse_depot = 0
+        if excluded_depots is not None and warehouse_depot in excluded_depots:
+            raise ValueError("Warehouse depot (0) can't be excluded")
+        overridden_builder = copy(self)
+        if demand is not None:
+            overridden_builder.depot_demand = self.depot_demand.copy()
+            for depot_idx, depot_demand in demand.items():
+                for product, quantity in depot_demand.items():
+                    overridden_builder.depot_demand.iloc[depot_idx, overridden_builder.depot_demand.columns.get_loc(product)] = int(quantity)
+        if earilest_time_can_be_delivered is not None:
+            overridden_builder.depot_earilest_time_can_be_delivered = self.depot_earilest_time_can_be_delivered.copy()
+            for depot_idx, time in earilest_time_can_be_delivered.items():
+                overridden_builder.depot_earilest_time_can_be_delivered.loc[depot_idx, "earilest_time_can_be_delivered"] = time
+        if latest_time_must_be_delivered is not None:
+            overridden_builder.depot_latest_time_must_be_delivered = self.depot_latest_time_must_be_delivered.copy()
+            for depot_idx, time in latest_time_must_be_delivered.items():
+                overridden_builder.depot_latest_time_must_be_delivered.loc[depot_idx, "latest_time_must_be_delivered"] = time
+        if available_vehicles is not None:
+            overridden_builder.vehicle_depots_delivery_status = self.vehicle_depots_delivery_status.copy()
+            for vehicle_idx in range(overridden_builder.vehicle_depots_delivery_status.shape[1]):
+                if vehicle_idx not in available_vehicles:
+                    overridden_builder.vehicle_depots_delivery_status.iloc[:, vehicle_idx] = 0
+
+        overridden_builder._depots = overridden_builder.build_depots()
+        if excluded_depots is not None:
+            overridden_builder._depots = {depot_idx: depot
+                                          for depot_idx, depot in overridden_builder._depots.items()
+                                          if depot_idx not in excluded_depots}
+        return overridden_builder
+
+    def __deepcopy__(self, memo: dict) -> 'DepotBuilder':
+        # depots data is read-only once built, so it is shared rather than copied (e.g., when copying a chromosome)
+        return self
+
     def build_depots(self) -> Dict[int, Depot]:
         '''
         depot key is 0-based.
@@ -32,15 +146,13 @@ class DepotBuilder:
             depot_demand = dict(self.depot_demand.iloc[idx, :])
             depot_earilest_time_can_be_delivered = self.depot_earilest_time_can_be_delivered["earilest_time_can_be_delivered"][idx]
             depot_latest_time_must_be_delivered = self.depot_latest_time_must_be_delivered["latest_time_must_be_delivered"][idx]
-            depot_distance = list(self.depot_distance.iloc[idx, :])
-            depot_time = list(self.depot_time.iloc[idx, :])
             vehicle_depots_delivery_status = list(self.vehicle_depots_delivery_status.iloc[idx, :])
 
             created_depot = Depot(depot_demand,
                                   depot_earilest_time_can_be_delivered,
                                   depot_latest_time_must_be_delivered,
-                                  depot_distance,
-                                  depot_time,
+                                  self.depot_distance,
+                                  self.depot_time,
                                   vehicle_depots_delivery_status,
                                   depot_name)
             depots[depot_name] = created_depot
@@ -51,30 +163,31 @@ class DepotBuilder:
     def all_depot_names_with_time_window_constraint(self) -> List[int]:
         return [
             depot_idx
-            for depot_idx, depot in self.build_depots().items()
+            for depot_idx, depot in self._depots.items()
             if (depot.earilest_time_can_be_delivered != 0)
             or (depot.latest_time_must_be_delivered != 420)
             or (depot.depot_name == 0)
         ]
     @property
     def depots_without_time_window_constraints(self) -> List[int]:
+        all_depot_names_with_time_window_constraint = set(self.all_depot_names_with_time_window_constraint)
         return [
             depot_idx
-            for depot_idx, depot in self.build_depots().items()
-            if depot_idx not in self.all_depot_names_with_time_window_constraint
+            for depot_idx, depot in self._depots.items()
+            if depot_idx not in all_depot_names_with_time_window_constraint
         ]
     @property
     def depots_need_to_be_assigned_early(self) -> List[int]: #
         return [
             depot_idx
-            for depot_idx, depot in self.build_depots().items()
+            for depot_idx, depot in self._depots.items()
             if (depot.latest_time_must_be_delivered != 420) and (depot_idx != 0)
         ]
     @property
     def depots_need_to_be_assigned_late(self) -> List[int]:
         return [
             depot_idx
-            for depot_idx, depot in self.build_depots().items()
+            for depot_idx, depot in self._depots.items()
             if (depot.earilest_time_can_be_delivered != 0) and (depot_idx != 0)
         ]
 
@@ -84,7 +197,7 @@ class DepotBuilder:
         This property gets all depots sorted by latest time must be delivred.
         '''
         sorted_depots_to_be_assigned = sorted([depot
-                                               for depot in self.build_depots().values()
+                                               for depot in self._depots.values()
                                                if depot.depot_name != 0])  # 0 is warehouse
         return sorted_depots_to_be_assigned
 
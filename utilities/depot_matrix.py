@@ -0,0 +1,219 @@
+import hashlib
+import os
+from typing import Callable, List, Tuple
+import numpy as np
+import pandas as pd
+
+
+class DepotMatrix:
+    pass
+
+
+class DepotMatrix:
+    def __init__(self, values: np.ndarray, unit_divisor: float = 1) -> None:
+        '''
+        DepotMatrix stores a depot x depot matrix (e.g., c_ij.csv, t_ij.csv) as one contiguous array,
+        instead of one dict per depot.
+        -------------------------------------------------------------------------------------------
+        Params:
+        values: raw values as written in csv, can be a np.memmap
+        unit_divisor: values are divided by it when being read, e.g., meter -> km is 1000
+        '''
+        self._values = values
+        self.unit_divisor = unit_divisor
+        self._number_of_depots = values.shape[1]
+
+    @classmethod
+    def from_rows(cls, rows: List[List[float]]) -> DepotMatrix:
+        return cls(np.asarray(rows, dtype=np.float64))
+
+    @classmethod
+    def from_csv(cls,
+                 file_name: str,
+                 unit_divisor: float = 1,
+                 dtype: type = np.float64,
+                 cache_dir: str = None) -> DepotMatrix:
+        '''
+        cache_dir is None: the whole matrix is loaded into memory.
+        otherwise: the csv is converted once into a .npy file in cache_dir, which is memory-mapped (read-only) afterwards,
+        so only the pages being read are loaded into memory.
+
+        P.S. integer dtype (e.g., np.uint32) rounds the raw csv value, e.g., 949.9999998 -> 950
+        '''
+        if cache_dir is None:
+            values = pd.read_csv(file_name, index_col=0).to_numpy()
+            return cls(cls._cast(values, dtype), unit_divisor)
+
+        os.makedirs(cache_dir, exist_ok=True)
+        cached_file_name = os.path.join(cache_dir, cls._get_cached_file_name(file_name, dtype))
+        number_of_depots = len(pd.read_csv(file_name, index_col=0, nrows=0).columns)
+        if not os.path.exists(cached_file_name):
+            cls._convert_csv_to_npy(file_name, cached_file_name, dtype)
+        values = np.load(cached_file_name, mmap_mode="r")
+        if values.shape != (number_of_depots, number_of_depots):
+            # e.g., a cache file left by an interrupted / foreign run, never trusted over the csv
+            del values
+            cls._convert_csv_to_npy(file_name, cached_file_name, dtype)
+            values = np.load(cached_file_name, mmap_mode="r")
+
+        return cls(values, unit_divisor)
+
+    @staticmethod
+    def _get_cached_file_name(file_name: str, dtype: type) -> str:
+        '''
+        keyed by the absolute path, size and mtime of the csv, so that datasets sharing a cache_dir never share a cache file,
+        and editing the csv invalidates its cache file
+        '''
+        file_status = os.stat(file_name)
+        key = f"{os.path.abspath(file_name)}:{file_status.st_size}:{file_status.st_mtime_ns}"
+        csv_name = os.path.splitext(os.path.basename(file_name))[0]
+        return f"{csv_name}.{hashlib.sha256(key.encode()).hexdigest()[:16]}.{np.dtype(dtype).name}.npy"
+
+    @staticmethod
+    def _cast(values: np.ndarray, dtype: type) -> np.ndarray:
+        if np.issubdtype(dtype, np.integer):
+            return np.rint(values).astype(dtype)
+        return values.astype(dtype)
+
+    @classmethod
+    def _convert_csv_to_npy(cls, file_name: str, cached_file_name: str, dtype: type, chunk_size: int = 256) -> None:
+        '''
+        The csv is read chunk by chunk, so that converting a large matrix never holds it entirely in memory.
+        '''
+        number_of_depots = len(pd.read_csv(file_name, index_col=0, nrows=0).columns)
+        temp_file_name = f"{cached_file_name}.tmp"
+        values = np.lib.format.open_memmap(temp_file_name, mode="w+", dtype=dtype,
+                                           shape=(number_of_depots, number_of_depots))
+        start_row = 0
+        for chunk in pd.read_csv(file_name, index_col=0, chunksize=chunk_size):
+            values[start_row: start_row + len(chunk)] = cls._cast(chunk.to_numpy(), dtype)
+            start_row += len(chunk)
+        values.flush()
+        del values
+        os.replace(temp_file_name, cached_file_name)
+
+    @property
+    def number_of_depots(self) -> int:
+        return self._number_of_depots
+
+    @property
+    def values(self) -> np.ndarray:
+        '''
+        raw values (not divided by unit_divisor)
+        '''
+        return self._values
+
+    def __len__(self) -> int:
+        return self._number_of_depots
+
+    def __getitem__(self, from_and_to_depot: Tuple[int, int]) -> float:
+        from_depot, to_depot = from_and_to_depot
+        return float(self._values[from_depot, to_depot]) / self.unit_divisor
+
+    def row(self, depot_idx: int) -> np.ndarray:
+        return np.asarray(self._values[depot_idx], dtype=np.float64) / self.unit_divisor
+
+    def take(self, from_depots: np.ndarray, to_depots: np.ndarray) -> np.ndarray:
+        '''
+        values of many pairs at once, the same as self[from_depot, to_depot] of each pair
+        '''
+        return np.asarray(self._values[from_depots, to_depots], dtype=np.float64) / self.unit_divisor
+
+
+class NearestDepotMatrix(DepotMatrix):
+    def __init__(self,
+                 fallback: 'DepotMatrix | Callable[[int, int], float]',
+                 number_of_neighbors: int,
+                 number_of_depots: int = None,
+                 warehouse_depot: int = 0) -> None:
+        '''
+        NearestDepotMatrix keeps only the k nearest depots of each depot in memory (plus the warehouse, which every route goes through),
+        and reads far pairs on demand from 'fallback',
+        which is either a (memory-mapped) DepotMatrix, or a function returning the value (already divided by unit) of a given pair.
+        '''
+        if isinstance(fallback, DepotMatrix):
+            number_of_depots = fallback.number_of_depots
+        if number_of_depots is None:
+            raise ValueError("'number_of_depots' must be given when 'fallback' is not a DepotMatrix")
+
+        self._fallback = fallback
+        self._number_of_depots = number_of_depots
+        self.unit_divisor = 1
+        self.number_of_neighbors = min(number_of_neighbors, number_of_depots)
+        self.warehouse_depot = warehouse_depot
+
+        self._neighbor_depots, self._neighbor_values = self._find_nearest_depots()
+        self._warehouse_row = self._read_row_from_fallback(warehouse_depot)
+        self._warehouse_column = np.array([self._read_from_fallback(depot_idx, warehouse_depot)
+                                           for depot_idx in range(number_of_depots)])
+
+    def _read_from_fallback(self, from_depot: int, to_depot: int) -> float:
+        if isinstance(self._fallback, DepotMatrix):
+            return self._fallback[from_depot, to_depot]
+        return self._fallback(from_depot, to_depot)
+
+    def _read_row_from_fallback(self, depot_idx: int) -> np.ndarray:
+        if isinstance(self._fallback, DepotMatrix):
+            return self._fallback.row(depot_idx)
+        return np.array([self._fallback(depot_idx, to_depot) for to_depot in range(self._number_of_depots)])
+
+    def _find_nearest_depots(self, chunk_size: int = 256) -> 'Tuple[np.ndarray, np.ndarray]':
+        '''
+        returns k nearest depots of each depot (sorted by depot name for binary search) and their values
+        '''
+        neighbor_depots = np.empty((self._number_of_depots, self.number_of_neighbors), dtype=np.int32)
+        # the same precision as far pairs read from 'fallback' (float64, already divided by unit),
+        # so that keeping neighbors only saves reads, and never changes a value (e.g., m[i, j] == m.row(i)[j])
+        neighbor_values = np.empty((self._number_of_depots, self.number_of_neighbors), dtype=np.float64)
+        for start_row in range(0, self._number_of_depots, chunk_size):
+            end_row = min(start_row + chunk_size, self._number_of_depots)
+            rows = np.stack([self._read_row_from_fallback(depot_idx) for depot_idx in range(start_row, end_row)])
+            nearest = np.argpartition(rows, self.number_of_neighbors - 1, axis=1)[:, :self.number_of_neighbors]
+            nearest.sort(axis=1)
+            neighbor_depots[start_row:end_row] = nearest
+            neighbor_values[start_row:end_row] = np.take_along_axis(rows, nearest, axis=1)
+        return neighbor_depots, neighbor_values
+
+    @property
+    def values(self) -> np.ndarray:
+        return np.stack([self.row(depot_idx) for depot_idx in range(self._number_of_depots)])
+
+    def __getitem__(self, from_and_to_depot: Tuple[int, int]) -> float:
+        from_depot, to_depot = from_and_to_depot
+        if from_depot == self.warehouse_depot:
+            return float(self._warehouse_row[to_depot])
+        if to_depot == self.warehouse_depot:
+            return float(self._warehouse_column[from_depot])
+
+        neighbors = self._neighbor_depots[from_depot]
+        neighbor_idx = np.searchsorted(neighbors, to_depot)
+        if neighbor_idx < len(neighbors) and neighbors[neighbor_idx] == to_depot:
+            return float(self._neighbor_values[from_depot, neighbor_idx])
+
+        return self._read_from_fallback(from_depot, to_depot)
+
+    def row(self, depot_idx: int) -> np.ndarray:
+        if depot_idx == self.warehouse_depot:
+            return self._warehouse_row.copy()
+        return self._read_row_from_fallback(depot_idx)
+
+    def take(self, from_depots: np.ndarray, to_depots: np.ndarray) -> np.ndarray:
+        values = np.empty(len(from_depots))
+        is_from_warehouse = from_depots == self.warehouse_depot
+        values[is_from_warehouse] = self._warehouse_row[to_depots[is_from_warehouse]]
+        is_to_warehouse = ~is_from_warehouse & (to_depots == self.warehouse_depot)
+        values[is_to_warehouse] = self._warehouse_column[from_depots[is_to_warehouse]]
+
+        # binary search of each pair in the neighbors of its from_depot, the same as .__getitem__
+        pairs = np.flatnonzero(~is_from_warehouse & ~is_to_warehouse)
+        neighbors = self._neighbor_depots[from_depots[pairs]]
+        neighbor_idx = np.minimum((neighbors < to_depots[pairs, None]).sum(axis=1), self.number_of_neighbors - 1)
+        is_neighbor = neighbors[np.arange(len(pairs)), neighbor_idx] == to_depots[pairs]
+        values[pairs[is_neighbor]] = self._neighbor_values[from_depots[pairs[is_neighbor]], neighbor_idx[is_neighbor]]
+
+        far_pairs = pairs[~is_neighbor]
+        if isinstance(self._fallback, DepotMatrix):
+            values[far_pairs] = self._fallback.take(from_depots[far_pairs], to_depots[far_pairs])
+        else:
+            values[far_pairs] = [self._fallback(from_depot, to_depot) for from_depot, to_depot in zip(from_depots[far_pairs], to_depots[far_pairs])]
+        return values
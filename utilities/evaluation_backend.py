@@ -0,0 +1,381 @@
+import warnings
+from typing import Callable, Dict, List
+import numpy as np
+from .base_class import BuilderFactory
+from .constraint_checker import ConstraintChecker
+from .instance_arrays import InstanceArrays
+from .optimizer import Optimizer
+from .route_resource_calculator import RouteResourceCalculator
+# e.g.,  {0: [], 1: [0, 8, 6, 0], 2: [0, 7, 5, 0], 3: [0, 3, 0], 4: []}
+Solution = Dict[int, List[int]]
+
+
+def _find_shortage_flags(route: np.ndarray, demand: np.ndarray, capacity: np.ndarray) -> np.ndarray:
+    '''
+    Same rule as Optimizer._find_shortage_points_in_route_helper:
+    a depot is a shortage point if any product runs out (<= 0) after discharging it,
+    the vehicle then replenishes before that depot.
+    Vectorized trip by trip: what is left after each depot is the capacity minus the cumulative demand since the last shortage point,
+    so a route takes one np.cumsum per shortage point (demand is integral, so the floats are the same as discharging one by one).
+    '''
+    shortage_flags = np.zeros(route.shape[0], dtype=np.bool_)
+    route_demand = demand[route]
+    trip_start = 0
+    while trip_start < route.shape[0]:
+        is_out_of_stock = (capacity - route_demand[trip_start:].cumsum(axis=0) <= 0).any(axis=1)
+        # a trip starting at a shortage point is replenished right before it, so that depot isn't checked again
+        is_out_of_stock[0] &= not shortage_flags[trip_start]
+        if not is_out_of_stock.any():
+            break
+        trip_start += int(np.argmax(is_out_of_stock))
+        shortage_flags[trip_start] = True
+    return shortage_flags
+
+
+def _calculate_route_time(route: np.ndarray, delivery_time: np.ndarray, shipement_discharging_time: float) -> float:
+    '''
+    Same as RouteResourceCalculator._calculate_time_for_current_route, np.cumsum adds up in the same order as the reference
+    '''
+    total_delivery_time = delivery_time[route[:-1], route[1:]].cumsum()[-1]
+    total_service_time = np.full(route.shape[0] - 1, shipement_discharging_time).cumsum()[-1]
+    return float(total_delivery_time + total_service_time)
+
+
+def _shortage_flags_kernel(route: np.ndarray, demand: np.ndarray, capacity: np.ndarray) -> np.ndarray:
+    '''
+    Same as _find_shortage_flags, written with plain loops to be compiled by numba.
+    '''
+    number_of_products = capacity.shape[0]
+    remaining = capacity.copy()
+    shortage_flags = np.zeros(route.shape[0], dtype=np.bool_)
+    for position in range(route.shape[0]):
+        depot_idx = route[position]
+        is_out_of_stock = False
+        for product_idx in range(number_of_products):
+            remaining[product_idx] -= demand[depot_idx, product_idx]
+            if remaining[product_idx] <= 0:
+                is_out_of_stock = True
+        if is_out_of_stock:
+            shortage_flags[position] = True
+            for product_idx in range(number_of_products):
+                remaining[product_idx] = capacity[product_idx] - demand[depot_idx, product_idx]
+    return shortage_flags
+
+
+def _time_window_kernel(shortage_route: np.ndarray, demand: np.ndarray, capacity: np.ndarray, delivery_time: np.ndarray,
+                        shipement_discharging_time: float, maximum_available_time: float,
+                        earilest_time_can_be_delivered: float, latest_time_must_be_delivered: float) -> bool:
+    '''
+    Same as NumpyEvaluationBackend.is_passing_time_window_constraints as one compiled call (numba pays its overhead per call),
+    where 'shortage_route' is [warehouse depot, *route, checking depot, warehouse depot].
+    '''
+    warehouse_depot = 0
+    number_of_products = capacity.shape[0]
+    remaining = capacity.copy()
+    total_delivery_time = 0.0
+    total_service_time = 0.0
+    previous_depot = -1
+    # the route with a replenishment (warehouse depot) inserted before each shortage point (see _shortage_flags_kernel),
+    # summed in the same order as the reference
+    for position in range(shortage_route.shape[0]):
+        depot_idx = shortage_route[position]
+        is_out_of_stock = False
+        for product_idx in range(number_of_products):
+            remaining[product_idx] -= demand[depot_idx, product_idx]
+            if remaining[product_idx] <= 0:
+                is_out_of_stock = True
+        if is_out_of_stock:
+            for product_idx in range(number_of_products):
+                remaining[product_idx] = capacity[product_idx] - demand[depot_idx, product_idx]
+            if previous_depot != -1:
+                total_delivery_time += delivery_time[previous_depot, warehouse_depot]
+                total_service_time += shipement_discharging_time
+            previous_depot = warehouse_depot
+        if previous_depot != -1:
+            total_delivery_time += delivery_time[previous_depot, depot_idx]
+            total_service_time += shipement_discharging_time
+        previous_depot = depot_idx
+    total_time_of_completing_route = total_delivery_time + total_service_time
+    if total_time_of_completing_route > maximum_available_time:
+        return False
+
+    checking_depot_idx = shortage_route[shortage_route.shape[0] - 2]
+    total_time_before_arriving_checking_depot_idx = total_time_of_completing_route - delivery_time[checking_depot_idx, warehouse_depot]
+    total_time_before_arriving_checking_depot_idx -= shipement_discharging_time
+    if total_time_before_arriving_checking_depot_idx < earilest_time_can_be_delivered:
+        return False
+    if total_time_before_arriving_checking_depot_idx > latest_time_must_be_delivered:
+        return False
+    return True
+
+
+def _solution_resources_kernel(edge_starts: np.ndarray, edge_ends: np.ndarray, edge_vehicles: np.ndarray,
+                               distance: np.ndarray, delivery_time: np.ndarray,
+                               shipement_discharging_time: np.ndarray) -> np.ndarray:
+    '''
+    returns [total_distance, total_delivery_time, total_service_time], summed in the same order as the reference
+    '''
+    total_distance = 0.0
+    total_delivery_time = 0.0
+    total_service_time = 0.0
+    for edge_idx in range(edge_starts.shape[0]):
+        total_delivery_time += delivery_time[edge_starts[edge_idx], edge_ends[edge_idx]]
+        total_service_time += shipement_discharging_time[edge_vehicles[edge_idx]]
+        total_distance += distance[edge_starts[edge_idx], edge_ends[edge_idx]]
+    result = np.empty(3)
+    result[0] = total_distance
+    result[1] = total_delivery_time
+    result[2] = total_service_time
+    return result
+
+
+class EvaluationBackend:
+    name = None
+
+    def calculate_solution_resources(self, solution: Solution) -> Dict[str, 'float | int']:
+        '''
+        same as RouteResourceCalculator.calculate_solution_resources
+        '''
+        raise NotImplementedError
+
+    def find_shortage_points(self, vehicle_idx: int, route: List[int]) -> List[int]:
+        '''
+        same as Optimizer._find_shortage_points_in_route_helper
+        '''
+        raise NotImplementedError
+
+    def is_passing_time_window_constraints(self, vehicle_idx: int, temp_assinged_route: List[int], checking_depot_idx: int) -> bool:
+        '''
+        same as ConstraintChecker.is_passing_time_window_constraints
+        '''
+        raise NotImplementedError
+
+
+class PythonEvaluationBackend(EvaluationBackend):
+    name = "python"
+
+    def __init__(self, factory: BuilderFactory) -> None:
+        '''
+        The reference implementation, i.e., the loops over Depot and Vehicle objects.
+        '''
+        reference_factory = BuilderFactory(factory=factory)
+        reference_factory.evaluation_backend = None  # never delegate back to a backend
+        self.resource_calc = RouteResourceCalculator(reference_factory)
+        self.optimizer = Optimizer(reference_factory)
+        self.checker = ConstraintChecker(reference_factory)
+
+    def calculate_solution_resources(self, solution: Solution) -> Dict[str, 'float | int']:
+        return self.resource_calc.calculate_solution_resources(solution)
+
+    def find_shortage_points(self, vehicle_idx: int, route: List[int]) -> List[int]:
+        return self.optimizer._find_shortage_points_in_route_helper(vehicle_idx, route)
+
+    def is_passing_time_window_constraints(self, vehicle_idx: int, temp_assinged_route: List[int], checking_depot_idx: int) -> bool:
+        return self.checker.is_passing_time_window_constraints(vehicle_idx, temp_assinged_route, checking_depot_idx)
+
+
+class NumpyEvaluationBackend(EvaluationBackend):
+    name = "numpy"
+
+    def __init__(self, factory: BuilderFactory, instance_arrays: InstanceArrays = None) -> None:
+        '''
+        Vectorized over InstanceArrays: a route (or all edges of a solution) is one array, and sums are taken with np.cumsum
+        (sequential, thus identical to the reference), shortage points take one np.cumsum per trip (see _find_shortage_flags).
+        '''
+        self.instance = instance_arrays if instance_arrays is not None else InstanceArrays.from_factory(factory)
+        self._shortage_flags = _find_shortage_flags
+
+    def _to_edges(self, solution: Solution) -> 'tuple[np.ndarray, np.ndarray, np.ndarray, List[int], int]':
+        edge_starts = []
+        edge_ends = []
+        edge_vehicles = []
+        assigned_vehicles = []
+        number_of_replenishments = 0
+        for vehicle_idx, route in solution.items():
+            if len(route) == 0:
+                continue
+            assigned_vehicles.append(vehicle_idx)
+            route = np.asarray(route, dtype=np.int64)
+            edge_starts.append(route[:-1])
+            edge_ends.append(route[1:])
+            edge_vehicles.append(np.full(len(route) - 1, vehicle_idx, dtype=np.int64))
+            number_of_replenishments += int(np.count_nonzero(route[1:-1] == 0))
+
+        if len(assigned_vehicles) == 0:
+            empty = np.empty(0, dtype=np.int64)
+            return empty, empty, empty, assigned_vehicles, number_of_replenishments
+        return (np.concatenate(edge_starts), np.concatenate(edge_ends), np.concatenate(edge_vehicles),
+                assigned_vehicles, number_of_replenishments)
+
+    def _sum_edges(self, edge_starts: np.ndarray, edge_ends: np.ndarray, edge_vehicles: np.ndarray) -> np.ndarray:
+        if len(edge_starts) == 0:
+            return np.zeros(3)
+        return np.array([np.cumsum(self.instance.distance[edge_starts, edge_ends])[-1],
+                         np.cumsum(self.instance.delivery_time[edge_starts, edge_ends])[-1],
+                         np.cumsum(self.instance.shipement_discharging_time[edge_vehicles])[-1]])
+
+    def calculate_solution_resources(self, solution: Solution) -> Dict[str, 'float | int']:
+        edge_starts, edge_ends, edge_vehicles, assigned_vehicles, number_of_replenishments = self._to_edges(solution)
+        total_distance, total_delivery_time, total_service_time = (float(total) for total in
+                                                                   self._sum_edges(edge_starts, edge_ends, edge_vehicles))
+        vehicle_total_fixed_cost = 0
+        for vehicle_idx in assigned_vehicles:
+            vehicle_total_fixed_cost += self.instance.fixed_cost[vehicle_idx]
+
+        # same as the reference, fuel fee is based on the last assigned vehicle
+        last_vehicle_idx = assigned_vehicles[-1]
+        fuel_fee = total_distance * self.instance.fuel_fee[last_vehicle_idx] * self.instance.fuel_efficiency[last_vehicle_idx]
+        time_on_duty_in_minute = total_delivery_time + total_service_time
+        driver_cost = (time_on_duty_in_minute / 60) * 60
+
+        return {"fuel_fee": float(fuel_fee),
+                "distance": total_distance,
+                "delivery_time": total_delivery_time,
+                "service_time": total_service_time,
+                "total_time": time_on_duty_in_minute,
+                "vehicle_total_fixed_cost": float(vehicle_total_fixed_cost),
+                "driver_cost": driver_cost,
+                "number_of_replenishment": number_of_replenishments,
+                "number_of_vehicles_assigned": len(assigned_vehicles)}
+
+    def find_shortage_points(self, vehicle_idx: int, route: List[int]) -> List[int]:
+        route = np.asarray(route, dtype=np.int64)
+        shortage_flags = self._shortage_flags(route, self.instance.demand, self.instance.capacity[vehicle_idx])
+        return route[shortage_flags].tolist()
+
+    def is_passing_time_window_constraints(self, vehicle_idx: int, temp_assinged_route: List[int], checking_depot_idx: int) -> bool:
+        warehouse_depot = 0
+        shortage_route = np.array([warehouse_depot, *temp_assinged_route, checking_depot_idx, warehouse_depot], dtype=np.int64)
+        shortage_flags = self._shortage_flags(shortage_route, self.instance.demand, self.instance.capacity[vehicle_idx])
+        # a replenishment (warehouse depot) is inserted before each shortage point, i.e., the first one of each repeated shortage point
+        non_shortage_route = shortage_route
+        if shortage_flags.any():
+            shortage_positions = np.flatnonzero(shortage_flags)
+            non_shortage_route = np.repeat(shortage_route, shortage_flags + 1)
+            non_shortage_route[shortage_positions + np.arange(len(shortage_positions))] = warehouse_depot
+
+        shipement_discharging_time = self.instance.shipement_discharging_time[vehicle_idx]
+        total_time_of_completing_route = _calculate_route_time(non_shortage_route, self.instance.delivery_time, shipement_discharging_time)
+        if total_time_of_completing_route > self.instance.maximum_available_time[vehicle_idx]:
+            return False
+
+        total_time_before_arriving_checking_depot_idx = (total_time_of_completing_route -
+                                                         self.instance.delivery_time[checking_depot_idx, warehouse_depot])
+        total_time_before_arriving_checking_depot_idx -= shipement_discharging_time
+        if total_time_before_arriving_checking_depot_idx < self.instance.earilest_time_can_be_delivered[checking_depot_idx]:
+            return False
+        if total_time_before_arriving_checking_depot_idx > self.instance.latest_time_must_be_delivered[checking_depot_idx]:
+            return False
+        return True
+
+
+def is_numba_available() -> bool:
+    try:
+        import numba  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class NumbaEvaluationBackend(NumpyEvaluationBackend):
+    name = "numba"
+    _compiled_kernels: Dict[str, Callable] = {}
+
+    def __init__(self, factory: BuilderFactory, instance_arrays: InstanceArrays = None) -> None:
+        '''
+        Same as NumpyEvaluationBackend, with loop kernels compiled by numba (only when numba is installed),
+        each public method is one compiled call, as numba's overhead is paid per call.
+        '''
+        super().__init__(factory, instance_arrays)
+        kernels = self._compile_kernels()
+        self._shortage_flags = kernels["shortage_flags"]
+        self._time_window = kernels["time_window"]
+        self._solution_resources = kernels["solution_resources"]
+
+    @classmethod
+    def _compile_kernels(cls) -> Dict[str, Callable]:
+        if len(cls._compiled_kernels) == 0:
+            import numba
+            cls._compiled_kernels = {"shortage_flags": numba.njit(cache=True)(_shortage_flags_kernel),
+                                     "time_window": numba.njit(cache=True)(_time_window_kernel),
+                                     "solution_resources": numba.njit(cache=True)(_solution_resources_kernel)}
+        return cls._compiled_kernels
+
+    def is_passing_time_window_constraints(self, vehicle_idx: int, temp_assinged_route: List[int], checking_depot_idx: int) -> bool:
+        warehouse_depot = 0
+        shortage_route = np.array([warehouse_depot, *temp_assinged_route, checking_depot_idx, warehouse_depot], dtype=np.int64)
+        return self._time_window(shortage_route, self.instance.demand, self.instance.capacity[vehicle_idx], self.instance.delivery_time,
+                                 self.instance.shipement_discharging_time[vehicle_idx], self.instance.maximum_available_time[vehicle_idx],
+                                 self.instance.earilest_time_can_be_delivered[checking_depot_idx],
+                                 self.instance.latest_time_must_be_delivered[checking_depot_idx])
+
+    def _sum_edges(self, edge_starts: np.ndarray, edge_ends: np.ndarray, edge_vehicles: np.ndarray) -> np.ndarray:
+        return self._solution_resources(edge_starts, edge_ends, edge_vehicles, self.instance.distance,
+                                        self.instance.delivery_time, self.instance.shipement_discharging_time)
+
+
+EVALUATION_BACKENDS = {"python": PythonEvaluationBackend,
+                       "numpy": NumpyEvaluationBackend,
+                       "numba": NumbaEvaluationBackend}
+
+
+def get_evaluation_backend(name: str, factory: BuilderFactory) -> EvaluationBackend:
+    '''
+    name: "python", "numpy", "numba" or "auto" (numba if installed, otherwise numpy)
+    "numba" falls back to "numpy" (with a warning) when numba is not installed,
+    or when c_ij / t_ij are not in memory as a whole (matrix_storage "sparse" / "memmap", see InstanceArrays.is_dense),
+    which compiled kernels can't read.
+    '''
+    is_auto = name == "auto"
+    if is_auto:
+        name = "numba" if is_numba_available() else "numpy"
+    if name not in EVALUATION_BACKENDS:
+        raise ValueError(f"'name' must be one of the following: {['auto', *EVALUATION_BACKENDS]}, given {name}")
+    if name == "numba" and not is_numba_available():
+        warnings.warn("numba is not installed, falling back to 'numpy' evaluation backend")
+        name = "numpy"
+    if name == "python":
+        return PythonEvaluationBackend(factory)
+
+    instance_arrays = InstanceArrays.from_factory(factory)
+    if name == "numba" and not instance_arrays.is_dense:
+        if not is_auto:
+            warnings.warn("c_ij / t_ij are not in memory as a whole, falling back to 'numpy' evaluation backend")
+        name = "numpy"
+    return EVALUATION_BACKENDS[name](factory, instance_arrays)
+
+
+def check_backend_conformance(factory: BuilderFactory, solutions: List[Solution], backend_names: List[str] = None) -> Dict[str, List[str]]:
+    '''
+    Compares every backend with the reference ("python") backend on 'solutions'
+    (their costs, shortage points of each route, and time window checks of each depot in each route).
+    returns {backend name: [mismatch descriptions]}, all lists are empty if the backends conform.
+    '''
+    if backend_names is None:
+        backend_names = ["numpy", "numba"] if is_numba_available() else ["numpy"]
+    reference = PythonEvaluationBackend(factory)
+    warehouse_depot = 0
+    mismatches = {}
+    for backend_name in backend_names:
+        backend = get_evaluation_backend(backend_name, factory)
+        mismatches[backend_name] = []
+        for solution in solutions:
+            expected_resources = reference.calculate_solution_resources(solution)
+            resources = backend.calculate_solution_resources(solution)
+            for resource, amount in expected_resources.items():
+                if resources[resource] != amount:
+                    mismatches[backend_name].append(f"{solution}: {resource} {resources[resource]} != {amount}")
+
+            for vehicle_idx, route in solution.items():
+                route_without_warehouse_depot = [depot_idx for depot_idx in route if depot_idx != warehouse_depot]
+                if len(route_without_warehouse_depot) == 0:
+                    continue
+                shortage_route = [warehouse_depot, *route_without_warehouse_depot, warehouse_depot]
+                if backend.find_shortage_points(vehicle_idx, shortage_route) != reference.find_shortage_points(vehicle_idx, shortage_route):
+                    mismatches[backend_name].append(f"{solution}: shortage points of vehicle {vehicle_idx}")
+                for position, checking_depot_idx in enumerate(route_without_warehouse_depot):
+                    temp_assinged_route = route_without_warehouse_depot[:position]
+                    if (backend.is_passing_time_window_constraints(vehicle_idx, temp_assinged_route, checking_depot_idx) !=
+                            reference.is_passing_time_window_constraints(vehicle_idx, temp_assinged_route, checking_depot_idx)):
+                        mismatches[backend_name].append(f"{solution}: time window of depot {checking_depot_idx} (vehicle {vehicle_idx})")
+    return mismatches
@@ -1,7 +1,18 @@
-from typing import List
+from typing import Dict, Iterator, List
+from time import time
+from .base_class import BuilderFactory
+from .batch_constraint_checker import BatchConstraintChecker
+from .batch_mutation_strategy import BatchMutationStrategy
+from .constraint_checker import ConstraintChecker
+from .crossover_strategy import CrossoverStrategy
+from .memory_profiler import MemoryProfiler
+from .mutation_strategy import MutationStrategy
+from .operator_portfolio import OperatorPortfolio
+from .population import Population
+from .random_stream import RandomStream
 from .solution_chromosome import SolutionChromosome
 from .solution_generator import SolutionGenerator
-from random import random
+from .solve_result import SolveResult
 from copy import deepcopy
 import numpy as np
 
@@ -10,11 +21,68 @@ class GeneticAlgorithm:
     def __init__(self, population_size,
                  mutation_rate,
                  crossover_rate,
-                 maximum_iteration) -> None:
-        self.solution_generator = SolutionGenerator()
+                 maximum_iteration,
+                 factory: BuilderFactory = None,
+                 verbose: bool = True,
+                 time_limit: float = None,
+                 seeding_ratio: float = 0,
+                 operator_selection: str = "uniform",
+                 diversity_weight: float = None,
+                 number_of_elites: int = 1,
+                 memory_profiling: bool = False,
+                 feasibility_filter: bool = False,
+                 seed: 'int | np.random.SeedSequence' = None,
+                 batch_mutation: bool = False) -> None:
+        '''
+        factory: the BuilderFactory (i.e., problem instance) to solve, defaults to the default dataset
+        verbose: print progress of each iteration
+        maximum_iteration: number of generations, the mutation / crossover rates are scheduled over them,
+                           None means only 'time_limit' stops evolving, and the rates are scheduled over it instead
+        time_limit: seconds, stop evolving once exceeded (checked between iterations) even if maximum_iteration is not reached
+        seeding_ratio: the fraction of the initial population built by ConstructiveHeuristic, the rest is generated randomly
+        operator_selection: "uniform" or "adaptive", how mutation / crossover operators are chosen, see OperatorPortfolio and .operator_statistics
+        diversity_weight: if given, parents and children compete for survival by biased fitness (clones rejected, see Population.select_survivors),
+                          the larger the more diverse the population is kept, otherwise children replace the whole population
+        number_of_elites: the fittest chromosomes always surviving, only used with 'diversity_weight'
+        memory_profiling: record memory of each generation with tracemalloc (slow), exported as SolveResult.memory_profile, see MemoryProfiler
+        feasibility_filter: children violating any constraint are discarded (a whole generation checked at once by BatchConstraintChecker)
+                            and bred again, see ._breed_feasible_children
+        seed: seed of .random_stream, which every random decision (initial population, selection, mutation, crossover) is drawn from,
+              the same seed gives the same result, unless the result depends on timing (i.e., 'time_limit', "adaptive" operator_selection)
+        batch_mutation: children of a whole generation are mutated at once by BatchMutationStrategy (array operations over all their routes)
+                        rather than route by route, mutation operators are then chosen uniformly, i.e., 'operator_selection' only applies to crossover
+        '''
+        if maximum_iteration is None and time_limit is None:
+            raise ValueError("'maximum_iteration' and 'time_limit' must not both be None")
+        self.verbose = verbose
+        self.random_stream = RandomStream(seed)
+        self.time_limit = time_limit
+        self.seeding_ratio = seeding_ratio
+        self.mutation_portfolio = OperatorPortfolio(MutationStrategy.OPERATOR_NAMES, operator_selection, random_stream=self.random_stream)
+        self.crossover_portfolio = OperatorPortfolio(CrossoverStrategy.OPERATOR_NAMES, operator_selection, random_stream=self.random_stream)
+        self.operator_probabilities_history = []  # probabilities of operators after each generation
+        self.diversity_weight = diversity_weight
+        self.number_of_elites = number_of_elites
+        # mean broken-pair distance and number of distinct solutions of each generation, see Population
+        self.diversity_history = []
+        self._number_of_distinct_fitness = None
+        self._number_of_distinct_solutions = None
+        self.memory_profiler = MemoryProfiler() if memory_profiling else None
+        if factory is None:
+            self.solution_generator = SolutionGenerator(verbose=verbose, random_stream=self.random_stream)
+        else:
+            self.solution_generator = SolutionGenerator(ConstraintChecker(factory), factory, verbose, self.random_stream)
+        self.batch_checker = BatchConstraintChecker(self.solution_generator.factory) if feasibility_filter else None
+        self.batch_mutation = batch_mutation
+        self.batch_mutation_strategy = None  # built once the immutable depots are known, see ._generate_initial_population
+        self.MAXIMUM_BREEDING_ATTEMPT = 10
+        self.start_time = None
         self.population_size = population_size
         self.population = None
+        # the same chromosomes as .population, whose columns rank it every generation, see ._update_population_info
+        self._population = None
         self.total_fitness_of_current_population = None
+        self._cumulative_fitness = None  # of the current population, for roulette wheel selection
 
         self.current_iteration = 0
         self.maximum_iteration = maximum_iteration
@@ -25,12 +93,25 @@ class GeneticAlgorithm:
         self.max_mutation_rate = mutation_rate
         self.max_crossover_rate = crossover_rate
 
-        self.mutation_rate_lookup = np.linspace(self.max_mutation_rate, 0, self.maximum_iteration)
+        # without maximum_iteration, the rates are scheduled by ._time_progress
+        self.mutation_rate_lookup = None
+        self.crossover_rate_lookup = None
+        if self.maximum_iteration is not None:
+            self.mutation_rate_lookup = np.linspace(self.max_mutation_rate, 0, self.maximum_iteration)
 
-        self.crossover_rate_lookup = np.linspace(0, self.max_crossover_rate, self.maximum_iteration)
+            self.crossover_rate_lookup = np.linspace(0, self.max_crossover_rate, self.maximum_iteration)
+
+    @property
+    def _time_progress(self) -> float:
+        '''
+        the fraction of time_limit elapsed, which schedules the rates the way current_iteration / maximum_iteration does
+        '''
+        return min((time() - self.start_time) / self.time_limit, 1) if self.time_limit > 0 else 1
 
     @property
     def current_level_mutation_rate(self) -> float:
+        if self.mutation_rate_lookup is None:
+            return self.max_mutation_rate * (1 - self._time_progress)
         if self.current_iteration > len(self.mutation_rate_lookup) - 1:
             return self.mutation_rate_lookup[-1]
 
@@ -38,27 +119,46 @@ class GeneticAlgorithm:
 
     @property
     def current_level_crossover_rate(self) -> float:
+        if self.crossover_rate_lookup is None:
+            return self.max_crossover_rate * self._time_progress
         if self.current_iteration > len(self.crossover_rate_lookup) - 1:
             return self.crossover_rate_lookup[-1]
 
         return self.crossover_rate_lookup[self.current_iteration]
 
-    def _generate_initial_population(self) -> List[SolutionChromosome]:
-
-        initial_population = self.solution_generator.generate_valid_solutions(self.population_size)
-        # -> [0, 1, 2, 3], remember to choose last one to get the best fitness, chromosome is sorted by 'FITNESS'
-        initial_population.sort()
-
-        self.population = initial_population
-        self.global_best_solution = initial_population[-1]
-        self.current_best_solution = initial_population[-1]
+    def _generate_initial_population(self, initial_population: List[SolutionChromosome] = None) -> List[SolutionChromosome]:
+        '''
+        initial_population: seeds given by the caller (e.g., warm start), otherwise generated by SolutionGenerator
+        '''
+        if initial_population is None:
+            initial_population = []
+            number_of_seeded_solutions = round(self.population_size * self.seeding_ratio)
+            if number_of_seeded_solutions > 0:
+                initial_population.extend(self.solution_generator.generate_seeded_solutions(number_of_seeded_solutions))
+            if len(initial_population) < self.population_size:
+                initial_population.extend(
+                    self.solution_generator.generate_valid_solutions(self.population_size - len(initial_population)))
+            # random generation may give up on a small instance (see SolutionGenerator.generate_valid_solutions), the rest is seeded
+            if len(initial_population) < self.population_size and number_of_seeded_solutions < self.population_size:
+                initial_population.extend(self.solution_generator.generate_seeded_solutions(self.population_size - len(initial_population)))
+            if len(initial_population) == 0:
+                raise ValueError("No valid solution is generated for the initial population")
+            # an instance with fewer distinct solutions than population_size
+            self.population_size = min(self.population_size, len(initial_population))
+        initial_population = list(initial_population)
+        for chromosome in initial_population:
+            chromosome.mutation_portfolio = self.mutation_portfolio
+            chromosome.crossover_portfolio = self.crossover_portfolio
+            chromosome.random_stream = self.random_stream
+
+        if self.batch_mutation:
+            self.batch_mutation_strategy = BatchMutationStrategy(initial_population[0].immutable_depot_names, self.random_stream.generator)
+        self._population = Population(keep_clones=True)
+        self.global_best_solution = None
+        self._update_population_info(initial_population)
 
     def _calculate_total_fitness_of_population(self) -> float:
-        total_fitness = 0
-        for chromosome in self.population:
-            total_fitness += chromosome.fitness
-
-        return total_fitness
+        return self._cumulative_fitness[-1]
 
     def _select_a_parent(self) -> List[SolutionChromosome]:
         '''
@@ -67,14 +167,11 @@ class GeneticAlgorithm:
 
         total_fitness = self._calculate_total_fitness_of_population()
         self.total_fitness_of_current_population = total_fitness
-        random_value = random() * total_fitness
-        check_sum = 0
-        selected_idx = 0
-        while (check_sum < random_value and selected_idx < self.population_size):
-            check_sum += self.population[selected_idx].fitness
-            selected_idx += 1
+        random_value = self.random_stream.random() * total_fitness
+        # the first chromosome whose cumulative fitness reaches random_value, by binary search rather than summing up fitness again
+        selected_idx = int(np.searchsorted(self._cumulative_fitness[:self.population_size], random_value))
 
-        return deepcopy(self.population[selected_idx - 1])
+        return deepcopy(self.population[min(selected_idx, self.population_size - 1)])
 
     def _crossover_two_parents_and_get_new_generation_children(self) -> List[SolutionChromosome]:
         '''
@@ -83,9 +180,9 @@ class GeneticAlgorithm:
         while (True):
             parent_x = self._select_a_parent()  # returns a copy of a parent
             parent_y = self._select_a_parent()
-            if (parent_x.fitness != parent_y.fitness):
+            if (parent_x != parent_y):  # different solutions, even of the same fitness
                 break
-            if (self.is_fitness_all_the_same):
+            if (self._number_of_distinct_solutions == 1):
                 return parent_x.crossover(parent_y, self.current_level_crossover_rate)
 
         next_generation_children = parent_x.crossover(parent_y, self.current_level_crossover_rate)
@@ -93,7 +190,8 @@ class GeneticAlgorithm:
         return next_generation_children
     @property
     def is_fitness_all_the_same(self):
-        return len(set([chromosome.fitness for chromosome in self.population])) == 1
+        # counted once per generation, see _update_population_diversity
+        return self._number_of_distinct_fitness == 1
 
     def _mutate_two_children_and_get_mutated_children(self, children: List[SolutionChromosome]) -> List[SolutionChromosome]:
         children_copy = deepcopy(children)
@@ -102,21 +200,59 @@ class GeneticAlgorithm:
 
         return children_copy
 
+    def _batch_mutate_children(self, children: List[SolutionChromosome]) -> List[SolutionChromosome]:
+        '''
+        Same as ._mutate_two_children_and_get_mutated_children over all 'children' at once:
+        each child is mutated with the current mutation rate, i.e., every one of its mutable routes (stacked into one array) is mutated
+        '''
+        mutation_rate = self.current_level_mutation_rate
+        mutated_children = [child for child in children if self.random_stream.random() <= mutation_rate]
+        routes_of_rows = [(child, vehicle_idx) for child in mutated_children for vehicle_idx in child.vehicles_can_be_chosen_for_mutation]
+        if len(routes_of_rows) == 0:
+            return children
+
+        route_array = self.batch_mutation_strategy.to_route_array([child.solution[vehicle_idx] for child, vehicle_idx in routes_of_rows])
+        mutable_mask = self.batch_mutation_strategy.mutable_position_mask(route_array)
+        changed_rows = self.batch_mutation_strategy.mutate(route_array, mutable_mask, 1)
+        for row, route in zip(changed_rows, self.batch_mutation_strategy.to_routes(route_array[changed_rows])):
+            child, vehicle_idx = routes_of_rows[row]
+            child.replace_route(vehicle_idx, route)
+
+        return children
+
 
     def _update_population_info(self, new_population: List[SolutionChromosome]) -> None:
-        new_population.sort()
-        self.population = new_population
-        self.current_best_solution = new_population[-1]
-        self.global_best_solution = max(self.global_best_solution, self.current_best_solution)
+        # chromosomes surviving from the last generation (e.g., elites) stay in ._population, only the others are added
+        self._population.replace(new_population)
+        # -> [0, 1, 2, 3], remember to choose last one to get the best fitness, chromosome is sorted by 'FITNESS'
+        rows = self._population.argsort()
+        self.population = [self._population.chromosomes[row] for row in rows]
+        # summed once per generation, in the same order as roulette wheel selection goes through the population
+        self._cumulative_fitness = np.cumsum(self._population.fitness[rows])
+        self.current_best_solution = self.population[-1]
+        self.global_best_solution = (self.current_best_solution if self.global_best_solution is None
+                                     else max(self.global_best_solution, self.current_best_solution))
+        self._update_population_diversity()
+
+    def _update_population_diversity(self) -> None:
+        # clones have the same fitness, so distinct fitness of the population are those of its distinct solutions
+        self._number_of_distinct_fitness = len(np.unique(self._population.fitness))
+        self._number_of_distinct_solutions = self._population.number_of_distinct_solutions
+        self.diversity_history.append({"mean_broken_pair_distance": self._population.mean_broken_pair_distance,
+                                       "number_of_distinct_solutions": self._number_of_distinct_solutions})
 
     @property
     def _is_termination_criteria_met(self) -> bool:
-        if self.current_iteration >= self.maximum_iteration:
+        if self.maximum_iteration is not None and self.current_iteration >= self.maximum_iteration:
+            return True
+        if self.time_limit is not None and time() - self.start_time >= self.time_limit:
             return True
 
         return False
 
     def _visualize_current_iteration(self) -> None:
+        if not self.verbose:
+            return
         print(f"Iteration: {self.current_iteration} ")
         print(f"Total Fitness: {self.total_fitness_of_current_population}")
         print(f"Best Fitness: {self.current_best_solution.fitness}")
@@ -124,16 +260,121 @@ class GeneticAlgorithm:
         print("-" * 100, '\n')
 
 
-    def solve(self) -> None:
-        self._generate_initial_population()
-        print(f"First Generation Population is Initialized")
-        while not (self._is_termination_criteria_met):
-            next_generation_population = []
-            while (len(next_generation_population) < self.population_size):
-                crossovered_children = self._crossover_two_parents_and_get_new_generation_children()
-                mutated_children = self._mutate_two_children_and_get_mutated_children(crossovered_children) 
-                next_generation_population.extend(mutated_children)
+    @property
+    def operator_statistics(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        '''
+        e.g., {"mutation": {"reverse_mutate": {"number_of_applications": 120, "success_rate": 0.2, "fitness_gain_per_second": 35.1,
+                                                 "probability": 0.6, ...}, ...},
+               "crossover": {...}}
+        '''
+        return {"mutation": self.mutation_portfolio.statistics,
+                "crossover": self.crossover_portfolio.statistics}
 
-            self._update_population_info(next_generation_population)
-            self._visualize_current_iteration()
-            self.current_iteration += 1
+    @property
+    def result(self) -> SolveResult:
+        elapsed_time = 0 if self.start_time is None else time() - self.start_time
+        memory_profile = None if self.memory_profiler is None else self.memory_profiler.to_dict()
+        return SolveResult.from_chromosome(self.global_best_solution, elapsed_time, memory_profile=memory_profile)
+
+    def _breed_children(self, number_of_children: int) -> List[SolutionChromosome]:
+        children = []
+        while (len(children) < number_of_children):
+            crossovered_children = self._crossover_two_parents_and_get_new_generation_children()
+            if self.batch_mutation:
+                # copied as ._mutate_two_children_and_get_mutated_children does, both children may share routes of one parent
+                children.extend(deepcopy(crossovered_children))
+                continue
+            mutated_children = self._mutate_two_children_and_get_mutated_children(crossovered_children) 
+            children.extend(mutated_children)
+
+        if self.batch_mutation:
+            return self._batch_mutate_children(children)
+        return children
+
+    def _breed_feasible_children(self) -> List[SolutionChromosome]:
+        '''
+        Children are bred and checked in batches, infeasible ones are discarded,
+        if not enough feasible children are bred in MAXIMUM_BREEDING_ATTEMPT batches, the fittest parents fill the rest
+        '''
+        feasible_children = []
+        for _ in range(self.MAXIMUM_BREEDING_ATTEMPT):
+            children = self._breed_children(self.population_size - len(feasible_children))
+            is_valid = self.batch_checker.check_solutions([child.solution for child in children])["is_valid"]
+            feasible_children.extend(child for child, is_valid_child in zip(children, is_valid) if is_valid_child)
+            if len(feasible_children) >= self.population_size:
+                return feasible_children
+
+        return feasible_children + self._population.top_k(self.population_size - len(feasible_children))
+
+    def _evolve_one_generation(self) -> None:
+        if self.batch_checker is None:
+            next_generation_population = self._breed_children(self.population_size)
+        else:
+            next_generation_population = self._breed_feasible_children()
+
+        if self.diversity_weight is not None:
+            next_generation_population = Population.select_survivors(self.population + next_generation_population, self.population_size,
+                                                                     self.number_of_elites, self.diversity_weight)
+        self._update_population_info(next_generation_population)
+        if self.memory_profiler is not None:
+            self.memory_profiler.record(self.current_iteration + 1, len(self.population))
+        self.operator_probabilities_history.append({"mutation": self.mutation_portfolio.probabilities,
+                                                    "crossover": self.crossover_portfolio.probabilities})
+        self._visualize_current_iteration()
+        self.current_iteration += 1
+
+    def _evolve(self, initial_population: List[SolutionChromosome] = None) -> Iterator[None]:
+        '''
+        yields once the initial population is generated, then after each generation until the termination criteria are met
+        '''
+        self.start_time = time()
+        if self.memory_profiler is not None:
+            self.memory_profiler.start()
+        try:
+            self._generate_initial_population(initial_population)
+            if self.memory_profiler is not None:
+                self.memory_profiler.record(0, len(self.population))
+            if self.verbose:
+                print(f"First Generation Population is Initialized")
+            yield
+            while not (self._is_termination_criteria_met):
+                self._evolve_one_generation()
+                yield
+        finally:
+            # also when the caller of iter_solve stops early
+            if self.memory_profiler is not None:
+                self.memory_profiler.stop()
+
+    def solve(self, initial_population: List[SolutionChromosome] = None) -> SolveResult:
+        for _ in self._evolve(initial_population):
+            pass
+
+        return self.result
+
+    def iter_solve(self, initial_population: List[SolutionChromosome] = None, every: int = 1) -> Iterator[SolveResult]:
+        '''
+        This method is a public API expected to expose to users.
+        Functionality:
+            Same as .solve, but yields a snapshot (SolveResult of the best solution so far, with .iteration set) once the initial population
+            is generated and then every 'every' generations, the last generation is always yielded.
+            Breaking out of the loop stops solving, .result still holds the best solution so far, e.g.,
+                for snapshot in genetic_algorithm.iter_solve():
+                    if snapshot.total_cost < good_enough_cost:
+                        break
+        -------------------------------------------------------------------------------------------
+        Time spent by the caller between snapshots counts towards 'time_limit'.
+        '''
+        if every < 1:
+            raise ValueError(f"'every' must be at least 1, given {every}")
+        last_yielded_iteration = None
+        for _ in self._evolve(initial_population):
+            if self.current_iteration % every == 0:
+                last_yielded_iteration = self.current_iteration
+                yield self._get_snapshot()
+        if last_yielded_iteration != self.current_iteration:
+            yield self._get_snapshot()
+
+    def _get_snapshot(self) -> SolveResult:
+        snapshot = self.result
+        snapshot.iteration = self.current_iteration
+        return snapshot
@@ -0,0 +1,211 @@
+from typing import Dict, List, Tuple
+from .base_class import BuilderFactory
+# e.g.,  {0: [], 1: [0, 8, 6, 0], 2: [0, 7, 5, 0], 3: [0, 3, 0], 4: []}
+Solution = Dict[int, List[int]]
+
+
+class RouteState:
+    def __init__(self, last_depot: int, remaining_capacity: Dict[str, int], total_delivery_time: float,
+                 total_service_time: float, total_time: float, distance: float) -> None:
+        '''
+        State of a route being built, after delivering its last depot:
+        total_delivery_time, total_service_time, distance: until arriving the last depot
+        total_time: of completing the route (i.e., including going back to warehouse depot)
+        '''
+        self.last_depot = last_depot
+        self.remaining_capacity = remaining_capacity
+        self.total_delivery_time = total_delivery_time
+        self.total_service_time = total_service_time
+        self.total_time = total_time
+        self.distance = distance
+
+
+class GiantTour:
+    def __init__(self, factory: BuilderFactory = None) -> None:
+        '''
+        GiantTour encodes a solution as a single permutation of all depots (its routes concatenated in vehicle order, without warehouse depot),
+        which permutation crossovers work on, and decodes / repairs it back to a valid solution.
+        -------------------------------------------------------------------------------------------
+        A route is built by appending its depots one by one, in O(1) per depot:
+            - depots the vehicle can't deliver (a_ik), or violating time windows / the vehicle's available time, are left out,
+            - replenishment points are inserted the same way as Optimizer (i.e., before the depot running out of any product).
+        Depots left out (or missing) are then inserted at their cheapest feasible position of any route.
+        Time is summed in the same order as ConstraintChecker, so a repaired solution always passes it.
+        '''
+        if factory is None:
+            factory = BuilderFactory()
+        self.depots = factory.depots
+        self.vehicles = factory.vehicles
+        warehouse_depot = 0
+        self.all_depot_names = [depot_idx for depot_idx in self.depots.all_depot_names if depot_idx != warehouse_depot]
+        self.all_vehicle_names = self.vehicles.all_vehicle_names
+
+    def encode(self, solution: Solution) -> Tuple[List[int], List[int], List[int]]:
+        '''
+        returns giant tour, vehicle order (vehicles with depots first) and route length of each vehicle in vehicle order, e.g.,
+        {0: [], 1: [0, 8, 6, 0], 2: [0, 7, 0, 5, 0]} -> [8, 6, 7, 5], [1, 2, 0], [2, 2, 0]
+        '''
+        warehouse_depot = 0
+        giant_tour = []
+        vehicle_order = []
+        route_lengths = []
+        for vehicle_idx, route in solution.items():
+            route_without_warehouse_depot = [depot_idx for depot_idx in route if depot_idx != warehouse_depot]
+            if len(route_without_warehouse_depot) == 0:
+                continue
+            giant_tour.extend(route_without_warehouse_depot)
+            vehicle_order.append(vehicle_idx)
+            route_lengths.append(len(route_without_warehouse_depot))
+        for vehicle_idx in self.all_vehicle_names:
+            if vehicle_idx not in vehicle_order:
+                vehicle_order.append(vehicle_idx)
+                route_lengths.append(0)
+        return giant_tour, vehicle_order, route_lengths
+
+    def decode(self, giant_tour: List[int], vehicle_order: List[int], route_lengths: List[int]) -> 'Solution | None':
+        '''
+        Splits 'giant_tour' into routes of 'route_lengths' (e.g., the lengths of the parent it is crossovered from), then repairs them.
+        returns None if some depots can't be inserted into any route.
+        '''
+        routes = {}
+        start = 0
+        for vehicle_idx, route_length in zip(vehicle_order, route_lengths):
+            routes[vehicle_idx] = list(giant_tour[start: start + route_length])
+            start += route_length
+        # depots beyond the given route lengths, if any
+        return self._repair_routes(routes, list(giant_tour[start:]))
+
+    def repair(self, solution: Solution) -> 'Solution | None':
+        '''
+        This method is a public API expected to expose to users.
+        Functionality:
+            Makes 'solution' valid: removes duplicated depots (the first one is kept), drops infeasible depots from routes,
+            and inserts them (and missing depots) back at their cheapest feasible positions, with replenishment points re-planned.
+            returns None if some depots can't be inserted into any route.
+        '''
+        warehouse_depot = 0
+        assigned_depots = set()
+        routes = {vehicle_idx: [] for vehicle_idx in self.all_vehicle_names}
+        for vehicle_idx, route in solution.items():
+            for depot_idx in route:
+                if depot_idx == warehouse_depot or depot_idx in assigned_depots:
+                    continue
+                assigned_depots.add(depot_idx)
+                routes.setdefault(vehicle_idx, []).append(depot_idx)
+        missing_depots = [depot_idx for depot_idx in self.all_depot_names if depot_idx not in assigned_depots]
+        return self._repair_routes(routes, missing_depots)
+
+    def _start_route(self, vehicle_idx: int) -> RouteState:
+        warehouse_depot = 0
+        return RouteState(warehouse_depot, dict(self.vehicles[vehicle_idx].capacity), 0, 0, 0, 0)
+
+    def _append_depot(self, vehicle_idx: int, route_state: RouteState, depot_idx: int) -> 'Tuple[RouteState, bool] | None':
+        '''
+        Appends 'depot_idx' to a route (in O(1)), returns the new state and whether a replenishment is needed before the depot,
+        or None if the vehicle can't deliver the depot, or the depot violates its time window / the vehicle's available time.
+        '''
+        warehouse_depot = 0
+        vehicle = self.vehicles[vehicle_idx]
+        if depot_idx == warehouse_depot or not vehicle.is_depot_can_be_delivered(depot_idx):
+            return None
+        service_time = vehicle.shipement_discharging_time
+        depot = self.depots[depot_idx]
+        last_depot = self.depots[route_state.last_depot]
+        capacity_after_discharging = {product: amount - depot.demand[product] for product, amount in route_state.remaining_capacity.items()}
+        is_shortage_point = any(amount <= 0 for amount in capacity_after_discharging.values())
+        if is_shortage_point:  # replenish before delivering this depot
+            warehouse = self.depots[warehouse_depot]
+            capacity_after_discharging = {product: amount - depot.demand[product] for product, amount in vehicle.capacity.items()}
+            delivery_time = route_state.total_delivery_time + last_depot.get_delivery_time_to_depot(warehouse_depot)
+            delivery_time += warehouse.get_delivery_time_to_depot(depot_idx)
+            depot_service_time = route_state.total_service_time + service_time + service_time
+            distance = route_state.distance + last_depot.get_distance_to_depot(warehouse_depot) + warehouse.get_distance_to_depot(depot_idx)
+        else:
+            delivery_time = route_state.total_delivery_time + last_depot.get_delivery_time_to_depot(depot_idx)
+            depot_service_time = route_state.total_service_time + service_time
+            distance = route_state.distance + last_depot.get_distance_to_depot(depot_idx)
+
+        # same as ConstraintChecker.is_passing_time_window_constraints
+        delivery_time_to_warehouse = depot.get_delivery_time_to_depot(warehouse_depot)
+        total_time = (delivery_time + delivery_time_to_warehouse) + (depot_service_time + service_time)
+        time_arriving_depot = total_time - delivery_time_to_warehouse - service_time
+        if (total_time > vehicle.maximum_available_time
+                or time_arriving_depot < depot.earilest_time_can_be_delivered
+                or time_arriving_depot > depot.latest_time_must_be_delivered):
+            return None
+        return RouteState(depot_idx, capacity_after_discharging, delivery_time, depot_service_time, total_time, distance), is_shortage_point
+
+    def _build_route(self, vehicle_idx: int, route: List[int]) -> Tuple[List[int], List[int], float]:
+        '''
+        route: without warehouse depot
+        returns the route with warehouse depots and replenishment points, the depots left out, and the total time of the route
+        '''
+        warehouse_depot = 0
+        route_state = self._start_route(vehicle_idx)
+        non_shortage_route = [warehouse_depot]
+        left_out_depots = []
+        for depot_idx in route:
+            appended = self._append_depot(vehicle_idx, route_state, depot_idx)
+            if appended is None:
+                left_out_depots.append(depot_idx)
+                continue
+            route_state, is_shortage_point = appended
+            if is_shortage_point:
+                non_shortage_route.append(warehouse_depot)
+            non_shortage_route.append(depot_idx)
+        non_shortage_route.append(warehouse_depot)
+        return non_shortage_route, left_out_depots, route_state.total_time
+
+    def _calculate_route_cost(self, vehicle_idx: int, non_shortage_route: List[int], total_time: float) -> float:
+        '''
+        fuel fee + fixed cost + driver cost of a route, see RouteResourceCalculator
+        '''
+        if len(non_shortage_route) <= 2:
+            return 0
+        vehicle = self.vehicles[vehicle_idx]
+        distance = 0
+        for idx in range(len(non_shortage_route) - 1):
+            distance += self.depots[non_shortage_route[idx]].get_distance_to_depot(non_shortage_route[idx + 1])
+        return distance * vehicle.fuel_fee * vehicle.fuel_efficiency + vehicle.fixed_cost + (total_time / 60) * 60
+
+    def _repair_routes(self, routes: Dict[int, List[int]], unassigned_depots: List[int]) -> 'Solution | None':
+        built_routes = {}
+        route_costs = {}
+        for vehicle_idx in self.all_vehicle_names:
+            non_shortage_route, left_out_depots, total_time = self._build_route(vehicle_idx, routes.get(vehicle_idx, []))
+            built_routes[vehicle_idx] = non_shortage_route
+            route_costs[vehicle_idx] = self._calculate_route_cost(vehicle_idx, non_shortage_route, total_time)
+            unassigned_depots.extend(left_out_depots)
+
+        # depots of unavailable vehicles, if any
+        for vehicle_idx, route in routes.items():
+            if vehicle_idx not in built_routes:
+                unassigned_depots.extend(route)
+
+        # the tightest depots first, they have the fewest feasible positions
+        warehouse_depot = 0
+        unassigned_depots = sorted(set(unassigned_depots) - {warehouse_depot},
+                                   key=lambda depot_idx: self.depots[depot_idx].latest_time_must_be_delivered)
+        for depot_idx in unassigned_depots:
+            cheapest_insertion = None
+            for vehicle_idx, non_shortage_route in built_routes.items():
+                if not self.vehicles[vehicle_idx].is_depot_can_be_delivered(depot_idx):
+                    continue
+                route = [idx for idx in non_shortage_route if idx != warehouse_depot]
+                for position in range(len(route) + 1):
+                    inserted_route, left_out_depots, total_time = self._build_route(
+                        vehicle_idx, [*route[:position], depot_idx, *route[position:]])
+                    if len(left_out_depots) != 0:
+                        continue
+                    inserted_route_cost = self._calculate_route_cost(vehicle_idx, inserted_route, total_time)
+                    cost_increase = inserted_route_cost - route_costs[vehicle_idx]
+                    if cheapest_insertion is None or cost_increase < cheapest_insertion[0]:
+                        cheapest_insertion = (cost_increase, vehicle_idx, inserted_route, inserted_route_cost)
+            if cheapest_insertion is None:
+                return None
+            _, vehicle_idx, inserted_route, inserted_route_cost = cheapest_insertion
+            built_routes[vehicle_idx] = inserted_route
+            route_costs[vehicle_idx] = inserted_route_cost
+
+        return {vehicle_idx: (non_shortage_route if len(non_shortage_route) > 2 else [])
+                for vehicle_idx, non_shortage_route in sorted(built_routes.items())}
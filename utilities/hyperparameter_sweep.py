@@ -0,0 +1,215 @@
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterator, List
+import numpy as np
+from . import batch_solver
+from .base_class import DEFAULT_BASE_DIR
+from .depot_file import DepotFile
+from .genetic_algorithm import GeneticAlgorithm
+from .vehicle_file import VehicleFile
+
+Trial = Dict[str, object]  # e.g., {"params": {"population_size": 30, "mutation_rate": 0.3, ...}, "seed": 0}
+
+
+def get_dataset_hash(BASE_DIR: str = DEFAULT_BASE_DIR) -> str:
+    '''
+    sha256 of the contents of all csv files of a dataset, i.e., the same for a copied dataset and changed by editing any file
+    '''
+    file_names = sorted(set([*vars(DepotFile(BASE_DIR)).values(), *vars(VehicleFile(BASE_DIR)).values()]))
+    dataset_hash = hashlib.sha256()
+    for file_name in file_names:
+        dataset_hash.update(os.path.basename(file_name).encode())
+        with open(file_name, "rb") as file:
+            for chunk in iter(lambda: file.read(1 << 20), b""):
+                dataset_hash.update(chunk)
+    return dataset_hash.hexdigest()
+
+
+def _run_trial(trial: Trial, time_limit: float) -> Dict[str, object]:
+    genetic_algorithm = GeneticAlgorithm(**trial["params"], factory=batch_solver._worker_factory, verbose=False, time_limit=time_limit,
+                                         seed=trial["seed"])
+    result = genetic_algorithm.solve()
+    return {"fitness": float(result.fitness),
+            "total_cost": float(result.total_cost),
+            "number_of_iterations": genetic_algorithm.current_iteration,
+            "elapsed_time": result.elapsed_time}
+
+
+class HyperparameterSweep:
+    PARAM_NAMES = ["population_size", "mutation_rate", "crossover_rate", "maximum_iteration"]
+
+    def __init__(self,
+                 BASE_DIR: str = DEFAULT_BASE_DIR,
+                 cache_file: str = "hyperparameter_sweep.jsonl",
+                 time_limit: float = 60,
+                 workers: int = None,
+                 matrix_options: Dict[str, object] = None) -> None:
+        '''
+        HyperparameterSweep runs GeneticAlgorithm trials (a set of params and a seed) over a process pool,
+        and caches their results in a jsonl file, one line per trial, so that trials already run are skipped.
+        -------------------------------------------------------------------------------------------
+        A trial is keyed by the dataset (see get_dataset_hash), its params, seed and time_limit,
+        so the same cache file can be shared by sweeps of different datasets (e.g., regions).
+
+        Params:
+        time_limit: seconds each trial may run (GeneticAlgorithm(time_limit=...)), i.e., trials are compared by fitness reached within it
+        workers: number of worker processes, defaults to the number of cpus, 1 means running in the current process
+        matrix_options: see BuilderFactory
+
+        e.g.,
+            sweep = HyperparameterSweep("utilities/dataset/30_15cars", time_limit=30)
+            trials = sweep.grid_search({"population_size": [20, 50], "mutation_rate": [0.1, 0.3]}, seeds=[0, 1, 2])
+            results = list(sweep.run(trials))
+            sweep.best_configuration(results)
+        '''
+        self.BASE_DIR = BASE_DIR
+        self.cache_file = cache_file
+        self.time_limit = time_limit
+        self.workers = workers
+        self.matrix_options = matrix_options if matrix_options is not None else {}
+        self.dataset_hash = get_dataset_hash(BASE_DIR)
+        self.cached_results = self._load_cache()
+
+    def _load_cache(self) -> Dict[str, Dict[str, object]]:
+        cached_results = {}
+        if self.cache_file is None or not os.path.exists(self.cache_file):
+            return cached_results
+        with open(self.cache_file) as file:
+            for line in file:
+                if line.strip() == "":
+                    continue
+                try:
+                    result = json.loads(line)
+                except json.JSONDecodeError:  # e.g., the last line of an interrupted run
+                    continue
+                cached_results[result["key"]] = result
+        return cached_results
+
+    def _append_cache(self, result: Dict[str, object]) -> None:
+        if self.cache_file is None:
+            return
+        with open(self.cache_file, "a") as file:
+            file.write(json.dumps(result) + "\n")
+
+    def _check_params(self, params: Dict[str, object]) -> None:
+        for param_name in params:
+            if param_name not in self.PARAM_NAMES:
+                raise ValueError(f"'param_name' must be one of the following: {self.PARAM_NAMES}, given {param_name}")
+
+    def get_trial_key(self, trial: Trial) -> str:
+        key = {"dataset_hash": self.dataset_hash, "params": trial["params"], "seed": trial["seed"], "time_limit": self.time_limit}
+        return hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+
+    def _complete_params(self, params: Dict[str, object]) -> Dict[str, object]:
+        # params not swept take the same defaults as solve_many, except maximum_iteration,
+        # which is None (i.e., only the time limit stops a trial), so that all trials are compared at the same time budget
+        default_params = {"population_size": 30, "mutation_rate": 0.3, "crossover_rate": 0.7, "maximum_iteration": None}
+        return {**default_params, **params}
+
+    def grid_search(self, param_grid: Dict[str, List[object]], seeds: List[int] = (0,)) -> List[Trial]:
+        '''
+        This method is a public API expected to expose to users.
+        Functionality:
+            Returns trials of every combination of 'param_grid' for every seed, e.g.,
+            {"population_size": [20, 50], "mutation_rate": [0.1, 0.3]}, seeds=[0, 1] -> 8 trials
+        '''
+        self._check_params(param_grid)
+        param_names = sorted(param_grid)
+        return [{"params": self._complete_params(dict(zip(param_names, values))), "seed": seed}
+                for values in itertools.product(*[param_grid[param_name] for param_name in param_names])
+                for seed in seeds]
+
+    def random_search(self,
+                      param_distributions: Dict[str, object],
+                      number_of_configurations: int,
+                      seeds: List[int] = (0,),
+                      sampling_seed: int = None) -> List[Trial]:
+        '''
+        This method is a public API expected to expose to users.
+        Functionality:
+            Returns 'number_of_configurations' randomly sampled params, each for every seed. A distribution is either
+                - a list, chosen from uniformly, e.g., [20, 30, 50], or
+                - a (low, high) tuple, sampled uniformly (integers if both are int), e.g., (0.05, 0.5)
+        '''
+        self._check_params(param_distributions)
+        rng = random.Random(sampling_seed)
+        trials = []
+        for _ in range(number_of_configurations):
+            params = {}
+            for param_name, distribution in sorted(param_distributions.items()):
+                if isinstance(distribution, tuple):
+                    low, high = distribution
+                    params[param_name] = rng.randint(low, high) if isinstance(low, int) and isinstance(high, int) else rng.uniform(low, high)
+                else:
+                    params[param_name] = rng.choice(list(distribution))
+            trials.extend({"params": self._complete_params(params), "seed": seed} for seed in seeds)
+        return trials
+
+    def run(self, trials: List[Trial]) -> Iterator[Dict[str, object]]:
+        '''
+        This method is a public API expected to expose to users.
+        Functionality:
+            Runs 'trials' not in the cache, yielding the result of each trial (cached ones first) as soon as it's done, e.g.,
+            {"key": ..., "dataset_hash": ..., "params": {...}, "seed": 0, "time_limit": 60, "fitness": 95.3, "total_cost": 10493.0,
+             "number_of_iterations": 14, "elapsed_time": 60.2, "is_cached": False}
+            Each result is appended to the cache file as soon as it's done, so an interrupted sweep can be resumed.
+        '''
+        trials_to_run = {}
+        for trial in trials:
+            key = self.get_trial_key(trial)
+            if key in self.cached_results:
+                yield {**self.cached_results[key], "is_cached": True}
+            elif key not in trials_to_run:
+                trials_to_run[key] = trial
+        if len(trials_to_run) == 0:
+            return
+
+        def to_result(key: str, trial: Trial, trial_result: Dict[str, object]) -> Dict[str, object]:
+            result = {"key": key, "dataset_hash": self.dataset_hash, "params": trial["params"], "seed": trial["seed"],
+                      "time_limit": self.time_limit, **trial_result}
+            self.cached_results[key] = result
+            self._append_cache(result)
+            return {**result, "is_cached": False}
+
+        batch_solver._initialize_worker(self.BASE_DIR, self.matrix_options)
+        workers = self.workers if self.workers is not None else multiprocessing.cpu_count()
+        if workers <= 1:
+            for key, trial in trials_to_run.items():
+                yield to_result(key, trial, _run_trial(trial, self.time_limit))
+            return
+
+        context = multiprocessing.get_context("fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn")
+        with ProcessPoolExecutor(max_workers=min(workers, len(trials_to_run)),
+                                 mp_context=context,
+                                 initializer=batch_solver._initialize_worker,
+                                 initargs=(self.BASE_DIR, self.matrix_options)) as executor:
+            futures = {executor.submit(_run_trial, trial, self.time_limit): key for key, trial in trials_to_run.items()}
+            for future in as_completed(futures):
+                key = futures[future]
+                yield to_result(key, trials_to_run[key], future.result())
+
+    def best_configuration(self, results: List[Dict[str, object]]) -> Dict[str, object]:
+        '''
+        This method is a public API expected to expose to users.
+        Functionality:
+            Returns the params of the highest mean fitness over seeds, e.g.,
+            {"params": {...}, "mean_fitness": 95.3, "std_fitness": 1.2, "best_fitness": 96.8, "number_of_seeds": 3}
+        '''
+        fitness_of_params = {}
+        for result in results:
+            params_key = json.dumps(result["params"], sort_keys=True)
+            fitness_of_params.setdefault(params_key, []).append(result["fitness"])
+        if len(fitness_of_params) == 0:
+            raise ValueError("'results' must not be empty")
+
+        params_key, fitness = max(fitness_of_params.items(), key=lambda item: np.mean(item[1]))
+        return {"params": json.loads(params_key),
+                "mean_fitness": float(np.mean(fitness)),
+                "std_fitness": float(np.std(fitness)),
+                "best_fitness": float(np.max(fitness)),
+                "number_of_seeds": len(fitness)}
@@ -0,0 +1,141 @@
+from typing import List, Tuple
+import numpy as np
+from .base_class import BuilderFactory
+from .depot_matrix import DepotMatrix, NearestDepotMatrix
+
+
+class DepotMatrixLookup:
+    def __init__(self, depot_matrix: DepotMatrix) -> None:
+        '''
+        DepotMatrixLookup reads 'lookup[from_depots, to_depots]' (broadcast like numpy indexing) from a DepotMatrix (divided by its unit),
+        standing for a depot x depot array of InstanceArrays whose matrix must not be loaded as a whole,
+        e.g., NearestDepotMatrix (matrix_storage="sparse") or a memory-mapped matrix (matrix_storage="memmap").
+        '''
+        self.depot_matrix = depot_matrix
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return (self.depot_matrix.number_of_depots, self.depot_matrix.number_of_depots)
+
+    def __getitem__(self, from_and_to_depots: Tuple[np.ndarray, np.ndarray]) -> 'np.ndarray | float':
+        from_depots, to_depots = np.broadcast_arrays(*(np.asarray(depots, dtype=np.int64) for depots in from_and_to_depots))
+        values = self.depot_matrix.take(from_depots.ravel(), to_depots.ravel()).reshape(from_depots.shape)
+        return values if values.ndim != 0 else values[()]
+
+
+class InstanceArrays:
+    def __init__(self,
+                 distance: np.ndarray,
+                 delivery_time: np.ndarray,
+                 demand: np.ndarray,
+                 capacity: np.ndarray,
+                 fuel_fee: np.ndarray,
+                 fuel_efficiency: np.ndarray,
+                 fixed_cost: np.ndarray,
+                 delivery_status: np.ndarray,
+                 earilest_time_can_be_delivered: np.ndarray,
+                 latest_time_must_be_delivered: np.ndarray,
+                 shipement_discharging_time: np.ndarray,
+                 maximum_available_time: np.ndarray,
+                 depot_mask: np.ndarray,
+                 vehicle_mask: np.ndarray,
+                 product_names: List[str]) -> None:
+        '''
+        InstanceArrays stores a whole instance (what DepotBuilder and VehicleBuilder hold as objects) as plain numpy arrays,
+        indexed by depot name (0-based) and vehicle name (0-based), for array-based kernels.
+        -------------------------------------------------------------------------------------------
+        distance: depot x depot, km (c_ij.csv / 1000)
+        delivery_time: depot x depot, minute (t_ij.csv / 100)
+                       both are DepotMatrixLookup rather than arrays if their DepotMatrix is not in memory as a whole, see .is_dense
+        demand: depot x product (d_i.csv)
+        capacity: vehicle x product (Q_k.csv)
+        fuel_fee, fuel_efficiency, fixed_cost: vehicle (B.csv, a_k.csv, fc_k.csv)
+        delivery_status: vehicle x depot, 1 means the vehicle can deliver the depot (a_ik.csv)
+        earilest_time_can_be_delivered, latest_time_must_be_delivered: depot (e_i.csv, l_i.csv)
+        shipement_discharging_time, maximum_available_time: vehicle
+        depot_mask, vehicle_mask: False for depots / vehicles not in the instance (e.g., excluded by a Scenario)
+        '''
+        self.distance = distance
+        self.delivery_time = delivery_time
+        self.demand = demand
+        self.capacity = capacity
+        self.fuel_fee = fuel_fee
+        self.fuel_efficiency = fuel_efficiency
+        self.fixed_cost = fixed_cost
+        self.delivery_status = delivery_status
+        self.earilest_time_can_be_delivered = earilest_time_can_be_delivered
+        self.latest_time_must_be_delivered = latest_time_must_be_delivered
+        self.shipement_discharging_time = shipement_discharging_time
+        self.maximum_available_time = maximum_available_time
+        self.depot_mask = depot_mask
+        self.vehicle_mask = vehicle_mask
+        self.product_names = product_names
+
+    ARRAY_NAMES = ["distance", "delivery_time", "demand", "capacity", "fuel_fee", "fuel_efficiency", "fixed_cost",
+                   "delivery_status", "earilest_time_can_be_delivered", "latest_time_must_be_delivered",
+                   "shipement_discharging_time", "maximum_available_time", "depot_mask", "vehicle_mask"]
+
+    @staticmethod
+    def _to_depot_by_depot(depot_matrix: DepotMatrix) -> 'np.ndarray | DepotMatrixLookup':
+        # sparse / memory-mapped storage is only read pair by pair, never materialized as a dense array
+        if isinstance(depot_matrix, NearestDepotMatrix) or isinstance(depot_matrix.values, np.memmap):
+            return DepotMatrixLookup(depot_matrix)
+        return depot_matrix.values / depot_matrix.unit_divisor
+
+    @classmethod
+    def from_factory(cls, factory: BuilderFactory) -> 'InstanceArrays':
+        depot_builder = factory.depot_builder
+        vehicle_builder = factory.vehicle_builder
+        number_of_depots = depot_builder.depot_distance.number_of_depots
+        all_vehicles = vehicle_builder.build_vehicles()  # including vehicles not available
+        number_of_vehicles = len(all_vehicles)
+        product_names = list(all_vehicles[0].capacity.keys())
+
+        depot_mask = np.zeros(number_of_depots, dtype=bool)
+        depot_mask[depot_builder.all_depot_names] = True
+        vehicle_mask = np.zeros(number_of_vehicles, dtype=bool)
+        vehicle_mask[vehicle_builder.all_vehicle_names] = True
+
+        demand = np.zeros((number_of_depots, len(product_names)))
+        earilest_time_can_be_delivered = np.zeros(number_of_depots)
+        latest_time_must_be_delivered = np.zeros(number_of_depots)
+        for depot_idx, depot in depot_builder.build_depots().items():
+            demand[depot_idx] = [depot.demand[product] for product in product_names]
+            earilest_time_can_be_delivered[depot_idx] = depot.earilest_time_can_be_delivered
+            latest_time_must_be_delivered[depot_idx] = depot.latest_time_must_be_delivered
+
+        vehicles = [all_vehicles[vehicle_idx] for vehicle_idx in range(number_of_vehicles)]
+        delivery_status = np.zeros((number_of_vehicles, number_of_depots), dtype=np.int8)
+        for vehicle_idx, vehicle in enumerate(vehicles):
+            delivery_status[vehicle_idx, vehicle.available_depots] = 1
+
+        return cls(cls._to_depot_by_depot(depot_builder.depot_distance),
+                   cls._to_depot_by_depot(depot_builder.depot_time),
+                   demand,
+                   np.array([[vehicle.capacity[product] for product in product_names] for vehicle in vehicles], dtype=np.float64),
+                   np.array([vehicle.fuel_fee for vehicle in vehicles], dtype=np.float64),
+                   np.array([vehicle.fuel_efficiency for vehicle in vehicles], dtype=np.float64),
+                   np.array([vehicle.fixed_cost for vehicle in vehicles], dtype=np.float64),
+                   delivery_status,
+                   earilest_time_can_be_delivered,
+                   latest_time_must_be_delivered,
+                   np.array([vehicle.shipement_discharging_time for vehicle in vehicles], dtype=np.float64),
+                   np.array([vehicle.maximum_available_time for vehicle in vehicles], dtype=np.float64),
+                   depot_mask,
+                   vehicle_mask,
+                   product_names)
+
+    @property
+    def number_of_depots(self) -> int:
+        return len(self.depot_mask)
+
+    @property
+    def number_of_vehicles(self) -> int:
+        return len(self.vehicle_mask)
+
+    @property
+    def is_dense(self) -> bool:
+        '''
+        whether distance and delivery_time are numpy arrays (rather than DepotMatrixLookup), e.g., required by compiled kernels
+        '''
+        return isinstance(self.distance, np.ndarray) and isinstance(self.delivery_time, np.ndarray)
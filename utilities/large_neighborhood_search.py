@@ -0,0 +1,243 @@
+from math import exp
+from time import process_time, time
+from typing import Callable, Dict, List
+import numpy as np
+from .base_class import BuilderFactory
+from .constructive_heuristic import ConstructiveHeuristic
+from .operator_portfolio import OperatorPortfolio
+from .random_stream import RandomStream
+from .solution_chromosome import SolutionChromosome
+from .solve_result import SolveResult
+# e.g.,  {0: [], 1: [0, 8, 6, 0], 2: [0, 7, 5, 0], 3: [0, 3, 0], 4: []}
+Solution = Dict[int, List[int]]
+Routes = Dict[int, List[int]]  # routes without warehouse depot, e.g., {0: [], 1: [8, 6], 2: [7, 5]}
+
+
+class LargeNeighborhoodSearch:
+    REMOVAL_NAMES = ["random_removal", "worst_cost_removal", "related_removal", "time_window_removal"]
+
+    def __init__(self,
+                 factory: BuilderFactory = None,
+                 maximum_iteration: int = 1000,
+                 time_limit: float = None,
+                 seed: int = None,
+                 minimum_removal_ratio: float = 0.1,
+                 maximum_removal_ratio: float = 0.3,
+                 regret_level: int = 2,
+                 initial_temperature_ratio: float = 0.02,
+                 cooling_rate: float = 0.995,
+                 randomness: float = 3,
+                 operator_selection: str = None,
+                 verbose: bool = True) -> None:
+        '''
+        LargeNeighborhoodSearch (ruin and recreate) is an alternative solver to GeneticAlgorithm, returning the same SolveResult.
+        Each iteration removes some depots (by one of REMOVAL_NAMES), inserts them back by regret-k insertion,
+        and accepts the new solution by simulated annealing.
+        -------------------------------------------------------------------------------------------
+        Feasibility (a_ik, time windows, available time with replenishments) and costs are the same as ConstraintChecker and
+        RouteResourceCalculator, through ConstructiveHeuristic (cached per route, and only the insertions into the changed route
+        are re-costed after each insertion).
+
+        Params:
+        maximum_iteration: number of ruin and recreate iterations
+        time_limit: seconds, stop once exceeded (checked between iterations) even if maximum_iteration is not reached
+        seed: seed of all random choices, the same seed always gives the same result,
+              unless the result depends on timing (i.e., 'time_limit', "adaptive" operator_selection, which is rewarded per CPU second)
+        minimum_removal_ratio, maximum_removal_ratio: fraction of depots removed in each iteration, chosen uniformly in between
+        regret_level: k of the regret-k insertion
+        initial_temperature_ratio: a solution this much (relative to the initial cost) worse is accepted with probability 1/e at first
+        cooling_rate: the temperature is multiplied by it after each iteration
+        randomness: >= 1, the larger the more greedy worst-cost / related removals are (1 is random)
+        operator_selection: "uniform" or "adaptive" (see OperatorPortfolio), how removals are chosen,
+                            defaults to "uniform" if 'seed' is given (to be reproducible), "adaptive" otherwise
+        '''
+        if operator_selection is None:
+            operator_selection = "uniform" if seed is not None else "adaptive"
+        if not 0 < minimum_removal_ratio <= maximum_removal_ratio <= 1:
+            raise ValueError(f"'minimum_removal_ratio' and 'maximum_removal_ratio' must be 0 < minimum <= maximum <= 1, "
+                             f"given {minimum_removal_ratio} and {maximum_removal_ratio}")
+        if operator_selection not in ("uniform", "adaptive"):
+            raise ValueError(f"'operator_selection' must be one of the following: ['uniform', 'adaptive'], given {operator_selection}")
+        self.factory = factory if factory is not None else BuilderFactory()
+        self.heuristic = ConstructiveHeuristic(self.factory, seed=seed, regret_level=regret_level)
+        self.rng = self.heuristic.rng
+        self.depots = self.heuristic.checker.depots
+        self.maximum_iteration = maximum_iteration
+        self.time_limit = time_limit
+        self.minimum_removal_ratio = minimum_removal_ratio
+        self.maximum_removal_ratio = maximum_removal_ratio
+        self.initial_temperature_ratio = initial_temperature_ratio
+        self.cooling_rate = cooling_rate
+        self.randomness = randomness
+        self.operator_selection = operator_selection
+        # a stream of its own (spawned from the seed) rather than .rng, so that both don't draw the same numbers
+        self.removal_portfolio = OperatorPortfolio(self.REMOVAL_NAMES, operator_selection,
+                                                   random_stream=RandomStream(np.random.SeedSequence(seed).spawn(1)[0]))
+        self.verbose = verbose
+
+        self.start_time = None
+        self.current_iteration = 0
+        self.best_routes = None
+        self.best_cost = None
+        self.best_iteration = 0
+        self.cost_history = []  # (current cost, best cost) after each iteration
+
+    @property
+    def removal_operators(self) -> Dict[str, Callable[[Routes, int], List[int]]]:
+        return {removal_name: getattr(self, removal_name) for removal_name in self.REMOVAL_NAMES}
+
+    def _calculate_total_cost(self, routes: Routes) -> float:
+        return sum(self.heuristic._calculate_route_cost(vehicle_idx, route) for vehicle_idx, route in routes.items())
+
+    def _to_routes(self, solution: Solution) -> Routes:
+        warehouse_depot = 0
+        routes = {vehicle_idx: [] for vehicle_idx in self.heuristic.all_vehicle_names}
+        for vehicle_idx, route in solution.items():
+            routes[vehicle_idx] = [depot_idx for depot_idx in route if depot_idx != warehouse_depot]
+        return routes
+
+    def _choose_by_rank(self, number_of_candidates: int) -> int:
+        # index of a candidate sorted from the most to the least preferred, biased to the front by 'randomness'
+        return int(number_of_candidates * self.rng.random() ** self.randomness)
+
+    def random_removal(self, routes: Routes, number_of_removals: int) -> List[int]:
+        assigned_depots = [depot_idx for route in routes.values() for depot_idx in route]
+        return [int(depot_idx) for depot_idx in self.rng.choice(assigned_depots, size=number_of_removals, replace=False)]
+
+    def worst_cost_removal(self, routes: Routes, number_of_removals: int) -> List[int]:
+        '''
+        depots saving the most when removed from their routes, re-evaluated after each removal
+        '''
+        routes = {vehicle_idx: list(route) for vehicle_idx, route in routes.items()}
+        removed_depots = []
+        while len(removed_depots) < number_of_removals:
+            savings = []
+            for vehicle_idx, route in routes.items():
+                route_cost = self.heuristic._calculate_route_cost(vehicle_idx, route)
+                for position, depot_idx in enumerate(route):
+                    removed_route = [*route[:position], *route[position + 1:]]
+                    savings.append((route_cost - self.heuristic._calculate_route_cost(vehicle_idx, removed_route), vehicle_idx, depot_idx))
+            savings.sort(reverse=True)
+            _, vehicle_idx, depot_idx = savings[self._choose_by_rank(len(savings))]
+            routes[vehicle_idx].remove(depot_idx)
+            removed_depots.append(depot_idx)
+        return removed_depots
+
+    def _remove_related_depots(self, routes: Routes, number_of_removals: int, relatedness: Callable[[int, int], float]) -> List[int]:
+        '''
+        Shaw removal: starting from a random depot, removes the depots most related (the smaller the more) to a removed depot
+        '''
+        assigned_depots = [depot_idx for route in routes.values() for depot_idx in route]
+        removed_depots = [assigned_depots[int(self.rng.integers(len(assigned_depots)))]]
+        while len(removed_depots) < number_of_removals:
+            seed_depot_idx = removed_depots[int(self.rng.integers(len(removed_depots)))]
+            candidates = sorted((depot_idx for depot_idx in assigned_depots if depot_idx not in removed_depots),
+                                key=lambda depot_idx: relatedness(seed_depot_idx, depot_idx))
+            removed_depots.append(candidates[self._choose_by_rank(len(candidates))])
+        return removed_depots
+
+    def related_removal(self, routes: Routes, number_of_removals: int) -> List[int]:
+        return self._remove_related_depots(routes, number_of_removals,
+                                           lambda depot_idx, other_depot_idx: self.depots[depot_idx].get_distance_to_depot(other_depot_idx))
+
+    def time_window_removal(self, routes: Routes, number_of_removals: int) -> List[int]:
+        def relatedness(depot_idx: int, other_depot_idx: int) -> float:
+            depot = self.depots[depot_idx]
+            other_depot = self.depots[other_depot_idx]
+            return (abs(depot.earilest_time_can_be_delivered - other_depot.earilest_time_can_be_delivered)
+                    + abs(depot.latest_time_must_be_delivered - other_depot.latest_time_must_be_delivered))
+        return self._remove_related_depots(routes, number_of_removals, relatedness)
+
+    def _ruin_and_recreate(self, routes: Routes, removal_name: str) -> 'Routes | None':
+        '''
+        returns the new routes, or None if some removed depots can't be inserted back
+        '''
+        number_of_assigned_depots = sum(len(route) for route in routes.values())
+        removal_ratio = self.rng.uniform(self.minimum_removal_ratio, self.maximum_removal_ratio)
+        number_of_removals = min(max(int(round(number_of_assigned_depots * removal_ratio)), 1), number_of_assigned_depots)
+        removed_depots = set(self.removal_operators[removal_name](routes, number_of_removals))
+
+        new_routes = {}
+        for vehicle_idx, route in routes.items():
+            new_route = [depot_idx for depot_idx in route if depot_idx not in removed_depots]
+            # arriving earlier than before may violate the earliest time of the remaining depots
+            if len(new_route) != 0 and not self.heuristic._is_feasible_route(vehicle_idx, new_route):
+                removed_depots.update(new_route)
+                new_route = []
+            new_routes[vehicle_idx] = new_route
+        # the tightest depots first, they have the fewest feasible positions
+        unassigned_depots = sorted(removed_depots, key=lambda depot_idx: self.depots[depot_idx].latest_time_must_be_delivered)
+        if len(self.heuristic._insert_by_regret(new_routes, unassigned_depots, True)) != 0:
+            return None
+        return new_routes
+
+    def _limit_cache_size(self, maximum_cache_size: int = 1000000) -> None:
+        # routes checked long ago are rarely checked again, so the caches are simply emptied once too large
+        if len(self.heuristic._feasibility_cache) + len(self.heuristic._route_cost_cache) > maximum_cache_size:
+            self.heuristic._feasibility_cache.clear()
+            self.heuristic._route_cost_cache.clear()
+
+    @property
+    def _is_termination_criteria_met(self) -> bool:
+        if self.current_iteration >= self.maximum_iteration:
+            return True
+        if self.time_limit is not None and time() - self.start_time >= self.time_limit:
+            return True
+        return False
+
+    @property
+    def best_solution(self) -> Solution:
+        return self.heuristic._to_solution(self.best_routes)
+
+    @property
+    def result(self) -> SolveResult:
+        elapsed_time = 0 if self.start_time is None else time() - self.start_time
+        immutable_depot_names = self.factory.depot_builder.all_depot_names_with_time_window_constraint
+        best_chromosome = SolutionChromosome(self.best_solution, immutable_depot_names, generation=self.best_iteration, factory=self.factory)
+        return SolveResult.from_chromosome(best_chromosome, elapsed_time)
+
+    def solve(self, initial_solution: Solution = None) -> SolveResult:
+        '''
+        This method is a public API expected to expose to users.
+        Functionality:
+            Improves 'initial_solution' (defaults to the regret insertion solution of ConstructiveHeuristic) by ruin and recreate,
+            returns the best solution found.
+        '''
+        self.start_time = time()
+        if initial_solution is None:
+            initial_solution = self.heuristic.regret_insertion_solution()
+        current_routes = self._to_routes(initial_solution)
+        current_cost = self._calculate_total_cost(current_routes)
+        self.best_routes, self.best_cost, self.best_iteration = current_routes, current_cost, 0
+        temperature = self.initial_temperature_ratio * current_cost
+
+        while not self._is_termination_criteria_met:
+            if self.operator_selection == "adaptive":
+                removal_name = self.removal_portfolio.select()
+            else:
+                removal_name = self.REMOVAL_NAMES[int(self.rng.integers(len(self.REMOVAL_NAMES)))]
+            start_time = process_time()
+            new_routes = self._ruin_and_recreate(current_routes, removal_name)
+            new_cost = self._calculate_total_cost(new_routes) if new_routes is not None else None
+            # rewarded by fitness (see SolutionChromosome.fitness) gained over the current solution
+            self.removal_portfolio.record(removal_name, 1000000 / current_cost,
+                                          1000000 / new_cost if new_cost is not None else 0, process_time() - start_time)
+
+            if new_cost is not None and (new_cost < current_cost
+                                         or (temperature > 0 and self.rng.random() < exp((current_cost - new_cost) / temperature))):
+                current_routes, current_cost = new_routes, new_cost
+                if current_cost < self.best_cost:
+                    self.best_routes, self.best_cost, self.best_iteration = current_routes, current_cost, self.current_iteration + 1
+            temperature *= self.cooling_rate
+            self._limit_cache_size()
+            self.current_iteration += 1
+            self.cost_history.append((current_cost, self.best_cost))
+            if self.verbose:
+                print(f"Iteration: {self.current_iteration} Removal: {removal_name} "
+                      f"Current Cost: {round(current_cost, 2)} Best Cost: {round(self.best_cost, 2)}")
+
+        return self.result
+
+    @property
+    def operator_statistics(self) -> Dict[str, Dict[str, float]]:
+        return self.removal_portfolio.statistics
@@ -0,0 +1,96 @@
+import gc
+import json
+import tracemalloc
+from typing import Dict, List
+
+
+class MemoryProfiler:
+    def __init__(self, number_of_top_allocations: int = 10, number_of_frames: int = 1) -> None:
+        '''
+        MemoryProfiler records memory traced by tracemalloc once per generation (opt-in, see GeneticAlgorithm(memory_profiling=True)).
+        -------------------------------------------------------------------------------------------
+        Each record (i.e., .time_series) contains:
+            generation
+            current_bytes: memory allocated by Python and still in use (after garbage collection)
+            peak_bytes: the highest memory during the generation (the peak is reset after each record)
+            bytes_per_chromosome: (current_bytes - current_bytes before the initial population) / population size,
+                                  i.e., average memory of a SolutionChromosome including its calculators, strategies and solution
+            top_allocations: the source lines allocating the most memory still in use, e.g.,
+                             [{"filename": ".../depot.py", "lineno": 42, "size": 1048576, "count": 2048}, ...]
+
+        Params:
+        number_of_top_allocations: number of allocation sites per record, 0 to skip taking snapshots (they are slow)
+        number_of_frames: frames stored per allocation by tracemalloc, more frames cost more memory and time
+
+        P.S. tracing slows Python down by several times, and memory of numpy arrays is traced but not memory of memmap files.
+        '''
+        if number_of_top_allocations < 0:
+            raise ValueError(f"'number_of_top_allocations' must be at least 0, given {number_of_top_allocations}")
+        self.number_of_top_allocations = number_of_top_allocations
+        self.number_of_frames = number_of_frames
+        self.time_series = []
+        self.baseline_bytes = None
+        self._is_started_by_profiler = False
+
+    def start(self) -> None:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.number_of_frames)
+            self._is_started_by_profiler = True
+        self.time_series = []
+        self.baseline_bytes, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+
+    def stop(self) -> None:
+        # tracing started by others (e.g., python -X tracemalloc) is left on
+        if self._is_started_by_profiler:
+            tracemalloc.stop()
+            self._is_started_by_profiler = False
+
+    def _get_top_allocations(self) -> List[Dict[str, int]]:
+        if self.number_of_top_allocations == 0:
+            return []
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ])
+        return [{"filename": statistic.traceback[0].filename,
+                 "lineno": statistic.traceback[0].lineno,
+                 "size": statistic.size,
+                 "count": statistic.count}
+                for statistic in snapshot.statistics("lineno")[:self.number_of_top_allocations]]
+
+    def record(self, generation: int, population_size: int) -> Dict[str, object]:
+        '''
+        This method is a public API expected to expose to users.
+        Functionality:
+            Records the memory of the current generation of 'population_size' chromosomes, and resets the peak for the next one.
+        '''
+        if not tracemalloc.is_tracing():
+            raise ValueError("MemoryProfiler must be started before recording, call .start() first")
+        # the peak is taken before collecting, so that garbage of reference cycles (e.g., of discarded chromosomes) counts in it
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        gc.collect()
+        current_bytes, _ = tracemalloc.get_traced_memory()
+        record = {"generation": generation,
+                  "current_bytes": current_bytes,
+                  "peak_bytes": peak_bytes,
+                  "bytes_per_chromosome": max(current_bytes - self.baseline_bytes, 0) / population_size if population_size else 0,
+                  "top_allocations": self._get_top_allocations()}
+        self.time_series.append(record)
+        tracemalloc.reset_peak()
+        return record
+
+    @property
+    def peak_bytes(self) -> int:
+        return max((record["peak_bytes"] for record in self.time_series), default=0)
+
+    def to_dict(self) -> Dict[str, object]:
+        return {"peak_bytes": self.peak_bytes,
+                "baseline_bytes": self.baseline_bytes,
+                "time_series": self.time_series}
+
+    def dump(self, path: str) -> None:
+        with open(path, "w") as file:
+            json.dump(self.to_dict(), file, indent=2)
@@ -1,10 +1,13 @@
-from typing import Callable, List
-from random import choice, choices
+from typing import Callable, Dict, List
+from .random_stream import RandomStream, get_default_random_stream
 
 
 class MutationStrategy:
-    def __init__(self, immutable_depot_names:List[int]) -> None:
+    OPERATOR_NAMES = ["reverse_mutate", "two_points_mutate"]
+
+    def __init__(self, immutable_depot_names:List[int], random_stream: RandomStream = None) -> None:
         self.immutable_depot_names = immutable_depot_names
+        self.random_stream = random_stream if random_stream is not None else get_default_random_stream()
         self.MAXIMUM_ATTEMPT = 10
 
     def reverse_mutate(self, route: List[int]) -> List[int]:
@@ -68,7 +71,7 @@ class MutationStrategy:
         if len(route_idx_can_be_chosen) < 2: #if only one depot can be chosen, return
             return
         
-        first_point, second_point = choices(route_idx_can_be_chosen, k=2)
+        first_point, second_point = self.random_stream.choices(route_idx_can_be_chosen, k=2)
 
         left_ptr = min(first_point, second_point)
         right_ptr = max(first_point, second_point)
@@ -78,9 +81,13 @@ class MutationStrategy:
     def _swap_depots(self, route: List[int], x_idx:int, y_idx:int) -> None:
         route[x_idx], route[y_idx] = route[y_idx], route[x_idx]
 
+    @property
+    def mutation_operators(self) -> Dict[str, Callable]:
+        return {operator_name: getattr(self, operator_name) for operator_name in self.OPERATOR_NAMES}
+
     def randomly_choose_mutation_strategy(self) -> Callable:
         all_strategies = [self.reverse_mutate, self.two_points_mutate]
-        return choice(all_strategies)
+        return self.random_stream.choice(all_strategies)
 
 
         
\ No newline at end of file
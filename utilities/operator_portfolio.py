@@ -0,0 +1,114 @@
+from typing import Dict, List
+from .random_stream import RandomStream, get_default_random_stream
+
+
+class OperatorStatistics:
+    def __init__(self, operator_name: str) -> None:
+        self.operator_name = operator_name
+        self.number_of_applications = 0
+        self.number_of_successes = 0  # applications improving fitness
+        self.total_fitness_gain = 0  # sum of positive fitness gains
+        self.total_time = 0  # seconds, including evaluating the new solutions
+        self.quality = None  # recency-weighted fitness gain per second, None until first applied
+
+    @property
+    def success_rate(self) -> float:
+        return self.number_of_successes / self.number_of_applications if self.number_of_applications else 0
+
+    @property
+    def fitness_gain_per_second(self) -> float:
+        return self.total_fitness_gain / self.total_time if self.total_time else 0
+
+    def to_dict(self) -> Dict[str, float]:
+        return {"number_of_applications": self.number_of_applications,
+                "number_of_successes": self.number_of_successes,
+                "success_rate": self.success_rate,
+                "total_fitness_gain": self.total_fitness_gain,
+                "total_time": self.total_time,
+                "fitness_gain_per_second": self.fitness_gain_per_second}
+
+
+class OperatorPortfolio:
+    def __init__(self,
+                 operator_names: List[str],
+                 policy: str = "adaptive",
+                 learning_rate: float = 0.3,
+                 minimum_probability: float = 0.1,
+                 random_stream: RandomStream = None) -> None:
+        '''
+        OperatorPortfolio chooses among operators (e.g., mutation operators) and tracks how much each of them pays off.
+        -------------------------------------------------------------------------------------------
+        Params:
+        policy: "uniform" (each operator equally likely, statistics are still tracked) or
+                "adaptive" (probability matching bandit, the probability of an operator is proportional to
+                its recency-weighted fitness gain per CPU second, but never below 'minimum_probability')
+        learning_rate: weight of the latest application in the recency-weighted quality
+        minimum_probability: keeps every operator explored, at most 1 / number of operators
+        random_stream: the stream operators are drawn from (default: the process-wide stream)
+
+        P.S. a portfolio is shared by the whole population, so deepcopy (e.g., copying chromosomes) returns the same portfolio.
+        '''
+        if policy not in ("uniform", "adaptive"):
+            raise ValueError(f"'policy' must be one of the following: ['uniform', 'adaptive'], given {policy}")
+        if len(operator_names) == 0:
+            raise ValueError("'operator_names' must not be empty")
+        if minimum_probability * len(operator_names) > 1:
+            raise ValueError(f"'minimum_probability' must be at most {1 / len(operator_names)}, given {minimum_probability}")
+        self.operator_names = list(operator_names)
+        self.policy = policy
+        self.learning_rate = learning_rate
+        self.minimum_probability = minimum_probability
+        self.operator_statistics = {operator_name: OperatorStatistics(operator_name) for operator_name in self.operator_names}
+        self.random_stream = random_stream if random_stream is not None else get_default_random_stream()
+
+    def __deepcopy__(self, memo: dict) -> 'OperatorPortfolio':
+        return self
+
+    @property
+    def probabilities(self) -> Dict[str, float]:
+        if self.policy == "uniform":
+            return {operator_name: 1 / len(self.operator_names) for operator_name in self.operator_names}
+
+        known_qualities = [statistics.quality for statistics in self.operator_statistics.values() if statistics.quality is not None]
+        # operators never applied are treated optimistically (as good as the best one)
+        optimistic_quality = max(known_qualities, default=1)
+        qualities = {operator_name: (statistics.quality if statistics.quality is not None else optimistic_quality)
+                     for operator_name, statistics in self.operator_statistics.items()}
+        total_quality = sum(qualities.values())
+        if total_quality == 0:
+            return {operator_name: 1 / len(self.operator_names) for operator_name in self.operator_names}
+
+        adaptive_share = 1 - self.minimum_probability * len(self.operator_names)
+        return {operator_name: self.minimum_probability + adaptive_share * quality / total_quality
+                for operator_name, quality in qualities.items()}
+
+    def select(self) -> str:
+        if len(self.operator_names) == 1:
+            return self.operator_names[0]
+        if self.policy == "uniform":
+            return self.random_stream.choice(self.operator_names)
+        probabilities = self.probabilities
+        return self.random_stream.choices(self.operator_names, weights=[probabilities[operator_name] for operator_name in self.operator_names])[0]
+
+    def record(self, operator_name: str, fitness_before: float, fitness_after: float, elapsed_time: float) -> None:
+        '''
+        Records an application of 'operator_name', which changed fitness from 'fitness_before' to 'fitness_after' in 'elapsed_time' seconds
+        '''
+        statistics = self.operator_statistics[operator_name]
+        fitness_gain = max(float(fitness_after - fitness_before), 0)
+        statistics.number_of_applications += 1
+        statistics.number_of_successes += int(fitness_gain > 0)
+        statistics.total_fitness_gain += fitness_gain
+        statistics.total_time += elapsed_time
+
+        reward = fitness_gain / max(elapsed_time, 1e-9)
+        if statistics.quality is None:
+            statistics.quality = reward
+            return
+        statistics.quality += self.learning_rate * (reward - statistics.quality)
+
+    @property
+    def statistics(self) -> Dict[str, Dict[str, float]]:
+        probabilities = self.probabilities
+        return {operator_name: {**statistics.to_dict(), "probability": probabilities[operator_name]}
+                for operator_name, statistics in self.operator_statistics.items()}
@@ -7,17 +7,21 @@ Solution = Dict[int, List[int]]
 
 
 class Optimizer:
-    def __init__(self) -> None:
-        factory = BuilderFactory()
+    def __init__(self, factory: BuilderFactory = None) -> None:
+        if factory is None:
+            factory = BuilderFactory()
         self.depots = factory.depots
         self.vehicles = factory.vehicles
-        self.resource_calc = RouteResourceCalculator()
+        self.resource_calc = RouteResourceCalculator(factory)
+        self.evaluation_backend = factory.evaluation_backend
 
     def _find_shortage_points_in_route_helper(self, vehicle_idx: int, route: List[int]) -> List[int]:
         '''
         A helper function aiming to find 'shortage point' during delivery,
         returns 'depot_name' not the index of depot
         '''
+        if self.evaluation_backend is not None:
+            return self.evaluation_backend.find_shortage_points(vehicle_idx, route)
         shortage_points = []
         copy_vehicle = deepcopy(self.vehicles[vehicle_idx])
         for depot_name in route:
@@ -0,0 +1,230 @@
+import json
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, TextIO, Tuple
+import numpy as np
+from .base_class import BuilderFactory
+from .batch_constraint_checker import BatchConstraintChecker
+from .shared_instance import SharedInstance
+# e.g.,  {0: [], 1: [0, 8, 6, 0], 2: [0, 7, 5, 0], 3: [0, 3, 0], 4: []}
+Solution = Dict[int, List[int]]
+Plan = Tuple[str, Solution]  # (name, solution), name may be None
+
+
+def to_solution(content: dict) -> Solution:
+    '''
+    either a SolveResult dumped as json (i.e., with a "solution" key), or the solution itself, e.g., {"0": [0, 1, 0], "1": []}
+    '''
+    solution = content["solution"] if "solution" in content else content
+    return {int(vehicle_idx): [int(depot_idx) for depot_idx in route] for vehicle_idx, route in solution.items()}
+
+
+# the evaluator of each worker process, inherited (with 'fork') or built from shared memory once per worker
+_worker_evaluator = None
+
+
+def _initialize_worker(batch_size: int, shared_instance_descriptor: Dict[str, object] = None) -> None:
+    global _worker_evaluator
+    if shared_instance_descriptor is None:
+        return
+    _worker_evaluator = PlanEvaluator(SharedInstance.attach(shared_instance_descriptor).to_factory(), batch_size)
+
+
+def _evaluate_batch(plans: List[Plan]) -> List[dict]:
+    return _worker_evaluator.evaluate_batch(plans)
+
+
+class PlanEvaluator:
+    RESOURCE_NAMES = ["fuel_fee", "distance", "delivery_time", "service_time", "total_time", "vehicle_total_fixed_cost",
+                      "driver_cost", "number_of_replenishment", "number_of_vehicles_assigned"]
+
+    def __init__(self, factory: BuilderFactory = None, batch_size: int = 1000, workers: int = 1) -> None:
+        '''
+        PlanEvaluator costs and validates many plans (solutions made anywhere, e.g., edited by hand or by another solver) at once.
+        -------------------------------------------------------------------------------------------
+        Plans are read lazily and evaluated 'batch_size' at a time: the routes of a batch are stacked into one array
+        (see BatchConstraintChecker.to_route_array), which is both checked and costed by array operations,
+        so memory is bounded by the batch size (times the batches in flight), not by the number of plans.
+        Costs are the same as RouteResourceCalculator.calculate_solution_resources, constraints the same as BatchConstraintChecker.
+
+        Params:
+        batch_size: plans evaluated at once
+        workers: processes evaluating batches, 1 means evaluating in the current process,
+                 the instance is inherited by forked workers, or attached from shared memory (see SharedInstance) otherwise
+        '''
+        if batch_size < 1:
+            raise ValueError(f"'batch_size' must be at least 1, given {batch_size}")
+        if workers < 1:
+            raise ValueError(f"'workers' must be at least 1, given {workers}")
+        self.factory = factory if factory is not None else BuilderFactory()
+        self.checker = BatchConstraintChecker(self.factory)
+        self.instance = self.checker.instance
+        self.batch_size = batch_size
+        self.workers = workers
+
+    def _calculate_resources(self, route_array: np.ndarray, solutions_of_rows: np.ndarray, vehicles_of_rows: np.ndarray,
+                             number_of_solutions: int, is_costed: np.ndarray) -> Dict[str, np.ndarray]:
+        '''
+        resources of each solution, summed in the same order as RouteResourceCalculator (so the floats are identical),
+        only rows of solutions 'is_costed' are summed, i.e., their depots and vehicles must be known
+        '''
+        warehouse_depot = 0
+        padding = self.checker.PADDING
+        is_costed_row = is_costed[solutions_of_rows]
+
+        def sum_by_solution(values: np.ndarray, rows: np.ndarray) -> np.ndarray:
+            return np.bincount(solutions_of_rows[rows], weights=values, minlength=number_of_solutions)
+
+        # edges are taken row by row, position by position, i.e., in the order of routes
+        rows, positions = np.nonzero((route_array[:, 1:] != padding) & is_costed_row[:, None])
+        edge_starts = route_array[rows, positions]
+        edge_ends = route_array[rows, positions + 1]
+        distance = sum_by_solution(self.instance.distance[edge_starts, edge_ends], rows)
+        delivery_time = sum_by_solution(self.instance.delivery_time[edge_starts, edge_ends], rows)
+        service_time = sum_by_solution(self.instance.shipement_discharging_time[vehicles_of_rows[rows]], rows)
+        # going back to warehouse depot in the middle of a route
+        is_replenished = (route_array[:, 1:-1] == warehouse_depot) & (route_array[:, 2:] != padding) & is_costed_row[:, None]
+        number_of_replenishments = np.bincount(solutions_of_rows, weights=is_replenished.sum(axis=1), minlength=number_of_solutions)
+
+        costed_rows = np.flatnonzero(is_costed_row)
+        vehicle_total_fixed_cost = sum_by_solution(self.instance.fixed_cost[vehicles_of_rows[costed_rows]], costed_rows)
+        number_of_vehicles_assigned = np.bincount(solutions_of_rows[costed_rows], minlength=number_of_solutions)
+        # same as the reference, fuel fee is based on the last assigned vehicle (rows of a solution are consecutive)
+        is_last_row = is_costed_row.copy()
+        is_last_row[:-1] &= solutions_of_rows[1:] != solutions_of_rows[:-1]
+        fuel_fee = np.zeros(number_of_solutions)
+        fuel_efficiency = np.zeros(number_of_solutions)
+        fuel_fee[solutions_of_rows[is_last_row]] = self.instance.fuel_fee[vehicles_of_rows[is_last_row]]
+        fuel_efficiency[solutions_of_rows[is_last_row]] = self.instance.fuel_efficiency[vehicles_of_rows[is_last_row]]
+        total_time = delivery_time + service_time
+        return {"fuel_fee": distance * fuel_fee * fuel_efficiency,
+                "distance": distance,
+                "delivery_time": delivery_time,
+                "service_time": service_time,
+                "total_time": total_time,
+                "vehicle_total_fixed_cost": vehicle_total_fixed_cost,
+                "driver_cost": (total_time / 60) * 60,
+                "number_of_replenishment": number_of_replenishments.astype(np.int64),
+                "number_of_vehicles_assigned": number_of_vehicles_assigned}
+
+    def evaluate_batch(self, plans: List[Plan]) -> List[dict]:
+        '''
+        This method is a public API expected to expose to users.
+        Functionality:
+            Evaluates a batch of (name, solution), returns a record of each, e.g.,
+            {"name": ..., "is_valid": True, "total_cost": 10493.0, "resources_used": {"fuel_fee": ..., ...},
+             "violations": {"number_of_unserved_depots": 0, ..., "is_passing_capacity_constraints": True, ...}}
+            costs of a plan using unknown depots / vehicles (or depots a vehicle can't deliver) can't be calculated, which are None
+        '''
+        number_of_solutions = len(plans)
+        route_array, solutions_of_rows, vehicles_of_rows = self.checker.to_route_array([solution for _, solution in plans])
+        violations = self.checker.check_route_array(route_array, solutions_of_rows, vehicles_of_rows, number_of_solutions)
+        is_costed = violations["number_of_incompatible_assignments"] == 0
+        resources = self._calculate_resources(route_array, solutions_of_rows, vehicles_of_rows, number_of_solutions, is_costed)
+        total_cost = resources["fuel_fee"] + resources["vehicle_total_fixed_cost"] + resources["driver_cost"]
+
+        # .tolist() turns numpy scalars into python ones (json serializable) in one call per column
+        violation_columns = {violation_name: values.tolist() for violation_name, values in violations.items() if violation_name != "is_valid"}
+        resource_columns = {resource_name: resources[resource_name].tolist() for resource_name in self.RESOURCE_NAMES}
+        is_valid, is_costed, total_cost = violations["is_valid"].tolist(), is_costed.tolist(), total_cost.tolist()
+        records = []
+        for solution_idx, (name, _) in enumerate(plans):
+            records.append({"name": name,
+                            "is_valid": is_valid[solution_idx],
+                            "total_cost": total_cost[solution_idx] if is_costed[solution_idx] else None,
+                            "resources_used": ({resource_name: column[solution_idx] for resource_name, column in resource_columns.items()}
+                                               if is_costed[solution_idx] else None),
+                            "violations": {violation_name: column[solution_idx] for violation_name, column in violation_columns.items()}})
+        return records
+
+    def _iter_batches(self, plans: Iterable[Plan]) -> Iterator[List[Plan]]:
+        plans = iter(plans)
+        while True:
+            batch = list(islice(plans, self.batch_size))
+            if len(batch) == 0:
+                return
+            yield batch
+
+    def evaluate(self, plans: Iterable[Plan]) -> Iterator[dict]:
+        '''
+        This method is a public API expected to expose to users.
+        Functionality:
+            Evaluates (name, solution) pairs read lazily from 'plans' (any iterable, e.g., a generator over a file),
+            yielding a record (see .evaluate_batch) of each in the same order.
+            With several workers, at most 2 batches per worker are in flight, so a slow consumer doesn't pile up results.
+        '''
+        if self.workers == 1:
+            for batch in self._iter_batches(plans):
+                yield from self.evaluate_batch(batch)
+            return
+
+        global _worker_evaluator
+        use_fork = "fork" in multiprocessing.get_all_start_methods()
+        shared_instance = None if use_fork else SharedInstance.publish(self.factory)
+        # inherited by forked workers as it is, spawned ones build their own from shared memory
+        previous_worker_evaluator = _worker_evaluator
+        _worker_evaluator = self
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers,
+                                     mp_context=multiprocessing.get_context("fork" if use_fork else "spawn"),
+                                     initializer=_initialize_worker,
+                                     initargs=(self.batch_size, None if shared_instance is None else shared_instance.descriptor)) as executor:
+                futures = deque()
+                for batch in self._iter_batches(plans):
+                    futures.append(executor.submit(_evaluate_batch, batch))
+                    if len(futures) >= 2 * self.workers:
+                        yield from futures.popleft().result()
+                while len(futures) != 0:
+                    yield from futures.popleft().result()
+        finally:
+            _worker_evaluator = previous_worker_evaluator
+            if shared_instance is not None:
+                shared_instance.close()
+                shared_instance.unlink()
+
+    def evaluate_jsonl(self, input_file: TextIO, output_file: TextIO) -> Dict[str, int]:
+        '''
+        This method is a public API expected to expose to users.
+        Functionality:
+            Reads plans from 'input_file' (one json per line, a plan or a SolveResult dumped as json, optionally with a "name"),
+            and writes a record of each (see .evaluate_batch) to 'output_file' as one json per line, in the same order,
+            where "line" is the line number of the plan, and a line which can't be read is written as {"line": ..., "error": ...}
+            rather than stopping the whole stream.
+            Returns the counts, e.g., {"number_of_plans": 1000, "number_of_valid_plans": 998, "number_of_errors": 1}
+        '''
+        counts = {"number_of_plans": 0, "number_of_valid_plans": 0, "number_of_errors": 0}
+        pending_lines = deque()  # (line number, error) of lines read but not written yet, in order
+
+        def read_plans() -> Iterator[Plan]:
+            for line_number, line in enumerate(input_file, start=1):
+                if len(line.strip()) == 0:
+                    continue
+                try:
+                    content = json.loads(line)
+                    plan = (content.get("name"), to_solution(content))
+                except (ValueError, TypeError, AttributeError) as error:
+                    pending_lines.append((line_number, f"{type(error).__name__}: {error}"))
+                    continue
+                pending_lines.append((line_number, None))
+                yield plan
+
+        def write(record: dict) -> None:
+            output_file.write(json.dumps(record))
+            output_file.write("\n")
+
+        def write_errors() -> None:
+            while len(pending_lines) != 0 and pending_lines[0][1] is not None:
+                line_number, error = pending_lines.popleft()
+                write({"line": line_number, "error": error})
+                counts["number_of_errors"] += 1
+
+        for record in self.evaluate(read_plans()):
+            write_errors()
+            line_number, _ = pending_lines.popleft()
+            write({"line": line_number, **record})
+            counts["number_of_plans"] += 1
+            counts["number_of_valid_plans"] += int(record["is_valid"])
+        write_errors()
+        return counts
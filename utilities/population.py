@@ -0,0 +1,310 @@
+from typing import Dict, Iterator, List, Tuple
+import numpy as np
+from .solution_chromosome import SolutionChromosome
+Edge = Tuple[int, int]
+
+
+class Population:
+    COLUMN_NAMES = ["fitness", "total_cost", "fuel_fee", "vehicle_total_fixed_cost", "driver_cost", "generation"]
+
+    def __init__(self, chromosomes: List[SolutionChromosome] = None, keep_clones: bool = False) -> None:
+        '''
+        Population keeps distinct chromosomes (no two with the same canonical solution, see SolutionChromosome.canonical_key)
+        and their diversity, both updated incrementally.
+        -------------------------------------------------------------------------------------------
+        The distance between two chromosomes is the broken-pair distance, i.e., the fraction of the edges (consecutive depots of a route,
+        warehouse depot included) of one chromosome not in the other one.
+        Instead of comparing every pair of chromosomes, the number of chromosomes containing each edge is kept, so that
+            - adding / removing a chromosome is O(E), E edges of a chromosome
+            - the mean distance of the population is O(1)
+            - the mean distance of a chromosome to the others is O(E)
+        Fitness, cost components and generation of the chromosomes are also kept as numpy columns (structure of arrays, see .columns),
+        row i being .chromosomes[i], so that sorting, top-k and statistics are array operations rather than reading every chromosome.
+        Chromosomes are kept by reference, and must not be mutated once added.
+
+        Params:
+        chromosomes: clones are rejected, see .add()
+        keep_clones: clones are kept as rows too (e.g., GeneticAlgorithm.population, whose clones are selected as parents),
+                     diversity is still of the distinct solutions only
+        '''
+        self.keep_clones = keep_clones
+        self.chromosomes = []
+        self._columns = {column_name: np.empty(16) for column_name in self.COLUMN_NAMES}
+        self._row_keys = []  # canonical key of each row
+        self._keys = {}  # canonical key -> number of rows of the solution
+        self._edges_of_chromosomes = {}  # canonical key -> edges
+        self._edge_counts = {}  # edge -> number of chromosomes containing it
+        self._edge_weights = {}  # edge -> sum of 1 / (number of edges) of chromosomes containing it
+        # sum of (edge count * edge weight) of all edges, see .mean_broken_pair_distance
+        self._weighted_edge_count = 0
+        for chromosome in chromosomes or []:
+            self.add(chromosome)
+
+    def __len__(self) -> int:
+        return len(self.chromosomes)
+
+    def __iter__(self) -> Iterator[SolutionChromosome]:
+        return iter(self.chromosomes)
+
+    def __contains__(self, chromosome: SolutionChromosome) -> bool:
+        return chromosome.canonical_key in self._keys
+
+    def _get_edges(self, chromosome: SolutionChromosome) -> List[Edge]:
+        edges = set()
+        for route in chromosome.solution.values():
+            for idx in range(len(route) - 1):
+                edges.add((route[idx], route[idx + 1]))
+        return list(edges)
+
+    @property
+    def number_of_distinct_solutions(self) -> int:
+        return len(self._keys)
+
+    def add(self, chromosome: SolutionChromosome) -> bool:
+        '''
+        This method is a public API expected to expose to users.
+        Functionality:
+            Adds 'chromosome' in O(E), returns False (and doesn't add it, unless keep_clones) if a chromosome of the same solution
+            is already in the population.
+        '''
+        key = chromosome.canonical_key
+        if key in self._keys:
+            if self.keep_clones:
+                self._keys[key] += 1
+                self._append_row(chromosome, key)
+            return False
+        edges = self._get_edges(chromosome)
+        weight = 1 / len(edges) if len(edges) != 0 else 0
+        for edge in edges:
+            edge_count = self._edge_counts.get(edge, 0)
+            edge_weight = self._edge_weights.get(edge, 0)
+            # (c + 1) * (w + weight) - c * w
+            self._weighted_edge_count += edge_weight + (edge_count + 1) * weight
+            self._edge_counts[edge] = edge_count + 1
+            self._edge_weights[edge] = edge_weight + weight
+        self._keys[key] = 1
+        self._edges_of_chromosomes[key] = edges
+        self._append_row(chromosome, key)
+        return True
+
+    def _append_row(self, chromosome: SolutionChromosome, key: tuple) -> None:
+        row = len(self.chromosomes)
+        if row == len(self._columns["fitness"]):
+            # doubled when full, so appending is amortized O(1)
+            for column_name, column in self._columns.items():
+                self._columns[column_name] = np.concatenate([column, np.empty(len(column))])
+        resources = chromosome.resources_used
+        self._columns["fitness"][row] = chromosome.fitness
+        self._columns["total_cost"][row] = resources["fuel_fee"] + resources["vehicle_total_fixed_cost"] + resources["driver_cost"]
+        self._columns["fuel_fee"][row] = resources["fuel_fee"]
+        self._columns["vehicle_total_fixed_cost"][row] = resources["vehicle_total_fixed_cost"]
+        self._columns["driver_cost"][row] = resources["driver_cost"]
+        self._columns["generation"][row] = chromosome.generation
+        self._row_keys.append(key)
+        self.chromosomes.append(chromosome)
+
+    def _remove_rows(self, rows: List[int]) -> None:
+        number_of_rows = len(self.chromosomes)
+        is_kept = np.ones(number_of_rows, dtype=bool)
+        is_kept[rows] = False
+        number_of_kept_rows = int(is_kept.sum())
+        for column in self._columns.values():
+            column[:number_of_kept_rows] = column[:number_of_rows][is_kept]
+        removed_keys = [self._row_keys[row] for row in rows]
+        self.chromosomes = [chromosome for chromosome, is_kept_row in zip(self.chromosomes, is_kept) if is_kept_row]
+        self._row_keys = [key for key, is_kept_row in zip(self._row_keys, is_kept) if is_kept_row]
+        for key in removed_keys:
+            self._keys[key] -= 1
+            if self._keys[key] == 0:
+                self._remove_edges(key)
+
+    def remove(self, chromosome: SolutionChromosome) -> None:
+        '''
+        This method is a public API expected to expose to users.
+        Functionality:
+            Removes the chromosome of the same solution as 'chromosome' ('chromosome' itself if it is a row) in O(E + P).
+        '''
+        key = chromosome.canonical_key
+        if key not in self._keys:
+            raise ValueError(f"'chromosome' is not in the population, given {chromosome.solution}")
+        rows = [row for row, member in enumerate(self.chromosomes) if member is chromosome]
+        self._remove_rows(rows[:1] or [self._row_keys.index(key)])
+
+    def replace(self, chromosomes: List[SolutionChromosome]) -> None:
+        '''
+        This method is a public API expected to expose to users.
+        Functionality:
+            Makes 'chromosomes' (e.g., the next generation) the population in O(P + E) per chromosome added or removed,
+            the ones already in it (by identity, e.g., parents surviving) are kept rather than removed and added again.
+        '''
+        rows_of_chromosomes = {}
+        for row, chromosome in enumerate(self.chromosomes):
+            rows_of_chromosomes.setdefault(id(chromosome), []).append(row)
+        added_chromosomes = []
+        for chromosome in chromosomes:
+            rows = rows_of_chromosomes.get(id(chromosome))
+            if rows:
+                rows.pop()
+                continue
+            added_chromosomes.append(chromosome)
+        self._remove_rows([row for rows in rows_of_chromosomes.values() for row in rows])
+        for chromosome in added_chromosomes:
+            self.add(chromosome)
+
+    def _remove_edges(self, key: tuple) -> None:
+        del self._keys[key]
+        edges = self._edges_of_chromosomes.pop(key)
+        weight = 1 / len(edges) if len(edges) != 0 else 0
+        for edge in edges:
+            edge_count = self._edge_counts[edge]
+            edge_weight = self._edge_weights[edge]
+            # c * w - (c - 1) * (w - weight)
+            self._weighted_edge_count -= edge_weight + (edge_count - 1) * weight
+            if edge_count == 1:
+                del self._edge_counts[edge]
+                del self._edge_weights[edge]
+                continue
+            self._edge_counts[edge] = edge_count - 1
+            self._edge_weights[edge] = edge_weight - weight
+
+    @property
+    def columns(self) -> Dict[str, np.ndarray]:
+        '''
+        column name -> read-only values of the chromosomes (row i is .chromosomes[i]), see COLUMN_NAMES
+        '''
+        columns = {}
+        for column_name, column in self._columns.items():
+            columns[column_name] = column[:len(self.chromosomes)]
+            columns[column_name].flags.writeable = False
+        return columns
+
+    @property
+    def fitness(self) -> np.ndarray:
+        return self.columns["fitness"]
+
+    def argsort(self, column_name: str = "fitness") -> np.ndarray:
+        '''
+        rows sorted by 'column_name' (ascending, stable), e.g., .chromosomes[rows[-1]] is the fittest
+        '''
+        if column_name not in self.COLUMN_NAMES:
+            raise ValueError(f"'column_name' must be one of the following: {self.COLUMN_NAMES}, given {column_name}")
+        return np.argsort(self.columns[column_name], kind="stable")
+
+    def sorted_chromosomes(self) -> List[SolutionChromosome]:
+        '''
+        chromosomes sorted by fitness, the last one is the fittest (same order as GeneticAlgorithm.population)
+        '''
+        return [self.chromosomes[row] for row in self.argsort()]
+
+    def top_k(self, k: int) -> List[SolutionChromosome]:
+        '''
+        This method is a public API expected to expose to users.
+        Functionality:
+            The 'k' fittest chromosomes (the fittest first), O(P + k log k)
+        '''
+        number_of_chromosomes = len(self.chromosomes)
+        k = min(k, number_of_chromosomes)
+        if k <= 0:
+            return []
+        negative_fitness = -self.fitness
+        rows = np.argpartition(negative_fitness, k - 1)[:k] if k < number_of_chromosomes else np.arange(number_of_chromosomes)
+        rows = rows[np.argsort(negative_fitness[rows], kind="stable")]
+        return [self.chromosomes[row] for row in rows]
+
+    @property
+    def statistics(self) -> Dict[str, float]:
+        '''
+        e.g., {"number_of_chromosomes": 30, "best_fitness": 93.1, "mean_fitness": 90.2, "std_fitness": 1.3,
+               "best_total_cost": 10741.5, "mean_total_cost": 11087.9, "worst_total_cost": 11562.0, "number_of_distinct_fitness": 28}
+        '''
+        if len(self.chromosomes) == 0:
+            return {"number_of_chromosomes": 0}
+        columns = self.columns
+        return {"number_of_chromosomes": len(self.chromosomes),
+                "best_fitness": float(columns["fitness"].max()),
+                "mean_fitness": float(columns["fitness"].mean()),
+                "std_fitness": float(columns["fitness"].std()),
+                "best_total_cost": float(columns["total_cost"].min()),
+                "mean_total_cost": float(columns["total_cost"].mean()),
+                "worst_total_cost": float(columns["total_cost"].max()),
+                "number_of_distinct_fitness": len(np.unique(columns["fitness"]))}
+
+    @property
+    def mean_broken_pair_distance(self) -> float:
+        '''
+        Mean distance over all ordered pairs of chromosomes, 0 (all the same) ~ 1 (no edge in common), in O(1):
+        sum over chromosomes m, edges e of m of (P - count(e)) / |E_m| = P^2 - sum over edges of count(e) * weight(e)
+        (P distinct solutions, clones kept as rows are not counted)
+        '''
+        number_of_chromosomes = self.number_of_distinct_solutions
+        if number_of_chromosomes < 2:
+            return 0
+        total_distance = number_of_chromosomes ** 2 - self._weighted_edge_count
+        return max(total_distance, 0) / (number_of_chromosomes * (number_of_chromosomes - 1))
+
+    def broken_pair_distance_to_population(self, chromosome: SolutionChromosome) -> float:
+        '''
+        Mean distance from 'chromosome' to the other chromosomes of the population, in O(E)
+        '''
+        key = chromosome.canonical_key
+        is_member = key in self._keys
+        number_of_others = self.number_of_distinct_solutions - int(is_member)
+        edges = self._edges_of_chromosomes[key] if is_member else self._get_edges(chromosome)
+        if number_of_others == 0 or len(edges) == 0:
+            return 0
+        # number of other chromosomes without each edge
+        missing_edges = sum(number_of_others - (self._edge_counts.get(edge, 0) - int(is_member)) for edge in edges)
+        return missing_edges / (len(edges) * number_of_others)
+
+    def biased_fitness(self, number_of_elites: int = 1, diversity_weight: float = 1) -> Dict[Tuple, float]:
+        '''
+        Fitness sharing by ranks (the lower the better), for each chromosome (by canonical key):
+            fitness rank + diversity_weight * (1 - number_of_elites / P) * diversity rank
+        ranks are normalized to 0 ~ 1, the fittest / the farthest from the others is 0. O(P * E + P log P).
+        '''
+        number_of_chromosomes = len(self.chromosomes)
+        if number_of_chromosomes < 2:
+            return {chromosome.canonical_key: 0 for chromosome in self.chromosomes}
+        by_fitness = [self.chromosomes[row] for row in np.argsort(-self.fitness, kind="stable")]
+        distances = {chromosome.canonical_key: self.broken_pair_distance_to_population(chromosome) for chromosome in self.chromosomes}
+        by_diversity = sorted(self.chromosomes, key=lambda chromosome: distances[chromosome.canonical_key], reverse=True)
+
+        diversity_factor = diversity_weight * max(1 - number_of_elites / number_of_chromosomes, 0)
+        biased_fitness = {chromosome.canonical_key: rank / (number_of_chromosomes - 1)
+                          for rank, chromosome in enumerate(by_fitness)}
+        for rank, chromosome in enumerate(by_diversity):
+            biased_fitness[chromosome.canonical_key] += diversity_factor * rank / (number_of_chromosomes - 1)
+        return biased_fitness
+
+    @classmethod
+    def select_survivors(cls,
+                         candidates: List[SolutionChromosome],
+                         population_size: int,
+                         number_of_elites: int = 1,
+                         diversity_weight: float = 1) -> List[SolutionChromosome]:
+        '''
+        This method is a public API expected to expose to users.
+        Functionality:
+            Chooses 'population_size' survivors among 'candidates' (e.g., parents and children):
+                - clones are rejected, and only used (the fittest first) if there are not enough distinct candidates,
+                - the 'number_of_elites' fittest candidates always survive,
+                - the rest are chosen by biased fitness (see .biased_fitness()), so fit but different chromosomes are preferred.
+            returns survivors sorted by fitness (the last one is the fittest), same as GeneticAlgorithm.population.
+        '''
+        population = cls()
+        clones = []
+        for candidate in candidates:
+            if not population.add(candidate):
+                clones.append(candidate)
+
+        if len(population) <= population_size:
+            clones.sort(key=lambda chromosome: chromosome.fitness, reverse=True)
+            survivors = population.chromosomes + clones[:population_size - len(population)]
+            return sorted(survivors, key=lambda chromosome: chromosome.fitness)
+
+        biased_fitness = population.biased_fitness(number_of_elites, diversity_weight)
+        by_fitness = population.top_k(len(population))
+        survivors = by_fitness[:number_of_elites]
+        others = sorted(by_fitness[number_of_elites:], key=lambda chromosome: biased_fitness[chromosome.canonical_key])
+        survivors.extend(others[:population_size - len(survivors)])
+        return sorted(survivors, key=lambda chromosome: chromosome.fitness)
@@ -0,0 +1,100 @@
+from bisect import bisect
+from itertools import accumulate
+from typing import List, Sequence
+import numpy as np
+
+
+class RandomStream:
+    def __init__(self, seed: 'int | np.random.SeedSequence' = None, block_size: int = 4096) -> None:
+        '''
+        RandomStream serves the random decisions of a solver (random(), choice(), ...) from one numpy.random.Generator,
+        uniform numbers are drawn in blocks of 'block_size' rather than one call per decision.
+        -------------------------------------------------------------------------------------------
+        A run is reproducible bit for bit from its seed, as long as every component draws from the run's stream (or streams spawned from it).
+        Independent streams (e.g., one per worker or per scenario) are derived by .spawn(), i.e., SeedSequence spawning,
+        so they never overlap, and do not depend on how many workers run them or in which order.
+
+        Params:
+        seed: an int, a SeedSequence (e.g., spawned by another stream) or None (fresh entropy from the OS)
+
+        P.S. a stream is shared by the whole population, so deepcopy (e.g., copying chromosomes) returns the same stream.
+        '''
+        if block_size < 1:
+            raise ValueError(f"'block_size' must be at least 1, given {block_size}")
+        self.seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self.generator = np.random.default_rng(self.seed_sequence)
+        self.block_size = block_size
+        self._block = []
+        self._position = 0
+
+    def __deepcopy__(self, memo: dict) -> 'RandomStream':
+        return self
+
+    def spawn(self, number_of_streams: int) -> List['RandomStream']:
+        '''
+        This method is a public API expected to expose to users.
+        Functionality:
+            Returns 'number_of_streams' independent child streams, the same ones for the same seed (and the same calls to .spawn before)
+        '''
+        return [RandomStream(seed_sequence, self.block_size) for seed_sequence in self.seed_sequence.spawn(number_of_streams)]
+
+    def random(self) -> float:
+        '''
+        same as random.random(), a float in [0, 1)
+        '''
+        if self._position == len(self._block):
+            # a list of python floats, which is faster to index one by one than a numpy array
+            self._block = self.generator.random(self.block_size).tolist()
+            self._position = 0
+        value = self._block[self._position]
+        self._position += 1
+        return value
+
+    def integers(self, high: int) -> int:
+        '''
+        an int in [0, high)
+        '''
+        return min(int(self.random() * high), high - 1)
+
+    def choice(self, sequence: Sequence) -> object:
+        '''
+        same as random.choice(), raises IndexError if 'sequence' is empty
+        '''
+        if len(sequence) == 0:
+            raise IndexError("Cannot choose from an empty sequence")
+        return sequence[self.integers(len(sequence))]
+
+    def choices(self, sequence: Sequence, weights: Sequence[float] = None, k: int = 1) -> List[object]:
+        '''
+        same as random.choices(), i.e., 'k' elements chosen with replacement
+        '''
+        if weights is None:
+            return [self.choice(sequence) for _ in range(k)]
+        cumulative_weights = list(accumulate(weights))
+        total_weight = cumulative_weights[-1]
+        return [sequence[min(bisect(cumulative_weights, self.random() * total_weight), len(sequence) - 1)] for _ in range(k)]
+
+    def sample(self, population: Sequence, k: int) -> List[object]:
+        '''
+        same as random.sample(), i.e., 'k' distinct positions of 'population' (a partial Fisher-Yates shuffle)
+        '''
+        if not 0 <= k <= len(population):
+            raise ValueError(f"'k' must be between 0 and {len(population)}, given {k}")
+        pool = list(population)
+        for idx in range(k):
+            swapped_idx = idx + self.integers(len(pool) - idx)
+            pool[idx], pool[swapped_idx] = pool[swapped_idx], pool[idx]
+        return pool[:k]
+
+
+_default_random_stream = None
+
+
+def get_default_random_stream() -> RandomStream:
+    '''
+    the stream of components created without one, seeded by the OS once per process
+    '''
+    global _default_random_stream
+    if _default_random_stream is None:
+        _default_random_stream = RandomStream()
+    return _default_random_stream
@@ -0,0 +1,181 @@
+from copy import deepcopy
+from typing import Dict, List, Tuple
+from .base_class import BuilderFactory
+from .constraint_checker import ConstraintChecker
+from .genetic_algorithm import GeneticAlgorithm
+from .scenario import Scenario
+from .solution_chromosome import SolutionChromosome
+from .solve_result import SolveResult
+# e.g.,  {0: [], 1: [0, 8, 6, 0], 2: [0, 7, 5, 0], 3: [0, 3, 0], 4: []}
+Solution = Dict[int, List[int]]
+
+
+class Reoptimizer:
+    def __init__(self,
+                 factory: BuilderFactory = None,
+                 population_size: int = 20,
+                 mutation_rate: float = 0.3,
+                 crossover_rate: float = 0.7,
+                 maximum_iteration: int = 30,
+                 time_limit: float = 5,
+                 maximum_number_of_perturbations: int = 3,
+                 seed: int = None,
+                 verbose: bool = False) -> None:
+        '''
+        Reoptimizer re-plans a previous solution after a few changes (e.g., intra-day order changes),
+        instead of solving the changed instance from scratch.
+        -------------------------------------------------------------------------------------------
+        Params:
+        factory: the instance the previous solution was planned with
+        time_limit: seconds given to the (short) GeneticAlgorithm run after repairing
+        maximum_number_of_perturbations: each seed is the repaired solution mutated 1 ~ this many times
+        seed: seed of the GeneticAlgorithm (and the perturbations), see GeneticAlgorithm
+        '''
+        self.factory = factory if factory is not None else BuilderFactory()
+        self.population_size = population_size
+        self.mutation_rate = mutation_rate
+        self.crossover_rate = crossover_rate
+        self.maximum_iteration = maximum_iteration
+        self.time_limit = time_limit
+        self.maximum_number_of_perturbations = maximum_number_of_perturbations
+        self.seed = seed
+        self.verbose = verbose
+
+    def reoptimize(self, previous_solution: Solution, changes: Scenario = None) -> SolveResult:
+        '''
+        This method is a public API expected to expose to users.
+        Functionality:
+            Repair 'previous_solution' for 'changes', seed a population with perturbations of the repaired solution,
+            and run a time-boxed GeneticAlgorithm on the changed instance.
+            If the changes can't be repaired (i.e., some depots can't be inserted anywhere), it falls back to solving from scratch.
+        '''
+        changed_factory = self.factory if changes is None else changes.apply(self.factory)
+        genetic_algorithm = GeneticAlgorithm(self.population_size, self.mutation_rate, self.crossover_rate,
+                                             self.maximum_iteration, factory=changed_factory,
+                                             verbose=self.verbose, time_limit=self.time_limit, seed=self.seed)
+        try:
+            repaired_solution = self.repair(previous_solution, changes, changed_factory)
+        except ValueError:
+            return genetic_algorithm.solve()
+
+        immutable_depot_names = changed_factory.depot_builder.all_depot_names_with_time_window_constraint
+        repaired_chromosome = SolutionChromosome(repaired_solution, immutable_depot_names, factory=changed_factory,
+                                                 random_stream=genetic_algorithm.random_stream)
+        return genetic_algorithm.solve(self._perturb(repaired_chromosome))
+
+    def repair(self, previous_solution: Solution, changes: Scenario = None, changed_factory: BuilderFactory = None) -> Solution:
+        '''
+        Removes depots affected by 'changes' (and every depot of unavailable vehicles) from 'previous_solution',
+        re-checks the routes being changed, and inserts the removed depots back at their cheapest feasible positions.
+        Raises ValueError if some depots can't be inserted anywhere.
+        '''
+        if changed_factory is None:
+            changed_factory = self.factory if changes is None else changes.apply(self.factory)
+        checker = ConstraintChecker(changed_factory)
+        warehouse_depot = 0
+        all_depot_names = set(checker.depots.all_depot_names)
+        all_vehicle_names = set(checker.vehicles.all_vehicle_names)
+        changed_depots = set() if changes is None else set(changes.changed_depots)
+        depots_with_new_time_window = set() if changes is None else set(
+            [*(changes.earilest_time_can_be_delivered or {}), *(changes.latest_time_must_be_delivered or {})])
+
+        routes = {vehicle_idx: [] for vehicle_idx in all_vehicle_names}  # without warehouse depot
+        changed_vehicles = set()
+        unassigned_depots = []
+        for vehicle_idx, route in previous_solution.items():
+            for depot_idx in route:
+                if depot_idx == warehouse_depot or depot_idx not in all_depot_names:
+                    continue
+                if (vehicle_idx not in all_vehicle_names) or (depot_idx in depots_with_new_time_window):
+                    unassigned_depots.append(depot_idx)
+                    changed_vehicles.add(vehicle_idx)
+                    continue
+                routes[vehicle_idx].append(depot_idx)
+            if any(depot_idx in changed_depots for depot_idx in route):
+                changed_vehicles.add(vehicle_idx)
+
+        # depots never assigned in the previous solution (e.g., new orders)
+        assigned_depots = set(depot_idx for route in routes.values() for depot_idx in route) | set(unassigned_depots)
+        unassigned_depots.extend(sorted(all_depot_names - assigned_depots - {warehouse_depot}))
+
+        for vehicle_idx in changed_vehicles & all_vehicle_names:
+            routes[vehicle_idx], removed_depots = self._remove_infeasible_depots(checker, vehicle_idx, routes[vehicle_idx])
+            unassigned_depots.extend(removed_depots)
+
+        # the tightest depots first, they have the fewest feasible positions
+        unassigned_depots.sort(key=lambda depot_idx: checker.depots[depot_idx].latest_time_must_be_delivered)
+        route_costs = {vehicle_idx: self._calculate_route_cost(checker, vehicle_idx, route)
+                       for vehicle_idx, route in routes.items()}
+        depots_cannot_be_inserted = []
+        for depot_idx in unassigned_depots:
+            best_insertion = self._find_cheapest_insertion(checker, routes, route_costs, depot_idx)
+            if best_insertion is None:
+                depots_cannot_be_inserted.append(depot_idx)
+                continue
+            vehicle_idx, inserted_route, inserted_route_cost = best_insertion
+            routes[vehicle_idx] = inserted_route
+            route_costs[vehicle_idx] = inserted_route_cost
+
+        if len(depots_cannot_be_inserted) != 0:
+            raise ValueError(f"Depots {depots_cannot_be_inserted} can't be inserted into any route")
+
+        return {vehicle_idx: (checker.optimizer.insert_warehouse_depots_and_relenishment_points(vehicle_idx, route)
+                              if len(route) != 0 else [])
+                for vehicle_idx, route in sorted(routes.items())}
+
+    def _is_feasible_route(self, checker: ConstraintChecker, vehicle_idx: int, route: List[int]) -> bool:
+        '''
+        route: without warehouse depot, e.g., [1,2,3]
+        '''
+        if not checker.is_all_depots_passing_time_window_constraints(vehicle_idx, route):
+            return False
+        non_shortage_route = checker.optimizer.insert_warehouse_depots_and_relenishment_points(vehicle_idx, route)
+        total_time = checker.resource_calc._calculate_time_for_current_route(vehicle_idx, non_shortage_route)
+        return total_time <= checker.vehicles[vehicle_idx].maximum_available_time
+
+    def _remove_infeasible_depots(self, checker: ConstraintChecker, vehicle_idx: int, route: List[int]) -> Tuple[List[int], List[int]]:
+        kept_depots = []
+        removed_depots = []
+        for depot_idx in route:
+            if self._is_feasible_route(checker, vehicle_idx, [*kept_depots, depot_idx]):
+                kept_depots.append(depot_idx)
+                continue
+            removed_depots.append(depot_idx)
+        return kept_depots, removed_depots
+
+    def _calculate_route_cost(self, checker: ConstraintChecker, vehicle_idx: int, route: List[int]) -> float:
+        if len(route) == 0:
+            return 0
+        non_shortage_route = checker.optimizer.insert_warehouse_depots_and_relenishment_points(vehicle_idx, route)
+        resources = checker.resource_calc.calculate_route_resources(vehicle_idx, non_shortage_route)
+        return resources["fuel_fee"] + resources["vehicle_total_fixed_cost"] + resources["driver_cost"]
+
+    def _find_cheapest_insertion(self, checker: ConstraintChecker, routes: Dict[int, List[int]],
+                                 route_costs: Dict[int, float], depot_idx: int) -> 'Tuple[int, List[int], float] | None':
+        best_insertion = None
+        best_cost_increase = None
+        for vehicle_idx, route in routes.items():
+            if not checker.vehicles[vehicle_idx].is_depot_can_be_delivered(depot_idx):
+                continue
+            for position in range(len(route) + 1):
+                inserted_route = [*route[:position], depot_idx, *route[position:]]
+                if not self._is_feasible_route(checker, vehicle_idx, inserted_route):
+                    continue
+                inserted_route_cost = self._calculate_route_cost(checker, vehicle_idx, inserted_route)
+                cost_increase = inserted_route_cost - route_costs[vehicle_idx]
+                if best_cost_increase is None or cost_increase < best_cost_increase:
+                    best_cost_increase = cost_increase
+                    best_insertion = (vehicle_idx, inserted_route, inserted_route_cost)
+        return best_insertion
+
+    def _perturb(self, repaired_chromosome: SolutionChromosome) -> List[SolutionChromosome]:
+        '''
+        The repaired solution itself, and (population_size - 1) mutated copies of it
+        '''
+        seeds = [repaired_chromosome]
+        while len(seeds) < self.population_size:
+            seed = deepcopy(repaired_chromosome)
+            for _ in range(1 + repaired_chromosome.random_stream.integers(self.maximum_number_of_perturbations)):
+                seed.mutate(mutation_rate=1)
+            seeds.append(seed)
+        return seeds
@@ -4,7 +4,7 @@ Solution = Dict[int, List[int]]
 
 
 class RouteResourceCalculator(BuilderFactory):
-    def __init__(self) -> None:
+    def __init__(self, factory: BuilderFactory = None) -> None:
         '''
         RouteResourceCalculator responsible for calculating the resources needed for "A GIVEN ROUTE"
         -------------------------------------------------------------------------------------------
@@ -12,8 +12,9 @@ class RouteResourceCalculator(BuilderFactory):
         depot_builder: storing information for 'EACH' depot
         vehicle: storing information for a 'GIVEN' vehicle
         route: storing a path that the input vehicle needs to go through.
+        factory: an already loaded BuilderFactory to share, otherwise the default dataset is loaded
         '''
-        super().__init__()
+        super().__init__(factory=factory)
 
     def _calculate_demand(self, route: List[int]) -> Dict[str, int]:
         total_demand = {}
@@ -63,7 +64,7 @@ class RouteResourceCalculator(BuilderFactory):
         return (time_on_duty_in_minute / 60) * hourly_wage
 
     # {0: [(0, 7)]
-    def _get_all_route_info_as_dict(self, solution: Solution) -> Dict[int, 'List[Tuple[int, int] | Tuple[int, int, int]']:
+    def _get_all_route_info_as_dict(self, solution: Solution) -> Dict[int, 'List[Tuple[int, int] | Tuple[int, int, int]]']:
         route_info_dict = {}
         for vehicle_idx, route in solution.items():
             if len(route) == 0:
@@ -92,6 +93,8 @@ class RouteResourceCalculator(BuilderFactory):
         Functionality:
             Calculate total resources needed for 'a given solution'
         '''
+        if self.evaluation_backend is not None:
+            return self.evaluation_backend.calculate_solution_resources(solution)
 
         route_info_dict = self._get_all_route_info_as_dict(
             solution)  # {0: [(0, 7)]
@@ -0,0 +1,124 @@
+from typing import Dict, List
+import pandas as pd
+from .base_class import BuilderFactory
+
+
+class Scenario:
+    def __init__(self,
+                 name: str,
+                 demand: Dict[int, Dict[str, int]] = None,
+                 earilest_time_can_be_delivered: Dict[int, int] = None,
+                 latest_time_must_be_delivered: Dict[int, int] = None,
+                 available_vehicles: List[int] = None,
+                 excluded_depots: List[int] = None) -> None:
+        '''
+        Scenario stores only what differs from the shared (static) instance, e.g., a given day's demand.
+        Anything left as None is taken from the instance as it is.
+        -------------------------------------------------------------------------------------------
+        Params (all keys are 0-based depot / vehicle names, as in Solution):
+        demand: {depot_idx: {product: quantity}}, data source: d_i.csv
+        earilest_time_can_be_delivered: {depot_idx: minute}, data source: e_i.csv
+        latest_time_must_be_delivered: {depot_idx: minute}, data source: l_i.csv
+        available_vehicles: vehicles can be used in this scenario
+        excluded_depots: depots not to be delivered in this scenario (e.g., cancelled orders)
+        '''
+        self.name = name
+        self.demand = demand
+        self.earilest_time_can_be_delivered = earilest_time_can_be_delivered
+        self.latest_time_must_be_delivered = latest_time_must_be_delivered
+        self.available_vehicles = available_vehicles
+        self.excluded_depots = excluded_depots
+
+    @classmethod
+    def from_csv(cls, name: str, demand_file: str = None, earilest_time_file: str = None,
+                 latest_time_file: str = None, available_vehicles: List[int] = None) -> 'Scenario':
+        '''
+        Reads overrides from files laid out as d_i.csv, e_i.csv and l_i.csv.
+        '''
+        demand = None
+        if demand_file is not None:
+            demand_frame = pd.read_csv(demand_file, index_col=0)
+            demand = {depot_idx: {product: int(quantity) for product, quantity in row.items()}
+                      for depot_idx, (_, row) in enumerate(demand_frame.iterrows())}
+        earilest_time_can_be_delivered = None
+        if earilest_time_file is not None:
+            earilest_time_can_be_delivered = dict(enumerate(pd.read_csv(earilest_time_file)["earilest_time_can_be_delivered"]))
+        latest_time_must_be_delivered = None
+        if latest_time_file is not None:
+            latest_time_must_be_delivered = dict(enumerate(pd.read_csv(latest_time_file)["latest_time_must_be_delivered"]))
+
+        return cls(name, demand, earilest_time_can_be_delivered, latest_time_must_be_delivered, available_vehicles)
+
+    @classmethod
+    def from_dict(cls, name: str, overrides: dict) -> 'Scenario':
+        '''
+        Reads overrides from a json-like dict, whose depot keys may be strings, e.g., {"demand": {"3": {"a": 10, "b": 8}}}
+        '''
+        def to_depot_keys(values: dict) -> dict:
+            if values is None:
+                return None
+            return {int(depot_idx): value for depot_idx, value in values.items()}
+
+        def to_names(names: list) -> list:
+            if names is None:
+                return None
+            return [int(name) for name in names]
+
+        return cls(name,
+                   to_depot_keys(overrides.get("demand")),
+                   to_depot_keys(overrides.get("earilest_time_can_be_delivered")),
+                   to_depot_keys(overrides.get("latest_time_must_be_delivered")),
+                   to_names(overrides.get("available_vehicles")),
+                   to_names(overrides.get("excluded_depots")))
+
+    def apply(self, factory: BuilderFactory) -> BuilderFactory:
+        '''
+        Returns a BuilderFactory for this scenario, which shares the matrices (c_ij, t_ij) of 'factory'.
+        '''
+        scenario_factory = BuilderFactory(factory=factory)
+        scenario_factory.depot_builder = factory.depot_builder.with_overrides(self.demand,
+                                                                              self.earilest_time_can_be_delivered,
+                                                                              self.latest_time_must_be_delivered,
+                                                                              self.available_vehicles,
+                                                                              self.excluded_depots)
+        scenario_factory.vehicle_builder = factory.vehicle_builder.with_overrides(self.available_vehicles)
+        # the backend of 'factory' holds arrays of the base instance, so the same kind of backend is built for the overrides
+        if factory.evaluation_backend is not None:
+            scenario_factory.use_evaluation_backend(factory.evaluation_backend.name)
+
+        warehouse_depot = 0
+        for depot_idx in scenario_factory.depots.all_depot_names:
+            if depot_idx == warehouse_depot:
+                continue
+            if len(scenario_factory.depots[depot_idx].available_vehicles) == 0:
+                raise ValueError(f"Scenario '{self.name}': depot {depot_idx} can't be delivered by any available vehicle")
+
+        return scenario_factory
+
+    @property
+    def changed_depots(self) -> List[int]:
+        '''
+        depots whose data is overridden (or excluded) by this scenario
+        '''
+        changed_depots = set()
+        for overrides in (self.demand, self.earilest_time_can_be_delivered, self.latest_time_must_be_delivered):
+            if overrides is not None:
+                changed_depots.update(overrides.keys())
+        if self.excluded_depots is not None:
+            changed_depots.update(self.excluded_depots)
+        return sorted(changed_depots)
+
+    def estimated_workload(self, factory: BuilderFactory) -> int:
+        '''
+        A rough estimation used for scheduling, the more depots to be delivered, the longer it takes to solve.
+        '''
+        number_of_depots = len(factory.depots.all_depot_names) - len(self.excluded_depots or [])
+        if self.demand is None:
+            return number_of_depots
+
+        number_of_depots_without_demand = sum(1 for depot_demand in self.demand.values()
+                                              if sum(depot_demand.values()) == 0)
+        return number_of_depots - number_of_depots_without_demand
+
+    def __repr__(self) -> str:
+        return f"Scenario(name={self.name!r})"
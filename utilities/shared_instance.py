@@ -0,0 +1,164 @@
+import multiprocessing
+import os
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List
+import numpy as np
+from .base_class import BuilderFactory
+from .depot_builder import DepotBuilder
+from .depot_matrix import DepotMatrix
+from .vehicle_builder import VehicleBuilder
+
+
+class SharedInstance:
+    ARRAY_NAMES = ["distance", "delivery_time", "demand", "earilest_time_can_be_delivered", "latest_time_must_be_delivered",
+                   "delivery_status", "capacity", "fuel_fee", "fuel_efficiency", "fixed_cost", "depot_names", "vehicle_names"]
+    ALIGNMENT = 64  # bytes, every array starts at a cache line
+
+    def __init__(self, shared_memory: SharedMemory, descriptor: Dict[str, object], is_owner: bool) -> None:
+        '''
+        SharedInstance is a problem instance (what a BuilderFactory reads from csv files) published once into a single
+        multiprocessing.shared_memory block, which other processes attach by name as read-only numpy views, without copying or pickling it.
+        Use SharedInstance.publish() (owner) and SharedInstance.attach() (workers), rather than creating it directly.
+        -------------------------------------------------------------------------------------------
+        Arrays published (raw values, as in csv files):
+            distance, delivery_time: depot x depot (c_ij.csv, t_ij.csv), the only large arrays, used in place by workers
+            demand: depot x product (d_i.csv)
+            earilest_time_can_be_delivered, latest_time_must_be_delivered: depot (e_i.csv, l_i.csv)
+            delivery_status: vehicle x depot (a_ik.csv)
+            capacity: vehicle x product (Q_k.csv), fuel_fee, fuel_efficiency, fixed_cost: vehicle (B.csv, a_k.csv, fc_k.csv)
+            depot_names, vehicle_names: depots / vehicles in the instance (e.g., a Scenario excluding some)
+
+        descriptor: a small picklable dict (block name, dtype / shape / offset of each array, product names, ...),
+                    which is all a worker needs to attach, e.g., sent as the initargs of a ProcessPoolExecutor
+
+        P.S. the owner must .close() and .unlink() the block once workers are done (or use it as a context manager).
+        '''
+        self.shared_memory = shared_memory
+        self.descriptor = descriptor
+        self.is_owner = is_owner
+        self.arrays = {}
+        for array_name, (dtype, shape, offset) in descriptor["arrays"].items():
+            array = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shared_memory.buf, offset=offset)
+            array.flags.writeable = False
+            self.arrays[array_name] = array
+
+    @classmethod
+    def publish(cls, factory: BuilderFactory) -> 'SharedInstance':
+        '''
+        This method is a public API expected to expose to users.
+        Functionality:
+            Copies the instance of 'factory' (including Scenario overrides applied to it) into a new shared memory block.
+        '''
+        depot_builder = factory.depot_builder
+        vehicle_builder = factory.vehicle_builder
+        arrays = {"distance": np.ascontiguousarray(depot_builder.depot_distance.values),
+                  "delivery_time": np.ascontiguousarray(depot_builder.depot_time.values),
+                  "demand": depot_builder.depot_demand.to_numpy(),
+                  "earilest_time_can_be_delivered": depot_builder.depot_earilest_time_can_be_delivered["earilest_time_can_be_delivered"].to_numpy(),
+                  "latest_time_must_be_delivered": depot_builder.depot_latest_time_must_be_delivered["latest_time_must_be_delivered"].to_numpy(),
+                  # a_ik of depots (i.e., with vehicles not available in a Scenario marked as 0)
+                  "delivery_status": depot_builder.vehicle_depots_delivery_status.to_numpy().T,
+                  "capacity": vehicle_builder.vehicle_capacity.to_numpy(),
+                  "fuel_fee": vehicle_builder.vehicle_fuel_fee["fuel_fee"].to_numpy(),
+                  "fuel_efficiency": vehicle_builder.vehicle_fuel_efficiency["fuel_efficiency"].to_numpy(),
+                  "fixed_cost": vehicle_builder.vehicle_total_fixed_cost["fixed_cost"].to_numpy(),
+                  "depot_names": np.array(depot_builder.all_depot_names, dtype=np.int64),
+                  "vehicle_names": np.array(vehicle_builder.all_vehicle_names, dtype=np.int64)}
+
+        array_descriptors = {}
+        size = 0
+        for array_name in cls.ARRAY_NAMES:
+            array = arrays[array_name]
+            array_descriptors[array_name] = (array.dtype.str, array.shape, size)
+            size += -(-array.nbytes // cls.ALIGNMENT) * cls.ALIGNMENT
+        shared_memory = SharedMemory(create=True, size=max(size, 1))
+        for array_name, (dtype, shape, offset) in array_descriptors.items():
+            np.ndarray(shape, dtype=np.dtype(dtype), buffer=shared_memory.buf, offset=offset)[...] = arrays[array_name]
+
+        descriptor = {"name": shared_memory.name,
+                      "arrays": array_descriptors,
+                      "product_names": list(depot_builder.depot_demand.columns),
+                      "vehicle_product_names": list(vehicle_builder.vehicle_capacity.columns),
+                      "distance_unit_divisor": depot_builder.depot_distance.unit_divisor,
+                      "delivery_time_unit_divisor": depot_builder.depot_time.unit_divisor,
+                      "BASE_DIR": os.path.dirname(factory.depot_files.demand)}
+        return cls(shared_memory, descriptor, is_owner=True)
+
+    @classmethod
+    def attach(cls, descriptor: Dict[str, object]) -> 'SharedInstance':
+        '''
+        This method is a public API expected to expose to users.
+        Functionality:
+            Attaches the block published as 'descriptor' (see .descriptor), arrays are read-only views into it.
+        '''
+        try:
+            shared_memory = SharedMemory(name=descriptor["name"], track=False)  # python >= 3.13
+        except TypeError:
+            shared_memory = SharedMemory(name=descriptor["name"])
+            # processes not started by multiprocessing have their own resource tracker,
+            # which would unlink the block (still used by others) when this process exits
+            if multiprocessing.parent_process() is None:
+                resource_tracker.unregister(shared_memory._name, "shared_memory")
+        return cls(shared_memory, descriptor, is_owner=False)
+
+    def __getitem__(self, array_name: str) -> np.ndarray:
+        if array_name not in self.arrays:
+            raise ValueError(f"'array_name' must be one of the following: {self.ARRAY_NAMES}, given {array_name}")
+        return self.arrays[array_name]
+
+    @property
+    def nbytes(self) -> int:
+        return self.shared_memory.size
+
+    def to_factory(self) -> BuilderFactory:
+        '''
+        This method is a public API expected to expose to users.
+        Functionality:
+            Returns a BuilderFactory of the instance, whose c_ij / t_ij are views of the shared memory (i.e., not copied),
+            the small per-depot / per-vehicle data is built into Depot / Vehicle objects as usual.
+        '''
+        descriptor = self.descriptor
+        depot_builder = DepotBuilder.from_arrays(DepotMatrix(self["distance"], descriptor["distance_unit_divisor"]),
+                                                 DepotMatrix(self["delivery_time"], descriptor["delivery_time_unit_divisor"]),
+                                                 self["demand"],
+                                                 descriptor["product_names"],
+                                                 self["earilest_time_can_be_delivered"],
+                                                 self["latest_time_must_be_delivered"],
+                                                 self["delivery_status"].T,
+                                                 self._to_names(self["depot_names"]))
+        # the matrices are views of the block, which must stay attached as long as the builder (and its copies) is used
+        depot_builder.shared_instance = self
+        vehicle_builder = VehicleBuilder.from_arrays(self["capacity"],
+                                                     descriptor["vehicle_product_names"],
+                                                     self["fuel_fee"],
+                                                     self["fuel_efficiency"],
+                                                     self["fixed_cost"],
+                                                     self["delivery_status"],
+                                                     self._to_names(self["vehicle_names"]))
+        return BuilderFactory.from_builders(depot_builder, vehicle_builder, descriptor["BASE_DIR"])
+
+    @staticmethod
+    def _to_names(names: np.ndarray) -> List[int]:
+        return [int(name) for name in names]
+
+    def close(self) -> None:
+        # views must be dropped before the block can be closed
+        self.arrays = {}
+        self.shared_memory.close()
+
+    def unlink(self) -> None:
+        if not self.is_owner:
+            raise ValueError("Only the publishing process can unlink the shared memory block")
+        self.shared_memory.unlink()
+
+    def __enter__(self) -> 'SharedInstance':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+        if self.is_owner:
+            self.unlink()
+
+    def __repr__(self) -> str:
+        return f"SharedInstance(name={self.descriptor['name']!r}, nbytes={self.nbytes})"
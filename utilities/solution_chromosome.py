@@ -1,9 +1,11 @@
 from typing import Dict, List
-from random import random, choice
+from time import process_time
 from .base_class import BuilderFactory
 from .route_resource_calculator import RouteResourceCalculator
 from .mutation_strategy import MutationStrategy
 from .crossover_strategy import CrossoverStrategy
+from .operator_portfolio import OperatorPortfolio
+from .random_stream import RandomStream, get_default_random_stream
 # e.g.,  {0: [], 1: [0, 8, 6, 0], 2: [0, 7, 5, 0], 3: [0, 3, 0], 4: []}
 Solution = Dict[int, List[int]]
 
@@ -17,22 +19,37 @@ class SolutionChromosome(BuilderFactory):
                  solution: Solution,
                  immutable_depot_names: List[int],
                  resources_used: Dict[str, float] = None,
-                 generation: int = 0) -> None:
+                 generation: int = 0,
+                 factory: BuilderFactory = None,
+                 mutation_portfolio: OperatorPortfolio = None,
+                 crossover_portfolio: OperatorPortfolio = None,
+                 random_stream: RandomStream = None) -> None:
+        '''
+        mutation_portfolio, crossover_portfolio: choose operators and record their statistics (shared by the population and inherited by children),
+        if not given, operators are chosen uniformly without recording
+        random_stream: the stream every random decision is drawn from (shared by the population and inherited by children),
+        if not given, the process-wide stream
+        '''
         self.solution = solution
+        self.factory = factory
+        self.mutation_portfolio = mutation_portfolio
+        self.crossover_portfolio = crossover_portfolio
+        self._random_stream = random_stream if random_stream is not None else get_default_random_stream()
 
         # dont' choose vehicle without any depots being assigned, or len(route) < 3, [0,1,0] -> will cause mutation error,
         # mutation strategy need to pick two 'DIFFERENT' route index and that it shouldn't be 0
 
-        self.resource_calc = RouteResourceCalculator()
+        self.resource_calc = RouteResourceCalculator(factory)
         self.immutable_depot_names = immutable_depot_names
         self.generation = generation
+        self._fitness = None  # see .fitness
 
         self._vehicle_mutaion_and_crossover_dict = self._filter_vehicle_can_be_chosen_for_mutation_and_crossover()
         self.vehicles_can_be_chosen_for_mutation = self._vehicle_mutaion_and_crossover_dict["mutation"]
         self.vehicles_can_be_chosen_for_crossover = self._vehicle_mutaion_and_crossover_dict["crossover"]
-        self.mutation_strategy = MutationStrategy(immutable_depot_names)
+        self.mutation_strategy = MutationStrategy(immutable_depot_names, self.random_stream)
         self.crossover_strategy = CrossoverStrategy(solution, immutable_depot_names,
-                                                    self.vehicles_can_be_chosen_for_crossover)
+                                                    self.vehicles_can_be_chosen_for_crossover, factory, self.random_stream)
 
         if resources_used is not None:
             self.resources_used = resources_used
@@ -40,33 +57,72 @@ class SolutionChromosome(BuilderFactory):
         self.resources_used = self.resource_calc.calculate_solution_resources(
             solution)
 
+    @property
+    def random_stream(self) -> RandomStream:
+        return self._random_stream
+
+    @random_stream.setter
+    def random_stream(self, random_stream: RandomStream) -> None:
+        # e.g., a solver adopting chromosomes created elsewhere (warm start) into its own stream
+        self._random_stream = random_stream
+        self.mutation_strategy.random_stream = random_stream
+        self.crossover_strategy.random_stream = random_stream
+
     def mutate(self, mutation_rate: float, chosen_vehicle_idx: int = None) -> SolutionChromosome:
-        random_value = random()
+        random_value = self.random_stream.random()
         if random_value > mutation_rate:  # 0.05
             return self
         for chosen_vehicle_idx in self.vehicles_can_be_chosen_for_mutation:
-            mutation_func = self.mutation_strategy.randomly_choose_mutation_strategy()
+            if self.mutation_portfolio is None:
+                mutation_func = self.mutation_strategy.randomly_choose_mutation_strategy()
+            else:
+                operator_name = self.mutation_portfolio.select()
+                mutation_func = self.mutation_strategy.mutation_operators[operator_name]
+                fitness_before = self.fitness
+                start_time = process_time()
             chosen_vehicle_route = self.solution[chosen_vehicle_idx]
             mutated_route = mutation_func(chosen_vehicle_route)
             # after mutation, update chromosome fitness ( based on self.resources_used, and self.solution)
             self._update_resources_used(chosen_vehicle_idx, mutated_route)
             self.solution[chosen_vehicle_idx] = mutated_route
+            if self.mutation_portfolio is not None:
+                self.mutation_portfolio.record(operator_name, fitness_before, self.fitness, process_time() - start_time)
+
+        return self
 
+    def replace_route(self, vehicle_idx: int, route: List[int]) -> SolutionChromosome:
+        '''
+        route of 'vehicle_idx' mutated elsewhere (e.g., by BatchMutationStrategy over a whole generation), resources are updated the same way as .mutate
+        '''
+        self._update_resources_used(vehicle_idx, route)
+        self.solution[vehicle_idx] = route
         return self
 
     def crossover(self, _other_solution_chromosome: SolutionChromosome, crossover_rate: float) -> 'List[SolutionChromosome] | None':
 
-        random_value = random()
+        random_value = self.random_stream.random()
         if random_value > crossover_rate:
             child_x = self._create_next_generation_self_with_new_solution(self.solution)
             child_y = self._create_next_generation_self_with_new_solution(self.solution)
             return [child_x, child_y]
 
-        child_x_solution, child_y_solution = self.crossover_strategy.single_point_crossover(
+        if self.crossover_portfolio is None:
+            operator_name = "single_point_crossover"
+        else:
+            operator_name = self.crossover_portfolio.select()
+            start_time = process_time()
+        crossover_func = self.crossover_strategy.crossover_operators[operator_name]
+        child_x_solution, child_y_solution = crossover_func(
             _other_solution_chromosome.solution, _other_solution_chromosome.vehicles_can_be_chosen_for_crossover)
 
         child_x = self._create_next_generation_self_with_new_solution(child_x_solution)
         child_y = self._create_next_generation_self_with_new_solution(child_y_solution)
+        if self.crossover_portfolio is not None:
+            # the better child against the better parent
+            self.crossover_portfolio.record(operator_name,
+                                            max(self.fitness, _other_solution_chromosome.fitness),
+                                            max(child_x.fitness, child_y.fitness),
+                                            process_time() - start_time)
         return [child_x, child_y]
 
     def __repr__(self) -> str:
@@ -103,8 +159,23 @@ class SolutionChromosome(BuilderFactory):
 
         return "\n".join(_repr)
 
+    @property
+    def canonical_key(self) -> tuple:
+        '''
+        The same for chromosomes of the same solution (i.e., the same routes of the same vehicle types, see VehicleBuilder.get_canonical_key),
+        so solutions only swapping routes between identical vehicles are clones, vehicles without any depots are ignored,
+        e.g., {0: [], 1: [0, 8, 6, 0], 2: [0, 7, 5, 0]} -> ((1, (0, 8, 6, 0)), (2, (0, 7, 5, 0))) if vehicles 1, 2 are of different types
+        '''
+        return self.resource_calc.vehicles.get_canonical_key(self.solution)
+
     def __eq__(self, _other_solution_chromosome: SolutionChromosome) -> bool:
-        return self.fitness == _other_solution_chromosome.fitness
+        # the same solution, chromosomes are still ordered by fitness (see __gt__)
+        if not isinstance(_other_solution_chromosome, SolutionChromosome):
+            return NotImplemented
+        return self.canonical_key == _other_solution_chromosome.canonical_key
+
+    def __hash__(self) -> int:
+        return hash(self.canonical_key)
 
     def __gt__(self, _other_solution_chromosome: SolutionChromosome) -> bool:
         # 總配送車數最小化為主要目標，
@@ -116,6 +187,9 @@ class SolutionChromosome(BuilderFactory):
 
     @property
     def fitness(self) -> float:
+        # read many times per generation (sorting, selection), so it is cached until resources_used is updated
+        if self._fitness is not None:
+            return self._fitness
         resources = self.resources_used
         total_cost = (
             resources["fuel_fee"] +
@@ -123,18 +197,23 @@ class SolutionChromosome(BuilderFactory):
             resources["driver_cost"]
         )
 
-        return (1 / total_cost) * 1000000
+        self._fitness = (1 / total_cost) * 1000000
+        return self._fitness
 
     def _create_next_generation_self_with_new_solution(self, new_solution: Solution) -> SolutionChromosome:
         # passing in self.resources_used is for performance concern, which avoidss duplicate computation.
+        # both are copied, as both children may be created from self, and mutating one must not change the other
         if new_solution == self.solution:  # two parents are not successfully crossovered
-            return SolutionChromosome(new_solution, self.immutable_depot_names, self.resources_used, self.generation + 1)
+            new_solution = {vehicle_idx: list(route) for vehicle_idx, route in new_solution.items()}
+            return SolutionChromosome(new_solution, self.immutable_depot_names, dict(self.resources_used), self.generation + 1, self.factory,
+                                      self.mutation_portfolio, self.crossover_portfolio, self.random_stream)
 
-        return SolutionChromosome(new_solution, self.immutable_depot_names, None, self.generation + 1)
+        return SolutionChromosome(new_solution, self.immutable_depot_names, None, self.generation + 1, self.factory,
+                                  self.mutation_portfolio, self.crossover_portfolio, self.random_stream)
 
     def _randomly_choose_a_vehicle(self) -> int:
         
-        return choice(self.vehicles_can_be_chosen_for_mutation)
+        return self.random_stream.choice(self.vehicles_can_be_chosen_for_mutation)
 
     def _update_resources_used(self, vehicle_idx: int, updated_route: List[int]) -> None:
         '''
@@ -148,6 +227,7 @@ class SolutionChromosome(BuilderFactory):
         for resource in self.resources_used.keys():
             self.resources_used[resource] -= original_route_resources[resource]
             self.resources_used[resource] += updated_route_resources[resource]
+        self._fitness = None
 
     def _is_route_contains_immutable_depots(self, route: List[int]) -> bool:
         if len(route) == 0:
@@ -1,13 +1,13 @@
 from typing import List, Dict
 from copy import deepcopy
 from time import time
-from random import choice
 from .base_class import BuilderFactory
 from .constraint_checker import ConstraintChecker
 from .route_resource_calculator import RouteResourceCalculator
 from .optimizer import Optimizer
+from .constructive_heuristic import ConstructiveHeuristic
 from .solution_chromosome import SolutionChromosome
-from tqdm import tqdm
+from .random_stream import RandomStream, get_default_random_stream
 
 # e.g.,  {0: [], 1: [0, 8, 6, 0], 2: [0, 7, 5, 0], 3: [0, 3, 0], 4: []}
 Solution = Dict[int, List[int]]
@@ -20,23 +20,39 @@ def timer(func):
         t1 = time()
         result = func(*args, **kwargs)
         t2 = time()
+        if not getattr(args[0], "verbose", True):
+            return result
         print(f'Function {func.__name__!r} executed in {(t2-t1):.4f}s', end="\t")
         return result
     return wrap_func
 
 
 class SolutionGenerator(BuilderFactory):
-    def __init__(self, constraint_checker: ConstraintChecker = ConstraintChecker()) -> None:
-        super().__init__()
+    def __init__(self, constraint_checker: ConstraintChecker = None, factory: BuilderFactory = None,
+                 verbose: bool = True, random_stream: RandomStream = None) -> None:
+        '''
+        constraint_checker: defaults to a ConstraintChecker of 'factory'
+        factory: the BuilderFactory (i.e., problem instance) to solve, defaults to the one used by constraint_checker
+        verbose: print progress of generating solutions
+        random_stream: the stream solutions are drawn from, also given to the chromosomes generated (default: the process-wide stream)
+        '''
+        self.verbose = verbose
+        self.random_stream = random_stream if random_stream is not None else get_default_random_stream()
+        if constraint_checker is None:
+            constraint_checker = ConstraintChecker(factory)
         if not isinstance(constraint_checker, ConstraintChecker):
             raise TypeError(f"'constraint_checker' is not a ConstraintChecker instance, given {type(constraint_checker)} type")
+        super().__init__(factory=factory or constraint_checker)
+        self.factory = BuilderFactory(factory=self)
         self.checker = constraint_checker
-        self.optimizer = Optimizer()
-        self.resource_calc = RouteResourceCalculator()
+        self.optimizer = Optimizer(self.factory)
+        self.resource_calc = RouteResourceCalculator(self.factory)
 
         self.all_depot_names = self.depots.all_depot_names
         self.all_vehicle_names = self.vehicles.all_vehicle_names
         self.sorted_vehicles_can_be_assigned = self.vehicle_builder.sorted_vehicles
+        # a small instance (e.g., a cluster of DecompositionSolver) may have fewer distinct solutions than asked for
+        self.MAXIMUM_FAILED_ATTEMPT = 1000
         
 
 
@@ -44,9 +60,13 @@ class SolutionGenerator(BuilderFactory):
         self.vehicles_with_assigned_depots = {vehicle_name: []
                                               for vehicle_name in self.all_vehicle_names}
 
-        print(f"Available Vehicle Names: {self.all_vehicle_names}")
-        print(f"Available Depot Names: {self.all_depot_names}")
-        print(f"All Depots With Time Window Constraints: {self.all_depot_names_with_time_window_constraints}")
+        self._print(f"Available Vehicle Names: {self.all_vehicle_names}")
+        self._print(f"Available Depot Names: {self.all_depot_names}")
+        self._print(f"All Depots With Time Window Constraints: {self.all_depot_names_with_time_window_constraints}")
+
+    def _print(self, message: str) -> None:
+        if self.verbose:
+            print(message)
 
 
     @timer
@@ -64,18 +84,27 @@ class SolutionGenerator(BuilderFactory):
         regular_depots = self.depot_builder.depots_without_time_window_constraints
         late_assigned_depots = self.depot_builder.depots_need_to_be_assigned_late
         
-        order_of_depots_assigning = choice([
+        order_of_depots_assigning = self.random_stream.choice([
             [early_assigned_depots, regular_depots], 
             [regular_depots, early_assigned_depots]
         ])
 
+        # vehicles which can take none of the depots left (since the last depot assigned), e.g., too few vehicles in a small instance
+        vehicles_without_progress = set()
         while (True):
-            current_vehicle_idx = choice(self.all_vehicle_names)
+            current_vehicle_idx = self.random_stream.choice(self.all_vehicle_names)
+            number_of_depots_left = len(early_assigned_depots) + len(regular_depots)
             for existing_depots in order_of_depots_assigning:
                 self._assign_depots(vehicles_with_assigned_depots, current_vehicle_idx, existing_depots)
 
             if len(early_assigned_depots) == 0 and len(regular_depots) == 0:
                 break
+            if len(early_assigned_depots) + len(regular_depots) != number_of_depots_left:
+                vehicles_without_progress.clear()
+                continue
+            vehicles_without_progress.add(current_vehicle_idx)
+            if len(vehicles_without_progress) == len(self.all_vehicle_names):
+                return [*early_assigned_depots, *regular_depots]
 
         vehicles_with_task = [
             vehicle_idx 
@@ -121,36 +150,72 @@ class SolutionGenerator(BuilderFactory):
 
 
 
+    @timer
+    def generate_seeded_solutions(self, number_of_solutions: int, seed: int = None, methods: List[str] = None) -> List[SolutionChromosome]:
+        '''
+        Same as .generate_valid_solutions, but solutions are built by ConstructiveHeuristic (savings / regret insertion),
+        may return fewer than 'number_of_solutions' solutions, see ConstructiveHeuristic.generate_solutions.
+        '''
+        if seed is None:
+            # a child of the stream, so that seeded solutions are reproducible from the stream's seed as well
+            seed = self.random_stream.seed_sequence.spawn(1)[0]
+        heuristic = ConstructiveHeuristic(self.factory, seed=seed)
+        seeded_solutions = heuristic.generate_solutions(number_of_solutions, methods)
+        self._print(f"{len(seeded_solutions)} Seeded Solutions Generated")
+        seeded_solution_chromosomes = [SolutionChromosome(solution, self.all_depot_names_with_time_window_constraints, factory=self.factory,
+                                                          random_stream=self.random_stream)
+                                       for solution in seeded_solutions]
+        seeded_solution_chromosomes.sort()
+        return seeded_solution_chromosomes
+
     @timer
     def generate_valid_solutions(self, number_of_solutions: int) -> List[SolutionChromosome]:
+        '''
+        may return fewer than 'number_of_solutions' solutions, if MAXIMUM_FAILED_ATTEMPT attempts in a row are failed or the same as earlier ones,
+        i.e., the instance has (about) no more distinct solutions, or random assignment hardly ever meets its time windows
+        '''
         solution_count = 0
         total_count = 0
         failed_solution_count = 0
+        failed_attempt_count = 0  # in a row
         valid_solutions = []
+        # solutions only swapping routes between identical vehicles are the same, see VehicleBuilder.get_canonical_key
+        keys_of_valid_solutions = set()
         while len(valid_solutions) < number_of_solutions:
             total_count += 1
             solution = self._generate_initial_raw_solution()
-            if solution in valid_solutions:
-                print("**Same Answer Generated**")
+            is_failed = isinstance(solution, list)
+            if is_failed:
+                self._print(f"**Depot {solution} Not Assigned**")
+            else:
+                key = self.vehicle_builder.get_canonical_key(solution)
+                is_failed = key in keys_of_valid_solutions
+                if is_failed:
+                    self._print("**Same Answer Generated**")
+            if is_failed:
                 failed_solution_count += 1
-                continue
-            if isinstance(solution, list):
-                print(f"**Depot {solution} Not Assigned**")
-                failed_solution_count += 1
-                continue
+                failed_attempt_count += 1
+                if failed_attempt_count < self.MAXIMUM_FAILED_ATTEMPT:
+                    continue
+                self._print(f"**Only {solution_count} Distinct Solutions Generated**")
+                break
 
+            failed_attempt_count = 0
             solution_count += 1
             valid_solutions.append(solution)
+            keys_of_valid_solutions.add(key)
 
-            print(f"No. {solution_count} Success")
+            self._print(f"No. {solution_count} Success")
         failed_rate = failed_solution_count / total_count
-        print(f"Successful Rate: {round((1 - failed_rate), 4) * 100}%")
+        self._print(f"Successful Rate: {round((1 - failed_rate), 4) * 100}%")
         valid_solution_chromosomes = []
-        print("Processing Solution Chromosomes...")
-        # tqdm for progress tqdm(iterable)
-        for solution in tqdm(valid_solutions):
+        self._print("Processing Solution Chromosomes...")
+        # tqdm for progress tqdm(iterable), only imported when generating solutions
+        from tqdm import tqdm
+        for solution in tqdm(valid_solutions, disable=not self.verbose):
             valid_solution_chromosomes.append(
-                SolutionChromosome(solution, self.all_depot_names_with_time_window_constraints))
+                SolutionChromosome(solution, self.all_depot_names_with_time_window_constraints, factory=self.factory,
+                                   random_stream=self.random_stream))
         valid_solution_chromosomes.sort()
 
         return valid_solution_chromosomes
@@ -0,0 +1,80 @@
+from typing import Dict, List
+# e.g.,  {0: [], 1: [0, 8, 6, 0], 2: [0, 7, 5, 0], 3: [0, 3, 0], 4: []}
+Solution = Dict[int, List[int]]
+
+
+class SolveResult:
+    def __init__(self,
+                 solution: Solution,
+                 resources_used: Dict[str, float],
+                 fitness: float,
+                 generation: int = 0,
+                 elapsed_time: float = 0,
+                 name: str = None,
+                 memory_profile: dict = None,
+                 iteration: int = None) -> None:
+        '''
+        SolveResult is a lightweight (i.e., picklable, without any builder attached) summary of a solved solution,
+        returned by solvers so that it can be sent across processes or dumped as json.
+        memory_profile: memory time series of the run if profiled, see MemoryProfiler.to_dict
+        iteration: the iteration of the solver a snapshot was taken at, see GeneticAlgorithm.iter_solve
+        '''
+        self.name = name
+        self.memory_profile = memory_profile
+        self.iteration = iteration
+        self.solution = solution
+        self.resources_used = resources_used
+        self.fitness = fitness
+        self.generation = generation
+        self.elapsed_time = elapsed_time
+
+    @classmethod
+    def from_chromosome(cls, chromosome: 'SolutionChromosome', elapsed_time: float = 0, name: str = None,
+                        memory_profile: dict = None) -> 'SolveResult':
+        return cls({vehicle_idx: list(route) for vehicle_idx, route in chromosome.solution.items()},
+                   dict(chromosome.resources_used),
+                   chromosome.fitness,
+                   chromosome.generation,
+                   elapsed_time,
+                   name,
+                   memory_profile)
+
+    @classmethod
+    def from_solution(cls, solution: Solution, factory: 'BuilderFactory', name: str = None) -> 'SolveResult':
+        '''
+        Evaluates a given solution (e.g., a plan read from a file) on the instance of 'factory'
+        '''
+        from .route_resource_calculator import RouteResourceCalculator
+        resources_used = RouteResourceCalculator(factory).calculate_solution_resources(solution)
+        result = cls(solution, resources_used, 0, name=name)
+        result.fitness = (1 / result.total_cost) * 1000000 if result.total_cost else 0
+        return result
+
+    @property
+    def total_cost(self) -> float:
+        resources = self.resources_used
+        return resources["fuel_fee"] + resources["vehicle_total_fixed_cost"] + resources["driver_cost"]
+
+    def to_dict(self) -> dict:
+        result = {"name": self.name,
+                  "solution": {str(vehicle_idx): route for vehicle_idx, route in self.solution.items()},
+                  "resources_used": {resource: float(amount) for resource, amount in self.resources_used.items()},
+                  "total_cost": float(self.total_cost),
+                  "fitness": float(self.fitness),
+                  "generation": self.generation,
+                  "elapsed_time": self.elapsed_time}
+        if self.iteration is not None:
+            result["iteration"] = self.iteration
+        if self.memory_profile is not None:
+            result["memory_profile"] = self.memory_profile
+        return result
+
+    def __repr__(self) -> str:
+        name = f"Name: {self.name}"
+        chromosome = f"Chromosome: {self.solution}"
+        total_cost = f"Total Cost: ${int(self.total_cost)}"
+        fitness = f"Fitness: {round(self.fitness, 4)}"
+        elapsed_time = f"Elapsed Time: {round(self.elapsed_time, 2)}s"
+        sep = "-" * 60
+
+        return "\n".join([name, chromosome, total_cost, fitness, elapsed_time, sep])
@@ -0,0 +1,297 @@
+import asyncio
+import io
+import json
+import os
+import socket
+import struct
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator
+from .base_class import DEFAULT_BASE_DIR, BuilderFactory
+from .constraint_checker import ConstraintChecker
+from .genetic_algorithm import GeneticAlgorithm
+from .scenario import Scenario
+from .solve_result import SolveResult
+
+
+class MessageCodec:
+    def __init__(self, payload_format: str = "json") -> None:
+        '''
+        "json": one json object per line
+        "msgpack": each message is prefixed by its length (4 bytes, big-endian), requires msgpack to be installed
+        '''
+        if payload_format not in ("json", "msgpack"):
+            raise ValueError(f"'payload_format' must be one of the following: ['json', 'msgpack'], given {payload_format}")
+        self.payload_format = payload_format
+        if payload_format == "msgpack":
+            try:
+                import msgpack
+            except ImportError as error:
+                raise ImportError("payload_format 'msgpack' requires msgpack, install it with 'pip install msgpack'") from error
+            self._msgpack = msgpack
+
+    def encode(self, message: dict) -> bytes:
+        if self.payload_format == "json":
+            return json.dumps(message).encode() + b"\n"
+        payload = self._msgpack.packb(message)
+        return struct.pack(">I", len(payload)) + payload
+
+    async def read(self, reader: asyncio.StreamReader) -> 'dict | None':
+        try:
+            if self.payload_format == "json":
+                line = await reader.readline()
+                return json.loads(line) if line else None
+            length = struct.unpack(">I", await reader.readexactly(4))[0]
+            return self._msgpack.unpackb(await reader.readexactly(length))
+        except asyncio.IncompleteReadError:
+            return None
+
+    def read_from_socket(self, stream: 'io.BufferedReader') -> 'dict | None':
+        if self.payload_format == "json":
+            line = stream.readline()
+            return json.loads(line) if line else None
+        header = stream.read(4)
+        if len(header) < 4:
+            return None
+        return self._msgpack.unpackb(stream.read(struct.unpack(">I", header)[0]))
+
+
+class SolverJob:
+    def __init__(self, job_id: str, request: dict, outgoing_messages: asyncio.Queue, loop: asyncio.AbstractEventLoop) -> None:
+        self.job_id = job_id
+        self.request = request
+        self.status = "queued"
+        self.cancel_event = threading.Event()
+        self._outgoing_messages = outgoing_messages
+        self._loop = loop
+
+    def send(self, event: str, **content) -> None:
+        '''
+        thread-safe, can be called by the worker thread running this job
+        '''
+        message = {"job_id": self.job_id, "event": event, **content}
+        self._loop.call_soon_threadsafe(self._outgoing_messages.put_nowait, message)
+
+
+class SolverDaemon:
+    def __init__(self,
+                 socket_path: str,
+                 workers: int = 1,
+                 BASE_DIR: str = DEFAULT_BASE_DIR,
+                 payload_format: str = "json",
+                 matrix_options: Dict[str, object] = None) -> None:
+        '''
+        SolverDaemon is a resident process keeping instances (BuilderFactory) and a worker pool warm,
+        and accepting jobs over a unix domain socket.
+        -------------------------------------------------------------------------------------------
+        Requests (one message each, see MessageCodec):
+        {"type": "solve", "job_id": optional, "dataset": optional BASE_DIR, "scenario": optional overrides (see Scenario.from_dict),
+         "population_size": 30, "mutation_rate": 0.3, "crossover_rate": 0.7, "maximum_iteration": 20,
+         "time_limit": optional seconds, "progress_every": 1, "seed": optional int}
+        {"type": "evaluate", "job_id": optional, "dataset": optional BASE_DIR, "scenario": optional, "solution": {"0": [0, 1, 0], ...}}
+        {"type": "cancel", "job_id": ...}
+        {"type": "status"}
+
+        Responses (streamed, all tagged with job_id):
+        "queued" -> "started" -> "progress" (solve only, every 'progress_every' generations) -> "result" | "cancelled" | "error"
+
+        P.S. jobs are run by a thread pool of 'workers' threads, queued jobs wait for a free worker.
+        GeneticAlgorithm holds the GIL, so 'workers' only decides how many jobs run concurrently (e.g., a short evaluate
+        isn't queued behind a long solve), not how many CPUs are used. Use solve_many for CPU-parallel solving.
+        Time limit and cancellation are checked between generations.
+        A message which can't be decoded, or isn't a mapping, is answered by an "error" event, the connection is kept.
+        '''
+        self.socket_path = socket_path
+        self.BASE_DIR = BASE_DIR
+        self.codec = MessageCodec(payload_format)
+        self.matrix_options = matrix_options or {}
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.jobs: Dict[str, SolverJob] = {}
+
+        self._factories: Dict[str, BuilderFactory] = {}
+        self._factories_lock = threading.Lock()
+        # load the default instance before accepting any job
+        self._get_factory(BASE_DIR)
+
+    def _get_factory(self, BASE_DIR: str = None) -> BuilderFactory:
+        BASE_DIR = os.path.abspath(BASE_DIR or self.BASE_DIR)
+        with self._factories_lock:
+            if BASE_DIR not in self._factories:
+                self._factories[BASE_DIR] = BuilderFactory(BASE_DIR, **self.matrix_options)
+            return self._factories[BASE_DIR]
+
+    def _get_job_factory(self, request: dict) -> BuilderFactory:
+        factory = self._get_factory(request.get("dataset"))
+        if request.get("scenario") is None:
+            return factory
+        return Scenario.from_dict(request.get("job_id"), request["scenario"]).apply(factory)
+
+    def run(self) -> None:
+        asyncio.run(self.serve())
+
+    async def serve(self) -> None:
+        if os.path.exists(self.socket_path):
+            os.remove(self.socket_path)
+        server = await asyncio.start_unix_server(self._handle_connection, path=self.socket_path)
+        async with server:
+            await server.serve_forever()
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        outgoing_messages = asyncio.Queue()
+        writing_task = asyncio.create_task(self._write_messages(writer, outgoing_messages))
+        try:
+            while True:
+                try:
+                    message = await self.codec.read(reader)
+                except ValueError as error:
+                    # e.g., a malformed json line, only this message is rejected
+                    outgoing_messages.put_nowait({"job_id": None, "event": "error", "error": f"Malformed message: {error}"})
+                    continue
+                if message is None:
+                    break
+                self._dispatch(message, outgoing_messages)
+        finally:
+            # jobs of a closed connection are not needed anymore
+            for job in self.jobs.values():
+                if job._outgoing_messages is outgoing_messages:
+                    job.cancel_event.set()
+            writing_task.cancel()
+            writer.close()
+
+    async def _write_messages(self, writer: asyncio.StreamWriter, outgoing_messages: asyncio.Queue) -> None:
+        while True:
+            message = await outgoing_messages.get()
+            writer.write(self.codec.encode(message))
+            await writer.drain()
+
+    def _dispatch(self, message: dict, outgoing_messages: asyncio.Queue) -> None:
+        if not isinstance(message, dict):
+            outgoing_messages.put_nowait({"job_id": None, "event": "error",
+                                          "error": f"A message must be a mapping, given {type(message).__name__}"})
+            return
+        message_type = message.get("type")
+        if message_type in ("solve", "evaluate"):
+            self._submit_job(message, outgoing_messages)
+            return
+        if message_type == "cancel":
+            job = self.jobs.get(message.get("job_id"))
+            if job is not None:
+                job.cancel_event.set()
+            outgoing_messages.put_nowait({"job_id": message.get("job_id"), "event": "cancel_requested", "found": job is not None})
+            return
+        if message_type == "status":
+            outgoing_messages.put_nowait({"event": "status",
+                                          "jobs": {job_id: job.status for job_id, job in self.jobs.items()},
+                                          "datasets": list(self._factories.keys())})
+            return
+        outgoing_messages.put_nowait({"job_id": message.get("job_id"), "event": "error", "error": f"Unknown message type: {message_type}"})
+
+    def _submit_job(self, request: dict, outgoing_messages: asyncio.Queue) -> None:
+        job_id = str(request.get("job_id") or uuid.uuid4().hex)
+        if job_id in self.jobs:
+            # otherwise the running job could no longer be cancelled / reported by its id
+            outgoing_messages.put_nowait({"job_id": job_id, "event": "error", "error": f"Job {job_id} is already queued or running"})
+            return
+        request["job_id"] = job_id
+        job = SolverJob(job_id, request, outgoing_messages, asyncio.get_running_loop())
+        self.jobs[job_id] = job
+        outgoing_messages.put_nowait({"job_id": job_id, "event": "queued"})
+
+        future = asyncio.get_running_loop().run_in_executor(self.executor, self._run_job, job)
+        future.add_done_callback(lambda _: self.jobs.pop(job_id) if self.jobs.get(job_id) is job else None)
+
+    def _run_job(self, job: SolverJob) -> None:
+        if job.cancel_event.is_set():
+            job.status = "cancelled"
+            job.send("cancelled")
+            return
+        job.status = "running"
+        job.send("started")
+        try:
+            if job.request["type"] == "solve":
+                content = self._solve(job)
+            else:
+                content = self._evaluate(job)
+        except Exception as error:
+            job.status = "error"
+            job.send("error", error=f"{type(error).__name__}: {error}")
+            return
+
+        job.status = "done"
+        job.send("result", **content)
+
+    def _solve(self, job: SolverJob) -> dict:
+        request = job.request
+        progress_every = max(int(request.get("progress_every", 1)), 1)
+        genetic_algorithm = GeneticAlgorithm(request.get("population_size", 30),
+                                             request.get("mutation_rate", 0.3),
+                                             request.get("crossover_rate", 0.7),
+                                             request.get("maximum_iteration", 20),
+                                             factory=self._get_job_factory(request),
+                                             verbose=False,
+                                             time_limit=request.get("time_limit"),
+                                             seed=request.get("seed"))
+
+        stopped_by = "maximum_iteration"
+        # a snapshot every generation, so cancellation isn't delayed by 'progress_every'
+        for snapshot in genetic_algorithm.iter_solve():
+            if job.cancel_event.is_set():
+                stopped_by = "cancelled"
+                break
+            if snapshot.iteration > 0 and snapshot.iteration % progress_every == 0:
+                job.send("progress",
+                         generation=snapshot.iteration,
+                         best_fitness=float(snapshot.fitness),
+                         elapsed_time=snapshot.elapsed_time)
+        else:
+            if genetic_algorithm.maximum_iteration is None or genetic_algorithm.current_iteration < genetic_algorithm.maximum_iteration:
+                stopped_by = "time_limit"
+
+        result = genetic_algorithm.result
+        result.name = job.job_id
+        return {"stopped_by": stopped_by, **result.to_dict()}
+
+    def _evaluate(self, job: SolverJob) -> dict:
+        factory = self._get_job_factory(job.request)
+        solution = {int(vehicle_idx): [int(depot_idx) for depot_idx in route]
+                    for vehicle_idx, route in job.request["solution"].items()}
+        result = SolveResult.from_solution(solution, factory, job.job_id)
+        return {**result.to_dict(), "constraints": ConstraintChecker(factory).check_solution(solution)}
+
+
+class SolverClient:
+    def __init__(self, socket_path: str, payload_format: str = "json") -> None:
+        '''
+        A minimal blocking client of SolverDaemon, e.g.,
+        for event in SolverClient(path).submit({"type": "solve", "time_limit": 1}): print(event)
+        '''
+        self.codec = MessageCodec(payload_format)
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._socket.connect(socket_path)
+        self._stream = self._socket.makefile("rb")
+
+    def send(self, message: dict) -> None:
+        self._socket.sendall(self.codec.encode(message))
+
+    def receive(self) -> 'dict | None':
+        return self.codec.read_from_socket(self._stream)
+
+    def submit(self, request: dict) -> Iterator[dict]:
+        '''
+        Sends a solve / evaluate request, and yields its events until it is finished
+        '''
+        request = dict(request)
+        request.setdefault("job_id", uuid.uuid4().hex)
+        self.send(request)
+        while True:
+            message = self.receive()
+            if message is None:
+                return
+            yield message
+            if message.get("job_id") == request["job_id"] and message.get("event") in ("result", "cancelled", "error"):
+                return
+
+    def close(self) -> None:
+        self._stream.close()
+        self._socket.close()
@@ -0,0 +1,128 @@
+from typing import Dict, List, Tuple
+from .base_class import BuilderFactory
+from .giant_tour import GiantTour
+# e.g.,  {0: [], 1: [0, 8, 6, 0], 2: [0, 7, 5, 0], 3: [0, 3, 0], 4: []}
+Solution = Dict[int, List[int]]
+
+
+class SplitLabel:
+    def __init__(self, cost: float, used_vehicles: Tuple[int, ...], previous: 'Tuple[int, SplitLabel, int] | None') -> None:
+        '''
+        A path of the split graph ending at some position of the giant tour:
+        cost: total cost of the routes so far
+        used_vehicles: number of vehicles used of each vehicle type
+        previous: (start position of the last route, label it extends, vehicle type of the last route), None for the empty path
+        '''
+        self.cost = cost
+        self.used_vehicles = used_vehicles
+        self.previous = previous
+
+    def is_dominated_by(self, _other_label: 'SplitLabel') -> bool:
+        return (_other_label.cost <= self.cost and
+                all(other_used <= used for other_used, used in zip(_other_label.used_vehicles, self.used_vehicles)))
+
+
+class SplitDecoder:
+    def __init__(self, factory: BuilderFactory = None, maximum_labels: int = 10) -> None:
+        '''
+        SplitDecoder decodes a giant tour (a permutation of all depots, without warehouse depot) into the cheapest routes
+        that cut it into consecutive pieces, one piece per vehicle (Bellman split over the heterogeneous fleet).
+        -------------------------------------------------------------------------------------------
+        Every consecutive piece tour[i:j] is a candidate route for each vehicle type (vehicles with the same capacity (Q_k), available time,
+        shipment discharging time, delivery status (a_ik) and costs (fc_k, B, a_k)),
+        extended one depot at a time with GiantTour's O(1) append (time windows, compatibility and replenishments), until infeasible.
+        Costs are the same as RouteResourceCalculator: fuel fee + fixed cost + driver cost.
+
+        The number of vehicles of each type is limited, so each position keeps a set of labels (cost, vehicles used of each type),
+        dominated labels are dropped and at most 'maximum_labels' cheapest labels are extended,
+        i.e., O(n * L * T * maximum_labels) per decode, n depots, T vehicle types and L depots of the longest feasible route.
+        '''
+        if maximum_labels < 1:
+            raise ValueError(f"'maximum_labels' must be at least 1, given {maximum_labels}")
+        self.giant_tour = GiantTour(factory)
+        self.maximum_labels = maximum_labels
+        self.vehicles = self.giant_tour.vehicles
+
+        # vehicles of the same type are interchangeable, see VehicleBuilder.vehicle_types
+        self.vehicles_of_types = list(self.vehicles.vehicles_of_types.values())
+
+    def encode(self, solution: Solution) -> List[int]:
+        giant_tour, _, _ = self.giant_tour.encode(solution)
+        return giant_tour
+
+    def _add_label(self, labels: Dict[Tuple[int, ...], SplitLabel], new_label: SplitLabel) -> None:
+        # only the cheapest label of the same vehicles used is kept
+        label = labels.get(new_label.used_vehicles)
+        if label is None or new_label.cost < label.cost:
+            labels[new_label.used_vehicles] = new_label
+
+    def _prune_labels(self, labels: Dict[Tuple[int, ...], SplitLabel]) -> List[SplitLabel]:
+        '''
+        Drops dominated labels (costs more and uses more vehicles of every type), and keeps the 'maximum_labels' cheapest labels
+        '''
+        pruned_labels = []
+        for label in sorted(labels.values(), key=lambda label: label.cost):
+            if any(label.is_dominated_by(pruned_label) for pruned_label in pruned_labels):
+                continue
+            pruned_labels.append(label)
+            if len(pruned_labels) == self.maximum_labels:
+                break
+        return pruned_labels
+
+    def decode(self, giant_tour: List[int]) -> 'Solution | None':
+        '''
+        This method is a public API expected to expose to users.
+        Functionality:
+            Splits 'giant_tour' into the cheapest valid routes (keeping the order of depots), returns None if it can't be split
+            (e.g., not enough vehicles, or a depot can't be delivered after the depots before it).
+        '''
+        warehouse_depot = 0
+        number_of_depots = len(giant_tour)
+        labels_at_positions = [{} for _ in range(number_of_depots + 1)]
+        self._add_label(labels_at_positions[0], SplitLabel(0, tuple(0 for _ in self.vehicles_of_types), None))
+
+        for start in range(number_of_depots):
+            labels = self._prune_labels(labels_at_positions[start])
+            if len(labels) == 0:
+                continue
+            for vehicle_type, vehicles_of_type in enumerate(self.vehicles_of_types):
+                labels_can_be_extended = [label for label in labels if label.used_vehicles[vehicle_type] < len(vehicles_of_type)]
+                if len(labels_can_be_extended) == 0:
+                    continue
+                vehicle_idx = vehicles_of_type[0]
+                vehicle = self.vehicles[vehicle_idx]
+                route_state = self.giant_tour._start_route(vehicle_idx)
+                for end in range(start, number_of_depots):
+                    appended = self.giant_tour._append_depot(vehicle_idx, route_state, giant_tour[end])
+                    if appended is None:  # a longer piece contains the same infeasible depot
+                        break
+                    route_state, _ = appended
+                    distance = route_state.distance + self.giant_tour.depots[giant_tour[end]].get_distance_to_depot(warehouse_depot)
+                    route_cost = (distance * vehicle.fuel_fee * vehicle.fuel_efficiency + vehicle.fixed_cost
+                                  + (route_state.total_time / 60) * 60)
+                    for label in labels_can_be_extended:
+                        used_vehicles = list(label.used_vehicles)
+                        used_vehicles[vehicle_type] += 1
+                        self._add_label(labels_at_positions[end + 1],
+                                        SplitLabel(label.cost + route_cost, tuple(used_vehicles), (start, label, vehicle_type)))
+
+        if len(labels_at_positions[number_of_depots]) == 0:
+            return None
+        return self._to_solution(giant_tour, min(labels_at_positions[number_of_depots].values(), key=lambda label: label.cost))
+
+    def _to_solution(self, giant_tour: List[int], label: SplitLabel) -> Solution:
+        pieces = []
+        end = len(giant_tour)
+        while label.previous is not None:
+            start, previous_label, vehicle_type = label.previous
+            pieces.append((vehicle_type, giant_tour[start: end]))
+            end = start
+            label = previous_label
+
+        solution = {vehicle_idx: [] for vehicle_idx in self.giant_tour.all_vehicle_names}
+        next_vehicles = [iter(vehicles_of_type) for vehicles_of_type in self.vehicles_of_types]
+        for vehicle_type, route in reversed(pieces):
+            vehicle_idx = next(next_vehicles[vehicle_type])
+            non_shortage_route, _, _ = self.giant_tour._build_route(vehicle_idx, route)
+            solution[vehicle_idx] = non_shortage_route
+        return dict(sorted(solution.items()))
@@ -1,6 +1,6 @@
 from typing import List, Dict
 from copy import deepcopy
-from random import choice
+from .random_stream import RandomStream, get_default_random_stream
 
 
 class Vehicle:
@@ -90,7 +90,7 @@ class Vehicle:
 
         return depot_id in self._available_depots
 
-    def assign_depot(self, existing_depot:List[int]) -> 'int | None':
+    def assign_depot(self, existing_depot:List[int], random_stream: RandomStream = None) -> 'int | None':
         existing_depot_can_be_assigned = [
             depot for depot in existing_depot 
             if depot in self._available_depots
@@ -98,7 +98,9 @@ class Vehicle:
         if len(existing_depot_can_be_assigned) == 0:
             return
 
-        return choice(existing_depot_can_be_assigned)
+        if random_stream is None:
+            random_stream = get_default_random_stream()
+        return random_stream.choice(existing_depot_can_be_assigned)
 
     def __gt__(self, _other_vehicle) -> bool:
         
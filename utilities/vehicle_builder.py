@@ -1,4 +1,6 @@
+from copy import copy
 from typing import Dict, List
+import numpy as np
 import pandas as pd
 from .vehicle_file import VehicleFile
 from .vehicle import Vehicle
@@ -20,6 +22,31 @@ class VehicleBuilder:
         self._number_of_vehicles = len(self.vehicle_capacity)
 
         self._vehicles = self.build_vehicles()
+        self._vehicle_types = None
+
+    @classmethod
+    def from_arrays(cls,
+                    capacity: np.ndarray,
+                    product_names: List[str],
+                    fuel_fee: np.ndarray,
+                    fuel_efficiency: np.ndarray,
+                    fixed_cost: np.ndarray,
+                    depots_delivery_status: np.ndarray,
+                    vehicle_names: List[int] = None) -> 'VehicleBuilder':
+        '''
+        Builds a VehicleBuilder from arrays already in memory (e.g., attached from shared memory, see SharedInstance) instead of csv files.
+        capacity: vehicle x product, depots_delivery_status: vehicle x depot (a_ik.csv)
+        vehicle_names: available vehicles, defaults to all vehicles
+        '''
+        vehicle_builder = cls.__new__(cls)
+        vehicle_builder.vehicle_fuel_fee = pd.DataFrame({"fuel_fee": np.array(fuel_fee)})
+        vehicle_builder.vehicle_fuel_efficiency = pd.DataFrame({"fuel_efficiency": np.array(fuel_efficiency)})
+        vehicle_builder.vehicle_total_fixed_cost = pd.DataFrame({"fixed_cost": np.array(fixed_cost)})
+        vehicle_builder.vehicle_capacity = pd.DataFrame(np.array(capacity), columns=product_names)
+        vehicle_builder.vehicle_depots_delivery_status = pd.DataFrame(np.array(depots_delivery_status))
+        vehicle_builder._number_of_vehicles = len(vehicle_builder.vehicle_capacity)
+        vehicle_builder._vehicles = vehicle_builder.build_vehicles()
+        return vehicle_builder.with_overrides(vehicle_names)
 
     def build_vehicles(self) -> Dict[int, Vehicle]:
         '''
@@ -45,15 +72,74 @@ class VehicleBuilder:
 
         return vehicles
 
+    def with_overrides(self, available_vehicles: List[int] = None) -> 'VehicleBuilder':
+        '''
+        Returns a new VehicleBuilder only containing 'available_vehicles' (0-based vehicle names are kept as they are)
+        '''
+        overridden_builder = copy(self)
+        if available_vehicles is not None:
+            overridden_builder._vehicles = {vehicle_idx: vehicle
+                                            for vehicle_idx, vehicle in self._vehicles.items()
+                                            if vehicle_idx in available_vehicles}
+        overridden_builder._vehicle_types = None
+        return overridden_builder
+
+    def __deepcopy__(self, memo: dict) -> 'VehicleBuilder':
+        # vehicles are only discharged after being copied, so the builder itself is shared rather than copied
+        return self
+
     @property
     def all_vehicle_names(self) -> List[int]:
         return [name for name in self._vehicles.keys()]
 
+    @property
+    def vehicle_types(self) -> Dict[int, int]:
+        '''
+        vehicle name -> vehicle type, i.e., the smallest name of the identical vehicles (the same capacity, fuel fee, fuel efficiency,
+        fixed cost, time limits and a_ik row), which are interchangeable in any solution, e.g., {0: 0, 1: 1, 2: 1, 3: 1, 4: 4}
+        '''
+        if self._vehicle_types is None:
+            vehicle_types = {}
+            types_of_signatures = {}
+            for vehicle_idx in sorted(self._vehicles):
+                signature = self._get_vehicle_signature(self._vehicles[vehicle_idx])
+                vehicle_types[vehicle_idx] = types_of_signatures.setdefault(signature, vehicle_idx)
+            self._vehicle_types = vehicle_types
+        return self._vehicle_types
+
+    @property
+    def vehicles_of_types(self) -> Dict[int, List[int]]:
+        '''
+        vehicle type -> names of the vehicles of the type, e.g., {0: [0], 1: [1, 2, 3], 4: [4]}
+        '''
+        vehicles_of_types = {}
+        for vehicle_idx, vehicle_type in self.vehicle_types.items():
+            vehicles_of_types.setdefault(vehicle_type, []).append(vehicle_idx)
+        return vehicles_of_types
+
+    def _get_vehicle_signature(self, vehicle: Vehicle) -> tuple:
+        return (tuple(sorted(vehicle.capacity.items())),
+                vehicle.fuel_fee,
+                vehicle.fuel_efficiency,
+                vehicle.fixed_cost,
+                vehicle.shipement_discharging_time,
+                vehicle.maximum_available_time,
+                tuple(vehicle.available_depots))
+
+    def get_canonical_key(self, solution: Dict[int, List[int]]) -> tuple:
+        '''
+        The same for solutions only differing in which of the identical vehicles drives which route (see .vehicle_types),
+        vehicles without any depots are ignored, e.g., with vehicles 1, 2 of the same type,
+        {0: [], 1: [0, 8, 6, 0], 2: [0, 7, 5, 0]} and {0: [], 1: [0, 7, 5, 0], 2: [0, 8, 6, 0]} -> ((1, (0, 7, 5, 0)), (1, (0, 8, 6, 0)))
+        '''
+        vehicle_types = self.vehicle_types
+        return tuple(sorted((vehicle_types[vehicle_idx], tuple(route)) for vehicle_idx, route in solution.items() if len(route) != 0))
+
     @property
     def sorted_vehicles(self) -> List[int]:
     
         sorted_vehicles_can_be_assigned = sorted([depot
-                                               for depot in self.build_vehicles().values()]) 
+                                               for depot in self._vehicles.values()]) 
         return sorted_vehicles_can_be_assigned
 
     def __getitem__(self, vehicle_idx: int) -> Vehicle: